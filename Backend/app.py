@@ -48,6 +48,7 @@ def engineConnect(engine, run_id=None):
             return lambda data: socketio.emit(event_name, {**data, 'run_id': run_id}, namespace='/workflow')
         
         engine.bus.on('node_status_change', create_emitter('node_status_change'))
+        engine.bus.on('node_progress', create_emitter('node_progress'))
         engine.bus.on('execution_paused', create_emitter('execution_paused'))
         engine.bus.on('execution_terminated', create_emitter('execution_terminated'))
         engine.bus.on('over', create_emitter('over'))
@@ -60,6 +61,7 @@ def engineConnect(engine, run_id=None):
     else:
         # 普通模式：不带run_id
         engine.bus.on('node_status_change', lambda data: socketio.emit('node_status_change', data, namespace='/workflow'))
+        engine.bus.on('node_progress', lambda data: socketio.emit('node_progress', data, namespace='/workflow'))
         engine.bus.on('message', lambda event, nodeId, message: 
             socketio.emit(event, {"data": nodeId, "message": message}, namespace='/workflow'))
         engine.bus.on("nodes_output", lambda nodeId, message: 
@@ -111,6 +113,8 @@ def execute_debug_task(run_id, workflow_data, breakpoints):
             # 添加调试事件监听，关键修复：包含run_id
             manager.global_bus.on("node_status_change", lambda event_data: 
                 socketio.emit('node_status_change', {**event_data, 'run_id': run_id}, namespace='/workflow'))
+            manager.global_bus.on("node_progress", lambda event_data: 
+                socketio.emit('node_progress', {**event_data, 'run_id': run_id}, namespace='/workflow'))
             manager.global_bus.on("execution_paused", lambda event_data: 
                 socketio.emit('execution_paused', {**event_data, 'run_id': run_id}, namespace='/workflow'))
             manager.global_bus.on("execution_terminated", lambda event_data: 
@@ -196,6 +200,8 @@ def execute_workflow_task(workflow_data):
             # 关键修复：添加节点状态变化事件转发，这是画布可视化的核心
             manager.global_bus.on("node_status_change", lambda event_data: 
                 socketio.emit('node_status_change', event_data, namespace='/workflow'))
+            manager.global_bus.on("node_progress", lambda event_data: 
+                socketio.emit('node_progress', event_data, namespace='/workflow'))
             
             # 注册工作流
             manager.register_workflows(converted_data["workflows"])
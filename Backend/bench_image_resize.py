@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+图像缩小性能基准
+
+对比完整解码 + LANCZOS（旧实现）与 draft/reduce 快速路径在大尺寸 JPEG 上的耗时和峰值内存。
+每种方式在独立子进程中运行，峰值内存取子进程的最大常驻内存。
+
+用法:
+    python bench_image_resize.py --width 6000 --height 4000 --target 300
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from PIL import Image
+
+from workflows.nodes.ImageProcessor import downscale_image
+
+
+def _full_resize(path, size):
+    with Image.open(path) as image:
+        return image.resize(size, Image.LANCZOS)
+
+
+def _fast_resize(path, size):
+    with Image.open(path) as image:
+        return downscale_image(image, size)
+
+
+def _measure(method, path, size, repeat, queue):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        method(path, size)
+    elapsed = (time.perf_counter() - start) / repeat
+    # Linux 下 ru_maxrss 单位为 KB
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def _run(label, method, path, size, repeat):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_measure, args=(method, path, size, repeat, queue))
+    process.start()
+    elapsed, peak_kb = queue.get()
+    process.join()
+    print(f"{label:<6} {elapsed * 1000:9.1f} ms  峰值内存 {peak_kb / 1024:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图像缩小性能基准")
+    parser.add_argument("--width", type=int, default=6000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--target", type=int, default=300, help="缩略图长边像素")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "source.jpg")
+        Image.radial_gradient("L").resize((args.width, args.height)).convert("RGB").save(path, quality=90)
+        ratio = args.target / max(args.width, args.height)
+        size = (int(args.width * ratio), int(args.height * ratio))
+        print(f"{args.width}x{args.height} -> {size[0]}x{size[1]}")
+        _run("full", _full_resize, path, size, args.repeat)
+        _run("fast", _fast_resize, path, size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+JSON 差异比较性能基准
+
+在大型配置文档上对比按下标逐层比较（旧实现）与结构哈希 + 数组对齐的新实现：
+在服务列表开头插入一项、修改少量服务的配置、删除一项，比较耗时和差异输出的大小。
+
+用法:
+    python bench_json_diff.py --services 20000
+"""
+import argparse
+import copy
+import json
+import random
+import time
+
+from workflows.jsondiff import apply_patch, json_diff
+
+
+def _index_diff(path, first, second, differences):
+    """旧实现：字典逐键、数组逐下标完整递归"""
+    if isinstance(first, dict) and isinstance(second, dict):
+        for key in set(first) | set(second):
+            new_path = f"{path}.{key}" if path else key
+            if key not in first:
+                differences.append({"path": new_path, "type": "missing_in_first", "value": second[key]})
+            elif key not in second:
+                differences.append({"path": new_path, "type": "missing_in_second", "value": first[key]})
+            else:
+                _index_diff(new_path, first[key], second[key], differences)
+    elif isinstance(first, list) and isinstance(second, list):
+        for i in range(max(len(first), len(second))):
+            new_path = f"{path}[{i}]"
+            if i >= len(first):
+                differences.append({"path": new_path, "type": "missing_in_first", "value": second[i]})
+            elif i >= len(second):
+                differences.append({"path": new_path, "type": "missing_in_second", "value": first[i]})
+            else:
+                _index_diff(new_path, first[i], second[i], differences)
+    elif first != second:
+        differences.append({"path": path, "type": "value_different", "first_value": first, "second_value": second})
+
+
+def _make_config(services, seed=0):
+    rng = random.Random(seed)
+    return {
+        "version": 1,
+        "services": [
+            {
+                "id": f"svc-{i}",
+                "image": f"registry/app-{i}:1.{rng.randint(0, 9)}",
+                "replicas": rng.randint(1, 5),
+                "env": {f"VAR_{k}": str(rng.random()) for k in range(8)},
+                "ports": [{"container": 8000 + k, "protocol": "tcp"} for k in range(3)],
+            }
+            for i in range(services)
+        ],
+    }
+
+
+def _mutate(config, changes, seed=1):
+    rng = random.Random(seed)
+    result = copy.deepcopy(config)
+    services = result["services"]
+    services.insert(0, {"id": "svc-new", "image": "registry/new:1.0", "replicas": 1, "env": {}, "ports": []})
+    for index in rng.sample(range(1, len(services)), changes):
+        services[index]["replicas"] += 1
+        services[index]["env"]["VAR_0"] = "changed"
+    services.pop(len(services) // 2)
+    return result
+
+
+def _measure(label, func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        output = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    size = len(json.dumps(output, ensure_ascii=False))
+    print(f"{label:<10} {elapsed * 1000:9.1f} ms  {len(output):8d} 条  输出 {size / 1024:10.1f} KB")
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 差异比较性能基准")
+    parser.add_argument("--services", type=int, default=20000)
+    parser.add_argument("--changes", type=int, default=50, help="修改的服务数量")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    first = _make_config(args.services)
+    second = _mutate(first, args.changes)
+    print(f"文档: {args.services} 个服务，{len(json.dumps(first)) / 1024 / 1024:.1f} MB")
+
+    def index_diff():
+        differences = []
+        _index_diff("", first, second, differences)
+        return differences
+
+    _measure("按下标", index_diff, args.repeat)
+    patch = _measure("哈希对齐", lambda: json_diff(first, second), args.repeat)
+    keyed = _measure("按 id 对齐", lambda: json_diff(first, second, key_field="id"), args.repeat)
+    assert apply_patch(first, patch) == second
+    assert apply_patch(first, keyed) == second
+
+
+if __name__ == "__main__":
+    main()
@@ -79,11 +79,11 @@ Thryve是一个强大的可视化工作流设计工具，允许用户通过拖
 
 #### 处理节点
 - **pdf-processor**: PDF处理器(extract/split/merge/encrypt/decrypt/compress/watermark/metadata/convert)
-- **img-processor**: 图像处理器(resize/compress/convert/rotate/crop/filter/watermark)
+- **img-processor**: 图像处理器(resize/compress/convert/rotate/crop/filter/watermark/thumbnail)
 - **text-processor**: 文本处理器(append/write/replace/wordFreq)
-- **json-processor**: JSON处理器(query/update/validate/diff)
-- **csv-processor**: CSV处理器(filter/sort/aggregate)
-- **markdown-processor**: Markdown处理器(write/append/convert/frontMatter/toc/lint)
+- **json-processor**: JSON处理器(query/streamQuery/update/validate/diff)
+- **csv-processor**: CSV处理器(filter/sort/aggregate/stream/write)，stream 输出逐行读取的数据流 rows，可直接作为 loop 的 batchFor 或 write 的 rows
+- **markdown-processor**: Markdown处理器(write/append/convert/batchConvert/frontMatter/toc/lint)
 - **llm**: 大语言模型处理器
 
 #### 控制节点
@@ -249,6 +249,7 @@ Thryve是一个强大的可视化工作流设计工具，允许用户通过拖
         "inputFile": {"type": "string", "title": "PDF File", "description": "Select PDF file"},
         "pageRange": {"type": "string", "title": "Page Range", "description": "Pages to extract (e.g., 1-5)", "default": ""},
         "extractImages": {"type": "boolean", "title": "Extract Images", "description": "Include images", "default": false},
+        "useCache": {"type": "boolean", "title": "Use Page Cache", "description": "Keep extracted page text in the server-side cache (shared across runs and users) so repeated runs of the same PDF are faster", "default": false},
         "outputFolder": {"type": "string", "title": "Output Folder", "description": "Save location"},
         "outputName": {"type": "string", "title": "Output Name", "description": "File name"}
       }
@@ -256,7 +257,7 @@ Thryve是一个强大的可视化工作流设计工具，允许用户通过拖
     "outputs": {
       "type": "object",
       "properties": {
-        "text": {"type": "string", "description": "Extracted text content"},
+        "text": {"type": "string", "description": "Extracted text content (only a short preview when inMemory is on; the full text is in textFile)"},
         "images": {"type": "array", "description": "Extracted images (if enabled)"}
       }
     },
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+工作流预编译命令行工具
+
+用法:
+    python precompile_workflows.py workflow_example.json saved_workflows/ -o compiled/
+    python precompile_workflows.py compiled/ --check
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+from workflows.Compiler import (
+    COMPILED_SUFFIX,
+    CompiledWorkflowError,
+    compile_file,
+    compiled_path_for,
+    is_stale,
+    load_compiled,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _collect_files(paths, suffix):
+    """展开命令行中的文件和目录参数"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            with os.scandir(path) as entries:
+                files.extend(sorted(entry.path for entry in entries if entry.is_file() and entry.name.endswith(suffix)))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            logger.warning(f"路径不存在，已跳过: {path}")
+    return files
+
+
+def precompile(paths, output_dir=None, force=False):
+    """编译所有 JSON 工作流，返回 (成功数, 跳过数, 失败数)"""
+    compiled = skipped = failed = 0
+    for source_path in _collect_files(paths, ".json"):
+        target = compiled_path_for(source_path, output_dir)
+        if not force and not is_stale(source_path, target):
+            skipped += 1
+            continue
+        try:
+            compile_file(source_path, target)
+            compiled += 1
+        except Exception as e:
+            logger.error(f"编译 {source_path} 失败: {str(e)}")
+            failed += 1
+    return compiled, skipped, failed
+
+
+def check(paths):
+    """校验编译产物能否加载，返回失败数"""
+    failed = 0
+    for path in _collect_files(paths, COMPILED_SUFFIX):
+        start = time.perf_counter()
+        try:
+            workflows = load_compiled(path)["workflows"]
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"OK   {path}: {len(workflows)} 个工作流, 加载耗时 {elapsed:.2f} ms")
+        except (OSError, CompiledWorkflowError) as e:
+            print(f"FAIL {path}: {str(e)}")
+            failed += 1
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="将保存的工作流 JSON 预编译为紧凑二进制格式")
+    parser.add_argument("paths", nargs="+", help="工作流 JSON 文件或目录（--check 时为编译产物）")
+    parser.add_argument("-o", "--output-dir", help="编译产物输出目录，默认与源文件同目录")
+    parser.add_argument("-f", "--force", action="store_true", help="忽略过期检查，强制重新编译")
+    parser.add_argument("--check", action="store_true", help="只校验编译产物能否加载")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.check:
+        return 1 if check(args.paths) else 0
+
+    compiled, skipped, failed = precompile(args.paths, args.output_dir, args.force)
+    print(f"编译完成: 成功 {compiled}, 未变化跳过 {skipped}, 失败 {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
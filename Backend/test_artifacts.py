@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+测试节点间传递的内存产物
+"""
+import gc
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from workflows.artifacts import Artifact, DeferredRemoval, describe_artifacts
+from workflows.events import EventBus
+from workflows.nodes.TextProcessor import TextProcessor
+
+
+def test_artifact_spill_and_materialize():
+    """超过阈值后溢出到临时文件，内容可通过 mmap 读取，按需落盘"""
+    artifact = Artifact("data.txt", b"abc", spill_bytes=8)
+    assert not artifact.spilled
+    artifact.write(b"defghijk")
+    assert artifact.spilled
+    assert bytes(artifact.view()[:5]) == b"abcde"
+    assert artifact.size == 11
+
+    # 只接受路径的代码通过 os.fspath 读取
+    with open(artifact, "rb") as f:
+        assert f.read() == b"abcdefghijk"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target = artifact.materialize(os.path.join(tmp, "out.txt"))
+        with open(target, "rb") as f:
+            assert f.read() == b"abcdefghijk"
+        assert describe_artifacts({"file": artifact})["file"]["path"] == target
+    artifact.release()
+
+
+def test_text_chain_in_memory():
+    """文本节点链在内存中传递结果，不写输出目录"""
+    with tempfile.TemporaryDirectory() as tmp:
+        bus = EventBus()
+        source = Artifact.from_text("notes.txt", "hello world\n", encoding="gbk")
+        nodes = {}
+        bus.on("askMessage", lambda node_id, param: nodes[node_id].getMessage(param))
+
+        def make(node_id, mode, **inputs):
+            inputs_values = {key: {"type": "constant", "content": value} for key, value in inputs.items()}
+            inputs_values["outputFolder"] = {"type": "constant", "content": tmp}
+            node = TextProcessor(node_id, "text-processor", [("next", "end")], bus,
+                                 {"mode": mode, "inputsValues": inputs_values})
+            nodes[node_id] = node
+            return node
+
+        make("replace", "replace", inputFile=source, searchText="world", replaceText="there", inMemory=True).run()
+        appended = make("append", "append", content="bye", inMemory=True)
+        appended.data["inputsValues"]["inputFile"] = {"type": "ref", "content": ["replace", "outputFile"]}
+        result = appended.run()
+
+        assert isinstance(result["outputFile"], Artifact)
+        assert result["outputFile"].read_text() == "hello there\nbye"
+        assert os.listdir(tmp) == []
+
+
+
+def test_deferred_removal_keeps_paths_valid():
+    """交给引擎的产物被回收后，取得的临时文件路径在运行结束前仍然有效"""
+    deferred = DeferredRemoval()
+    artifact = Artifact("echo.txt", b"payload")
+    artifact.defer_removal(deferred)
+    path = os.fspath(artifact)
+    del artifact
+    gc.collect()
+    with open(path, "rb") as f:
+        assert f.read() == b"payload"
+    deferred.close()
+    assert not os.path.exists(path)
+
+    # 运行结束后回收的产物立即删除文件
+    late = Artifact("late.txt", b"x" * 10, spill_bytes=4)
+    late.defer_removal(deferred)
+    spill_path = os.fspath(late)
+    del late
+    gc.collect()
+    assert not os.path.exists(spill_path)
+
+
+def test_describe_only_registered_types():
+    """只有产物、数据流等注册过的类型被替换为描述信息，其他带 describe() 的对象原样保留"""
+    class Frame:
+        def describe(self):
+            return "summary"
+
+    frame = Frame()
+    described = describe_artifacts({"frame": frame, "file": Artifact("a.txt", b"abc")})
+    assert described["frame"] is frame
+    assert described["file"]["artifact"] == "a.txt"
+
+
+if __name__ == "__main__":
+    test_artifact_spill_and_materialize()
+    test_text_chain_in_memory()
+    test_deferred_removal_keeps_paths_valid()
+    test_describe_only_registered_types()
+    print("✅ 内存产物测试通过")
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+测试工作流预编译与二进制加载
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from workflows.Compiler import (
+    COMPILED_SCHEMA_VERSION,
+    CompiledWorkflowError,
+    analyze_liveness,
+    compile_file,
+    is_stale,
+    load_compiled,
+    load_workflow_file,
+    prepare_nodes,
+)
+from workflows.Engine import WorkflowEngine
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workflow_example.json")
+
+
+class MockSocketIO:
+    def emit(self, *args, **kwargs):
+        pass
+
+    def sleep(self, seconds):
+        pass
+
+
+def test_compile_roundtrip():
+    """编译产物加载后与现场编译的节点结构一致"""
+    with open(EXAMPLE, "r", encoding="utf-8") as f:
+        source = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target = compile_file(EXAMPLE, os.path.join(tmp, "example.twf"))
+        loaded = load_compiled(target)["workflows"]
+
+        assert set(loaded) == set(source["workflows"])
+        for workflow_id, data in source["workflows"].items():
+            expected = prepare_nodes(data)
+            assert set(loaded[workflow_id]["nodes"]) == set(expected)
+            for node_id, node in expected.items():
+                assert loaded[workflow_id]["nodes"][node_id]["next"] == node["next"]
+                assert "meta" not in loaded[workflow_id]["nodes"][node_id]
+
+        # 引擎可直接使用编译后的执行计划，且不会修改共享计划
+        plan = loaded["main_workflow"]
+        engine = WorkflowEngine(plan, MockSocketIO())
+        assert engine.nodes == plan["nodes"]
+        assert engine.nodes is not plan["nodes"]
+
+
+def test_stale_and_version_check():
+    """源文件变化或版本不符时判定为过期"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source_path = os.path.join(tmp, "wf.json")
+        with open(EXAMPLE, "r", encoding="utf-8") as src, open(source_path, "w", encoding="utf-8") as dst:
+            dst.write(src.read())
+
+        data = load_workflow_file(source_path, tmp)
+        assert "main_workflow" in data["workflows"]
+        compiled_path = os.path.join(tmp, "wf.twf")
+        assert not is_stale(source_path, compiled_path)
+
+        # 过期检查只读文件头，不反序列化执行计划
+        with open(compiled_path, "r+b") as f:
+            f.seek(-4, os.SEEK_END)
+            f.write(b"\0\0\0\0")
+        assert not is_stale(source_path, compiled_path)
+        try:
+            load_compiled(compiled_path)
+            assert False, "内容损坏时应抛出异常"
+        except CompiledWorkflowError:
+            pass
+        # 内容损坏时重新编译
+        assert "main_workflow" in load_workflow_file(source_path, tmp)["workflows"]
+
+        with open(source_path, "a", encoding="utf-8") as f:
+            f.write("\n")
+        assert is_stale(source_path, compiled_path)
+
+        with open(compiled_path, "r+b") as f:
+            f.seek(8)
+            f.write((COMPILED_SCHEMA_VERSION + 1).to_bytes(2, "big"))
+        try:
+            load_compiled(compiled_path)
+            assert False, "版本不符时应抛出异常"
+        except CompiledWorkflowError:
+            pass
+
+
+def _ref(node_id, port):
+    return {"type": "ref", "content": [node_id, port]}
+
+
+def test_liveness_analysis():
+    """输出在最后一个可能的引用节点之后不再活跃，条件分支和循环体的引用都计入"""
+    nodes = {
+        "start": {"next": [("next_id", "load")], "data": {}},
+        "load": {"next": [("next_id", "cond")], "data": {}},
+        "cond": {"next": [("if_a", "use"), ("else", "loop")],
+                 "data": {"conditions": [{"left": _ref("load", "size")}]}},
+        "use": {"next": [("next_id", "end")], "data": {"inputsValues": {"text": _ref("load_locals", "text")}}},
+        "loop": {"next": [("next_id", "end")], "data": {"batchFor": _ref("load", "files")},
+                 "blocks": [{"id": "inner", "data": {"inputsValues": {"x": _ref("loop", "item"),
+                                                                      "y": _ref("start", "folder")}}}]},
+        "end": {"next": [], "data": {}},
+    }
+    liveness = analyze_liveness(nodes)
+    live_out = {node: {tuple(ref) for ref in refs} for node, refs in liveness["liveOut"].items()}
+    assert live_out["load"] == {("load", "size"), ("load", "text"), ("load", "files"), ("start", "folder")}
+    assert live_out["cond"] == {("load", "text"), ("load", "files"), ("start", "folder")}
+    assert live_out["use"] == set() and live_out["loop"] == set()
+    assert liveness["lastUse"] == {"load.size": ["cond"], "load.text": ["use"],
+                                   "load.files": ["loop"], "start.folder": ["loop"]}
+
+    # 回边上的节点会再次执行，其引用的输出在整个环上保持活跃
+    nodes["end"]["next"] = [("next_id", "start")]
+    assert ("load", "text") in {tuple(ref) for ref in analyze_liveness(nodes)["liveOut"]["use"]}
+
+
+def test_engine_releases_dead_outputs():
+    """引擎在最后一个引用节点执行后释放输出，并报告释放的字节数和峰值"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "rows.csv")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write("id,name\n" + "".join(f"{i},{'x' * 50}\n" for i in range(200)))
+        workflow = {
+            "nodes": [
+                {"id": "start_0", "type": "start", "data": {"outputs": {"properties": {
+                    "greeting": {"type": "string", "default": "hello"}}}}},
+                {"id": "csv_1", "type": "csv-processor", "data": {"mode": "filter", "inputsValues": {
+                    "inputFile": {"type": "constant", "content": source},
+                    "column": {"type": "constant", "content": "id"},
+                    "condition": {"type": "constant", "content": "greater than"},
+                    "value": {"type": "constant", "content": "-1"},
+                    "outputFolder": {"type": "constant", "content": tmp},
+                    "outputName": {"type": "constant", "content": "all"}}}},
+                {"id": "csv_2", "type": "csv-processor", "data": {"mode": "write", "inputsValues": {
+                    "rows": _ref("csv_1", "filteredData"),
+                    "outputFolder": {"type": "constant", "content": tmp},
+                    "outputName": {"type": "constant", "content": "copy"}}}},
+                {"id": "print_3", "type": "print", "data": {"inputsValues": {"input": _ref("start_0", "greeting")}}},
+                {"id": "end_4", "type": "end", "data": {}}
+            ],
+            "edges": [
+                {"sourceNodeID": "start_0", "targetNodeID": "csv_1"},
+                {"sourceNodeID": "csv_1", "targetNodeID": "csv_2"},
+                {"sourceNodeID": "csv_2", "targetNodeID": "print_3"},
+                {"sourceNodeID": "print_3", "targetNodeID": "end_4"}
+            ]
+        }
+        engine = WorkflowEngine(workflow, MockSocketIO())
+        held = {}
+        engine.bus.on("node_status_change", lambda data: held.setdefault(data["nodeId"], {
+            node_id: set(instance.MessageList) for node_id, instance in engine.instance.items()
+            if hasattr(instance, "MessageList")}) if data["status"] == "PROCESSING" else None)
+        assert engine.run()[0]
+        with open(os.path.join(tmp, "copy.csv"), encoding="utf-8") as f:
+            assert len(f.read().splitlines()) == 201
+
+        # csv_2 执行时过滤结果仍然保留，csv_2 之后的节点执行时已释放，运行结束后所有输出都已释放
+        assert "filteredData" in held["csv_2"]["csv_1"]
+        assert "filteredData" not in held["print_3"].get("csv_1", set())
+        assert engine.instance == {}
+        report = engine.get_memory_usage_info()["outputs"]
+        assert report["liveBytes"] == 0
+        assert report["freedBytes"] >= report["peakBytes"] > 200 * 50
+        assert report["releasedNodes"] == 5
+
+
+if __name__ == "__main__":
+    test_compile_roundtrip()
+    test_stale_and_version_check()
+    test_liveness_analysis()
+    test_engine_releases_dead_outputs()
+    print("✅ 预编译测试通过")
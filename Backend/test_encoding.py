@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+测试共享的文本编码探测
+"""
+import codecs
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from workflows.encoding import detect_encoding, read_text, sniff_encoding
+from workflows.encoding.EncodingSniffer import SNIFF_BYTES
+from workflows.nodes.CSV import read_csv_file
+
+
+def test_sniff_prefix_and_bom():
+    """前缀末尾截断在多字节字符中间时仍判定为 UTF-8，BOM 优先"""
+    data = "中文".encode("utf-8")
+    assert sniff_encoding(data[:4]) == "utf-8"
+    assert sniff_encoding("中文".encode("gbk"), final=True) == "gbk"
+    assert sniff_encoding(codecs.BOM_UTF16_LE + "hi".encode("utf-16-le")) == "utf-16"
+    assert sniff_encoding(codecs.BOM_UTF8 + data) == "utf-8-sig"
+
+
+def test_read_large_gbk_file_once():
+    """前缀为 ASCII、后文为 GBK 的大文件：前缀探测为 UTF-8，全文在内存中回退到 GBK"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.txt")
+        text = "a" * (SNIFF_BYTES + 10) + "中文内容"
+        with open(path, "wb") as f:
+            f.write(text.encode("gbk"))
+
+        assert detect_encoding(path) == "utf-8"
+        content, encoding = read_text(path)
+        assert (content, encoding) == (text, "gbk")
+        # 全文解码的结果覆盖缓存中的前缀探测结果
+        assert detect_encoding(path) == "gbk"
+
+
+def test_csv_reads_gbk():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.csv")
+        with open(path, "w", encoding="gbk", newline="") as f:
+            f.write("名称,数量\r\n苹果,3\r\n")
+        assert read_csv_file(path) == [{"名称": "苹果", "数量": "3"}]
+
+
+if __name__ == "__main__":
+    test_sniff_prefix_and_bom()
+    test_read_large_gbk_file_once()
+    test_csv_reads_gbk()
+    print("✅ 编码探测测试通过")
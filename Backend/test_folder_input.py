@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+测试文件夹输入节点的目录遍历与过滤
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import weakref
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("THRYVE_CACHE_DIR", tempfile.mkdtemp(prefix="thryve_cache_"))
+
+from workflows.events import EventBus
+from workflows.fswalk import FileWalk, SnapshotIndex, WalkOptions
+from workflows.nodes.FolderInput import FolderInput
+
+
+def _build_tree(root):
+    files = {
+        "a.md": 10, "b.txt": 2000, "docs/c.md": 10, "docs/deep/d.md": 10,
+        "docs/deep/e.log": 10, "node_modules/x.md": 10
+    }
+    for relative, size in files.items():
+        path = os.path.join(root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+
+
+def _make_node(root, hooks=None, **folder_config):
+    data = {
+        "folders": [dict(variableName="inputFolder", **folder_config)],
+        "outputs": {"properties": {
+            "inputFolder": {"type": "string", "default": root},
+            "inputFolder_files": {"type": "array", "default": [{"path": root}]}
+        }}
+    }
+    bus = EventBus()
+    if hooks is not None:
+        # 代替引擎保存节点注册的成功回调
+        bus.on("registerSuccessHook", lambda node_id, hook: hooks.__setitem__(node_id, hook))
+    return FolderInput("folder_test", "folder-input", [("next_id", "end")], bus, data)
+
+
+def _age(paths, seconds):
+    """把修改时间调早，避开快照的可疑时间窗口"""
+    past = time.time() - seconds
+    for path in paths:
+        os.utime(path, (past, past))
+
+
+def _age_tree(root, seconds=60):
+    for directory, _, names in os.walk(root):
+        _age([os.path.join(directory, name) for name in names] + [directory], seconds)
+
+
+def _relative(root, paths):
+    return [os.path.relpath(path, root).replace(os.sep, "/") for path in paths]
+
+
+def test_walk_filters():
+    with tempfile.TemporaryDirectory() as root:
+        _build_tree(root)
+        files = _make_node(root, deepSearch=True).run()["inputFolder_files"]
+        assert _relative(root, files) == ["a.md", "b.txt", "docs/c.md", "docs/deep/d.md", "docs/deep/e.log", "node_modules/x.md"]
+
+        files = _make_node(root, deepSearch=True, include="*.md", exclude=["node_modules"], maxDepth=1).run()["inputFolder_files"]
+        assert _relative(root, files) == ["a.md", "docs/c.md"]
+
+        files = _make_node(root, deepSearch=True, extensions="txt,log", minSize=100).run()["inputFolder_files"]
+        assert _relative(root, files) == ["b.txt"]
+
+        files = _make_node(root, deepSearch=True, include="docs/**/*.md").run()["inputFolder_files"]
+        assert _relative(root, files) == ["docs/c.md", "docs/deep/d.md"]
+
+        # 未开启 deepSearch 时目录不展开
+        assert _make_node(root).run()["inputFolder_files"] == []
+
+        # 运行前已被下游按需遍历时，run() 直接使用该结果；再次运行时重新遍历
+        node = _make_node(root, deepSearch=True)
+        files = node.getMessage("inputFolder_files")
+        assert node.run()["inputFolder_files"] is files
+        assert node.run()["inputFolder_files"] is not files
+
+
+def test_glob_segments():
+    """含 / 的模式逐段匹配：* 不跨越目录，** 匹配零个或多个目录层级"""
+    options = WalkOptions(include=["docs/**/*.txt"])
+    assert options.accepts_name("docs/a.txt")
+    assert options.accepts_name("docs/x/y/a.txt")
+    assert not options.accepts_name("other/docs/a.txt")
+
+    options = WalkOptions(include=["docs/*.txt", "**/build/*.log"])
+    assert options.accepts_name("docs/a.txt")
+    assert not options.accepts_name("docs/x/y/a.txt")
+    assert options.accepts_name("build/out.log") and options.accepts_name("a/b/build/out.log")
+    assert not options.accepts_name("build/sub/out.log")
+
+    assert WalkOptions(exclude=["**/deep"]).excludes("docs/deep")
+    assert WalkOptions(include=["*.md"]).accepts_name("docs/deep/d.md")
+
+
+def test_lazy_walk_streams_paths():
+    with tempfile.TemporaryDirectory() as root:
+        _build_tree(root)
+        files = _make_node(root, deepSearch=True, lazy=True).run()["inputFolder_files"]
+        assert isinstance(files, FileWalk)
+        iterator = iter(files)
+        assert _relative(root, [next(iterator)]) == ["a.md"]
+        # 遍历是惰性的：已开始迭代后新建的文件仍会被发现
+        with open(os.path.join(root, "node_modules", "y.md"), "w") as f:
+            f.write("y")
+        assert _relative(root, list(iterator))[-1] == "node_modules/y.md"
+        assert len(list(FileWalk([root], WalkOptions(recursive=True, max_depth=0)))) == 2
+
+
+def test_changed_only_emits_changes_since_last_success():
+    with tempfile.TemporaryDirectory() as root:
+        _build_tree(root)
+        _age_tree(root)
+        config = dict(deepSearch=True, changedOnly=True, snapshotKey=f"test:{root}")
+
+        hooks = {}
+        node = _make_node(root, hooks, **config)
+        assert len(node.run()["inputFolder_files"]) == 6
+        # 工作流未成功结束时不提交快照，下次仍产出全部文件
+        assert len(_make_node(root, **config).run()["inputFolder_files"]) == 6
+        # 成功回调只引用快照，不会让节点实例和文件列表无法释放
+        node_ref = weakref.ref(node)
+        del node
+        gc.collect()
+        assert node_ref() is None
+        hooks.pop("folder_test")()
+
+        assert _make_node(root, **config).run()["inputFolder_files"] == []
+
+        docs = os.path.join(root, "docs")
+        with open(os.path.join(docs, "c.md"), "ab") as f:
+            f.write(b"more")
+        with open(os.path.join(docs, "new.md"), "w") as f:
+            f.write("new")
+        _age([os.path.join(docs, "c.md"), os.path.join(docs, "new.md"), docs], 30)
+        assert _relative(root, _make_node(root, hooks, **config).run()["inputFolder_files"]) == ["docs/c.md", "docs/new.md"]
+        hooks.pop("folder_test")()
+        assert _make_node(root, **config).run()["inputFolder_files"] == []
+
+        # hashContent：只被 touch 的文件内容未变，不产出
+        hashed = dict(config, hashContent=True, snapshotKey=f"hash:{root}")
+        _make_node(root, hooks, **hashed).run()
+        hooks.pop("folder_test")()
+        _age([os.path.join(root, "a.md")], 10)
+        assert _make_node(root, **hashed).run()["inputFolder_files"] == []
+
+
+def test_index_serves_unchanged_listing():
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as db:
+        _build_tree(root)
+        _age_tree(root)
+        index = SnapshotIndex(os.path.join(db, "snapshots.sqlite3"))
+        expected = list(FileWalk([root]))
+
+        assert list(FileWalk([root], list_dir=index.list_dir)) == expected
+        misses = index.dir_misses
+        assert list(FileWalk([root], list_dir=index.list_dir)) == expected
+        assert index.dir_misses == misses and index.dir_hits == misses
+
+        # 目录修改时间变化后重新列出该目录
+        with open(os.path.join(root, "docs", "f.md"), "w") as f:
+            f.write("f")
+        assert list(FileWalk([root], list_dir=index.list_dir)) == list(FileWalk([root]))
+        assert index.dir_misses == misses + 1
+        index.close()
+
+
+if __name__ == "__main__":
+    test_walk_filters()
+    test_glob_segments()
+    test_lazy_walk_streams_paths()
+    test_changed_only_emits_changes_since_last_success()
+    test_index_serves_unchanged_listing()
+    print("✅ 文件夹输入节点测试通过")
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+测试图像处理节点
+"""
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from workflows.cache import ImageCache
+from workflows.events import EventBus
+from workflows.nodes.ImageProcessor import ImageProcessor, downscale_image, render_watermark_tile
+
+
+def _make_node(mode, output_folder, bus=None, **inputs):
+    inputs_values = {key: {"type": "constant", "content": value} for key, value in inputs.items()}
+    inputs_values["outputFolder"] = {"type": "constant", "content": output_folder}
+    data = {"mode": mode, "inputsValues": inputs_values}
+    return ImageProcessor("img_test", "img-processor", [("next_id", "end")], bus or EventBus(), data)
+
+
+def test_fast_downscale_uses_draft():
+    """JPEG 大幅缩小时先按 DCT 缩放解码，输出尺寸准确"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.jpg")
+        Image.new("RGB", (2400, 1600), (10, 120, 200)).save(path)
+
+        with Image.open(path) as image:
+            small = downscale_image(image, (150, 100))
+            # draft 生效后解码尺寸小于原图
+            assert image.size[0] < 2400
+        assert small.size == (150, 100)
+
+        result = _make_node("resize", tmp, inputFile=path, width=300, height=300,
+                            maintainAspectRatio=True, outputName="resized").run()
+        assert (result["width"], result["height"]) == (300, 200)
+
+
+def test_thumbnail_folder():
+    """缩略图模式遍历文件夹，保留相对路径并限制长边"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "photos")
+        os.makedirs(os.path.join(source, "sub"))
+        Image.new("RGB", (800, 400)).save(os.path.join(source, "a.jpg"))
+        Image.new("RGBA", (300, 900)).save(os.path.join(source, "sub", "b.png"))
+        with open(os.path.join(source, "notes.txt"), "w") as f:
+            f.write("not an image")
+
+        result = _make_node("thumbnail", tmp, inputFolder=source, maxSize=100, recursive=True,
+                            outputName="thumbs").run()
+        assert result["count"] == 2
+        with Image.open(os.path.join(tmp, "thumbs", "a.jpg")) as thumb:
+            assert thumb.size == (100, 50)
+        with Image.open(os.path.join(tmp, "thumbs", "sub", "b.png")) as thumb:
+            assert thumb.size == (33, 100)
+
+
+def test_watermark_tile_cached():
+    """批量水印复用缓存的水印图块，只修改文本包围盒内的像素"""
+    with tempfile.TemporaryDirectory() as tmp:
+        render_watermark_tile.cache_clear()
+        for i in range(3):
+            path = os.path.join(tmp, f"p{i}.png")
+            Image.new("RGB", (400, 300), (255, 255, 255)).save(path)
+            result = _make_node("watermark", tmp, inputFile=path, watermarkText="SAMPLE", fontSize=24,
+                                opacity=50, position="topLeft", outputName=f"wm{i}").run()
+        assert render_watermark_tile.cache_info().misses == 1
+        assert render_watermark_tile.cache_info().hits == 2
+
+        with Image.open(result["processedImage"]) as out:
+            assert out.mode == "RGB"
+            left, top, right, bottom = Image.eval(out.convert("L"), lambda v: 255 - v).getbbox()
+            # 半透明红色水印与白色背景混合
+            r, g, b = max(out.crop((left, top, right, bottom)).getdata(), key=lambda pixel: -pixel[1])
+            assert r == 255 and 100 < g < 255
+        assert left >= 10 and top >= 10
+        assert right < 200 and bottom < 60
+
+        # 带透明通道的图像仍按 alpha 合成后铺在白色背景上
+        path = os.path.join(tmp, "alpha.png")
+        Image.new("RGBA", (200, 100), (0, 0, 255, 0)).save(path)
+        result = _make_node("watermark", tmp, inputFile=path, watermarkText="SAMPLE", fontSize=24,
+                            opacity=100, position="center", outputName="wm_alpha").run()
+        with Image.open(result["processedImage"]) as out:
+            assert out.mode == "RGB" and out.getpixel((0, 0)) == (255, 255, 255)
+
+
+def test_image_cache_shared_between_nodes():
+    """同一运行中下游节点从缓存读取上游写出的无损中间结果，超限时按 LRU 淘汰"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "src.png")
+        Image.new("RGB", (200, 100), (0, 255, 0)).save(path)
+        cache = ImageCache(max_bytes=200 * 100 * 3 * 2)
+        bus = EventBus()
+        bus.on("getImageCache", lambda: cache)
+
+        rotated = _make_node("rotate", tmp, bus=bus, inputFile=path, angle=90, outputName="rot").run()
+        assert cache.stats()["misses"] == 1
+        cropped = _make_node("crop", tmp, bus=bus, inputFile=rotated["processedImage"],
+                             x=0, y=0, width=50, height=50, outputName="crop").run()
+        assert cache.stats()["hits"] == 1
+        assert (cropped["width"], cropped["height"]) == (50, 50)
+
+        # 源图、旋转结果、裁剪结果合计超过上限，最早的源图被淘汰
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["bytes"] <= stats["maxBytes"]
+        assert cache.get(path) is None
+
+
+if __name__ == "__main__":
+    test_fast_downscale_uses_draft()
+    test_thumbnail_folder()
+    test_watermark_tile_cached()
+    test_image_cache_shared_between_nodes()
+    print("✅ 图像处理节点测试通过")
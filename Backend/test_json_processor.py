@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+测试JSON处理节点
+"""
+import io
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from workflows.events import EventBus
+from workflows.jsondiff import apply_patch, json_diff, patch_to_differences
+from workflows.jsonstream import JSONStreamReader, parse_stream_path
+from workflows.nodes.JSON import JSONProcessor, compile_jsonpath, get_validator
+
+
+def _make_node(mode, **inputs):
+    inputs_values = {key: {"type": "constant", "content": value} for key, value in inputs.items()}
+    return JSONProcessor("json_test", "json-processor", [("next_id", "end")], EventBus(),
+                         {"mode": mode, "inputsValues": inputs_values})
+
+
+def test_compiled_caches_reused():
+    """JSONPath 与校验器按表达式、规范化 Schema 缓存"""
+    assert compile_jsonpath("$.a.b") is compile_jsonpath("$.a.b")
+    schema_a = {"type": "object", "properties": {"x": {"type": "integer"}}}
+    schema_b = {"properties": {"x": {"type": "integer"}}, "type": "object"}
+    assert get_validator(schema_a) is get_validator(schema_b)
+
+
+def test_validate_reports_all_errors():
+    schema = {
+        "type": "object",
+        "properties": {"name": {"type": "string"}, "age": {"type": "integer"}},
+        "required": ["name", "age", "email"]
+    }
+    data = {"name": 1, "age": "x"}
+    result = _make_node("validate", inputData=json.dumps(data), schema=json.dumps(schema)).run()
+    assert result["isValid"] is False
+    assert len(result["errors"]) == 3
+    assert any(error.startswith("$.age:") for error in result["errors"])
+
+
+def test_stream_reader_small_chunks():
+    """块边界落在数字、字符串和转义中间时结果与整体解析一致"""
+    doc = {"meta": {"skip": [1, {"s": "x]}\\\"{"}], "n": -2.5e3}, "data": {"items": [{"id": i, "name": f"名字{i}"} for i in range(20)]}}
+    text = json.dumps(doc, ensure_ascii=False)
+    steps, remainder = parse_stream_path("$.data.items[*].name")
+    assert remainder == "$.name"
+    for chunk in (1, 3, 7):
+        items = list(JSONStreamReader(io.StringIO(text), chunk_chars=chunk).iter_path(steps))
+        assert items == doc["data"]["items"]
+        assert list(JSONStreamReader(io.StringIO(text), chunk_chars=chunk).iter_path(["meta", "n"])) == [-2500.0]
+
+
+def test_stream_query_json_and_jsonl():
+    with tempfile.TemporaryDirectory() as tmp:
+        json_file = os.path.join(tmp, "big.json")
+        with open(json_file, "w", encoding="utf-8") as f:
+            json.dump({"data": {"items": [{"id": i, "level": "error" if i % 3 == 0 else "info"} for i in range(30)]}}, f)
+        result = _make_node("streamQuery", inputFile=json_file, path="$.data.items[*].id",
+                            filter='level == "error"').run()
+        assert result["matchCount"] == 10 and result["scannedCount"] == 30
+        assert result["results"] == list(range(0, 30, 3))
+
+        jsonl_file = os.path.join(tmp, "log.jsonl")
+        with open(jsonl_file, "w", encoding="utf-8") as f:
+            for i in range(30):
+                f.write(json.dumps({"id": i, "user": {"age": i}}) + "\n")
+        result = _make_node("streamQuery", inputFile=jsonl_file, filter="user.age >= 25",
+                            outputFolder=tmp, outputName="matched.jsonl").run()
+        assert result["matchCount"] == 5 and result["results"] is None
+        with open(result["filePath"], encoding="utf-8") as f:
+            assert [json.loads(line)["id"] for line in f] == [25, 26, 27, 28, 29]
+
+
+def test_diff_aligns_lists():
+    """数组开头插入一个元素只产生一条 add，补丁可以还原出新文档"""
+    first = {"services": [{"id": i, "replicas": 1} for i in range(50)]}
+    second = {"services": [{"id": -1, "replicas": 1}] + [{"id": i, "replicas": 1} for i in range(50)]}
+    second["services"][10]["replicas"] = 3
+    for key_field in ("", "id"):
+        result = _make_node("diff", inputData=json.dumps(first), compareData=json.dumps(second), keyField=key_field).run()
+        assert result["patch"] == [
+            {"op": "add", "path": "/services/0", "value": {"id": -1, "replicas": 1}},
+            {"op": "replace", "path": "/services/10/replicas", "value": 3}
+        ]
+        assert result["differences"][1] == {"path": "services[10].replicas", "type": "value_different",
+                                            "first_value": 1, "second_value": 3}
+        assert apply_patch(first, result["patch"]) == second
+
+    keyed = json_diff([{"id": 1, "v": 1}, {"id": 2, "v": 2}], [{"id": 2, "v": 2}, {"id": 1, "v": 5}], key_field="id")
+    assert apply_patch([{"id": 1, "v": 1}, {"id": 2, "v": 2}], keyed) == [{"id": 2, "v": 2}, {"id": 1, "v": 5}]
+
+
+def test_differences_follow_container_types():
+    """纯数字的对象键仍写作 .键，只有数组元素写作 [下标]"""
+    first = {"ports": {"80": "http"}, "rows": [{"a": 1}, {"0": "x"}]}
+    second = {"ports": {"80": "https"}, "rows": [{"0": "y"}]}
+    patch = json_diff(first, second, include_old=True)
+    assert apply_patch(first, patch) == second
+    paths = [(item["type"], item["path"]) for item in patch_to_differences(patch, first)]
+    assert ("value_different", "ports.80") in paths
+    assert ("missing_in_first", "rows[0].0") in paths
+    assert ("missing_in_second", "rows[1]") in paths
+
+    # 根节点类型不同会替换，容器内部 true 与 1 按 == 视为相等
+    assert json_diff(True, 1) == [{"op": "replace", "path": "", "value": 1}]
+    assert json_diff({"flags": [True, 1.0]}, {"flags": [1, 1]}) == []
+
+
+if __name__ == "__main__":
+    test_compiled_caches_reused()
+    test_validate_reports_all_errors()
+    test_stream_reader_small_chunks()
+    test_stream_query_json_and_jsonl()
+    test_diff_aligns_lists()
+    test_differences_follow_container_types()
+    print("✅ JSON处理节点测试通过")
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+测试 Markdown 处理节点与共享的文档模型缓存
+"""
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from workflows.cache import get_markdown_cache
+from workflows.events import EventBus
+from workflows.nodes.MarkdownProcessor import MarkdownProcessor
+
+SAMPLE = """---
+title: 示例
+---
+# 标题
+正文
+
+## 第一节
+```python
+# 代码中的注释
+print(1)
+```
+### 小节
+## 第二节
+"""
+
+
+def _make_node(mode, **inputs):
+    inputs_values = {key: {"type": "constant", "content": value} for key, value in inputs.items()}
+    return MarkdownProcessor("md_test", "markdown-processor", [("next_id", "end")], EventBus(),
+                             {"mode": mode, "inputsValues": inputs_values})
+
+
+def test_document_parsed_once_across_modes():
+    cache = get_markdown_cache()
+    cache.clear()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "doc.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(SAMPLE)
+        misses = cache.misses
+
+        toc = _make_node("toc", inputFile=path).run()
+        assert toc["tableOfContents"] == ["# 标题", "## 第一节", "### 小节", "## 第二节"]
+        tree = toc["headingTree"]
+        assert [child["title"] for child in tree[0]["children"]] == ["第一节", "第二节"]
+        assert tree[0]["children"][0]["children"][0]["title"] == "小节"
+
+        meta = _make_node("frontMatter", inputFile=path).run()
+        assert meta["metadata"] == {"title": "示例"}
+        _make_node("lint", inputFile=path).run()
+        converted = _make_node("convert", inputFile=path, outputFolder=tmp, outputName="doc").run()
+        with open(converted["convertedFile"], encoding="utf-8") as f:
+            html = f.read()
+        assert "<h1>标题</h1>" in html and "title: 示例" not in html
+        assert cache.misses == misses + 1
+
+        # 节点改写文件后缓存失效
+        _make_node("frontMatter", inputFile=path, frontMatter="author: 张三").run()
+        meta = _make_node("frontMatter", inputFile=path).run()
+        assert meta["metadata"] == {"title": "示例", "author": "张三"}
+        assert cache.misses == misses + 2
+
+
+def test_batch_convert_skips_up_to_date():
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = []
+        for relative in ("index.md", "guide/intro.md", "guide/usage.md"):
+            path = os.path.join(tmp, "docs", relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"# {relative}\n")
+            sources.append(path)
+        output = os.path.join(tmp, "site")
+
+        result = _make_node("batchConvert", inputFiles="\n".join(sources), outputFolder=output, workers="2").run()
+        assert result["convertedCount"] == 3 and result["failedCount"] == 0
+        assert os.path.exists(os.path.join(output, "guide", "intro.html"))
+
+        result = _make_node("batchConvert", inputFiles=sources, outputFolder=output).run()
+        assert result["skippedCount"] == 3
+
+        stat = os.stat(result["summary"][1]["outputFile"])
+        os.utime(sources[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        result = _make_node("batchConvert", inputFiles=sources, outputFolder=output).run()
+        assert [row["status"] for row in result["summary"]] == ["skipped", "converted", "skipped"]
+
+
+def test_append_uses_encoding_of_whole_file():
+    """文件前 64KB 全是 ASCII 时，追加仍要沿用后文实际使用的编码"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "long.md")
+        with open(path, "wb") as f:
+            f.write(b"# title\n" + b"x" * (70 * 1024) + "\n中文段落\n".encode("gbk"))
+
+        _make_node("append", inputFile=path, content="追加的中文").run()
+        with open(path, "rb") as f:
+            text = f.read().decode("gbk")
+        assert text.endswith("中文段落\n\n追加的中文")
+        assert get_markdown_cache().load(path).encoding == "gbk"
+
+
+if __name__ == "__main__":
+    test_document_parsed_once_across_modes()
+    test_batch_convert_skips_up_to_date()
+    test_append_uses_encoding_of_whole_file()
+    print("✅ Markdown处理节点测试通过")
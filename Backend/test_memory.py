@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+测试节点输出的内存账本与运行级内存预算
+"""
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from workflows.Compiler import compile_workflow
+from workflows.Engine import WorkflowEngine
+from workflows.artifacts import Artifact
+from workflows.memory import MemoryAccount, MemoryBudgetExceeded, SpilledValue, parse_bytes
+
+
+class MockSocketIO:
+    def emit(self, *args, **kwargs):
+        pass
+
+    def sleep(self, seconds):
+        pass
+
+
+def _ref(node_id, port):
+    return {"type": "ref", "content": [node_id, port]}
+
+
+def _copy_workflow(tmp, rows=200, **settings):
+    """读取 CSV 全部行，再由下游节点写到新文件"""
+    source = os.path.join(tmp, "rows.csv")
+    with open(source, "w", encoding="utf-8") as f:
+        f.write("id,name\n" + "".join(f"{i},{'x' * 50}\n" for i in range(rows)))
+    workflow = {
+        "nodes": [
+            {"id": "start_0", "type": "start", "data": {}},
+            {"id": "csv_1", "type": "csv-processor", "data": {"mode": "filter", "inputsValues": {
+                "inputFile": {"type": "constant", "content": source},
+                "column": {"type": "constant", "content": "id"},
+                "condition": {"type": "constant", "content": "greater than"},
+                "value": {"type": "constant", "content": "-1"},
+                "outputFolder": {"type": "constant", "content": tmp},
+                "outputName": {"type": "constant", "content": "all"}}}},
+            {"id": "csv_2", "type": "csv-processor", "data": {"mode": "write", "inputsValues": {
+                "rows": _ref("csv_1", "filteredData"),
+                "outputFolder": {"type": "constant", "content": tmp},
+                "outputName": {"type": "constant", "content": "copy"}}}},
+            {"id": "end_3", "type": "end", "data": {}}
+        ],
+        "edges": [
+            {"sourceNodeID": "start_0", "targetNodeID": "csv_1"},
+            {"sourceNodeID": "csv_1", "targetNodeID": "csv_2"},
+            {"sourceNodeID": "csv_2", "targetNodeID": "end_3"}
+        ]
+    }
+    workflow.update(settings)
+    return workflow
+
+
+def test_parse_bytes_and_spilled_value():
+    assert parse_bytes(None) is None and parse_bytes("") is None and parse_bytes(0) is None
+    assert parse_bytes(2048) == 2048
+    assert parse_bytes("512KB") == 512 * 1024
+    assert parse_bytes("1.5 g") == int(1.5 * 1024 ** 3)
+    try:
+        parse_bytes("lots")
+        assert False, "无法识别的字节数应报错"
+    except ValueError:
+        pass
+
+    for value in ["文本" * 1000, b"\x00\x01" * 1000, [{"id": i, "name": "x" * 10} for i in range(100)]]:
+        spilled = SpilledValue("test", value)
+        assert spilled.artifact.spilled and spilled.size > 0
+        assert spilled.load() == value
+        spilled.release()
+
+
+def test_outputs_holding_artifacts_are_not_spilled():
+    """包含 Artifact 的输出不转存：pickle 的副本与原对象共用溢出文件，原对象回收后文件会被删除"""
+    try:
+        SpilledValue("n.out", [Artifact("x.txt", b"hello" * 10, spill_bytes=4)])
+        assert False, "包含 Artifact 的值不能转存"
+    except TypeError:
+        pass
+
+    class Holder:
+        def __init__(self, messages):
+            self.MessageList = messages
+
+    artifact = Artifact("x.txt", b"hello" * 10, spill_bytes=4)
+    messages = {"files": [artifact], "rows": [{"id": i} for i in range(100)]}
+    account = MemoryAccount(budget_bytes=100, spill_min_bytes=0)
+    for port, value in messages.items():
+        account.measure("n", port, value)
+    try:
+        account.enforce({"n": Holder(messages)}, "n")
+        assert False, "只有产物列表留在内存中时仍超出预算"
+    except MemoryBudgetExceeded:
+        pass
+    assert isinstance(messages["rows"], SpilledValue)
+    assert messages["files"] == [artifact]
+    assert messages["files"][0].read_bytes() == b"hello" * 10
+
+
+def test_budget_spills_outputs():
+    """超出预算时最大的输出转存到磁盘，下游节点仍能读到原值"""
+    with tempfile.TemporaryDirectory() as tmp:
+        workflow = _copy_workflow(tmp, memoryBudget="4KB", traceMemory=True)
+        engine = WorkflowEngine(compile_workflow(workflow), MockSocketIO())
+        engine.memory.spill_min_bytes = 0
+        spilled = {}
+        engine.bus.on("node_status_change", lambda data: spilled.update(
+            {"csv_1": engine.instance["csv_1"].MessageList.get("filteredData")})
+            if data["status"] == "PROCESSING" and data["nodeId"] == "csv_2" else None)
+        assert engine.run()[0]
+        assert isinstance(spilled["csv_1"], SpilledValue)
+        with open(os.path.join(tmp, "copy.csv"), encoding="utf-8") as f:
+            assert len(f.read().splitlines()) == 201
+
+        info = engine.get_memory_usage_info()
+        report = info["outputs"]
+        assert report["budgetBytes"] == 4096 and report["policy"] == "spill"
+        assert report["spilledOutputs"] == 1 and report["spilledBytes"] > 200 * 50
+        # 峰值包含转存前节点刚产生的输出
+        assert report["peakBytes"] > 200 * 50 and report["liveBytes"] == 0
+        nodes = info["nodes"]
+        assert nodes["csv_1"]["runs"] == 1 and nodes["csv_1"]["spilledBytes"] == report["spilledBytes"]
+        assert nodes["csv_1"]["peakAllocatedBytes"] > 0
+
+
+def test_budget_fail_policy():
+    """fail 策略下超出预算立即终止运行"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = WorkflowEngine(_copy_workflow(tmp, memoryBudget=4096, memoryPolicy="fail"), MockSocketIO())
+        statuses = []
+        engine.bus.on("node_status_change", lambda data: statuses.append((data["nodeId"], data["status"])))
+        try:
+            engine.run()
+            assert False, "超出预算应终止运行"
+        except MemoryBudgetExceeded as e:
+            assert "csv_1" in str(e)
+        # 超出预算的节点只报告 FAILED，不先报告 SUCCEEDED
+        assert [status for node_id, status in statuses if node_id == "csv_1"] == ["PROCESSING", "FAILED"]
+        assert not os.path.exists(os.path.join(tmp, "copy.csv"))
+
+    account = MemoryAccount(budget_bytes=100, spill_min_bytes=10 ** 9)
+    account.measure("node", "data", "x" * 1000)
+    try:
+        account.enforce({}, "node")
+        assert False, "没有可转存的输出时应报错"
+    except MemoryBudgetExceeded:
+        pass
+
+
+if __name__ == "__main__":
+    test_parse_bytes_and_spilled_value()
+    test_outputs_holding_artifacts_are_not_spilled()
+    test_budget_spills_outputs()
+    test_budget_fail_policy()
+    print("✅ 内存预算测试通过")
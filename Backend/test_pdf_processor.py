@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+测试PDF处理节点
+"""
+import io
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# 页面缓存写入临时目录，避免测试污染用户缓存
+os.environ.setdefault("THRYVE_CACHE_DIR", tempfile.mkdtemp(prefix="thryve_cache_"))
+
+import fitz
+from PIL import Image
+
+from workflows.cache import PageCache, get_page_cache
+from workflows.events import EventBus
+from workflows.nodes.PdfProcessor import PdfProcessor, _extract_pages_worker
+from workflows.streams import Stream
+
+# workflows.nodes 导出了同名的类，模块本身从 sys.modules 获取
+pdf_module = sys.modules[PdfProcessor.__module__]
+
+
+def _make_pdf(path, page_count=40, with_logo=True):
+    """生成测试PDF：每页一行文本，可选每页引用同一张图片"""
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), (255, 0, 0)).save(buf, "PNG")
+    doc = fitz.open()
+    xref = 0
+    for i in range(page_count):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"page {i + 1}")
+        if with_logo:
+            xref = page.insert_image(fitz.Rect(100, 100, 200, 200), stream=buf.getvalue(), xref=xref)
+    doc.save(path)
+    doc.close()
+
+
+def _make_node(mode, output_folder, bus=None, **inputs):
+    inputs_values = {key: {"type": "constant", "content": value} for key, value in inputs.items()}
+    inputs_values["outputFolder"] = {"type": "constant", "content": output_folder}
+    data = {"mode": mode, "inputsValues": inputs_values}
+    return PdfProcessor("pdf_test", "pdf-processor", [("next_id", "end")], bus or EventBus(), data)
+
+
+def test_parallel_extract_matches_serial():
+    """并行提取的文本与图片数量与串行一致，且文本按页序写出"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, "in.pdf")
+        _make_pdf(pdf)
+
+        serial = _make_node("extract", tmp, inputFile=pdf, extractImages=True, outputName="serial").run()
+        parallel = _make_node("extract", tmp, inputFile=pdf, extractImages=True, outputName="parallel",
+                              parallel=True, workers=2).run()
+
+        assert parallel["text"] == serial["text"]
+        with open(parallel["textFile"], "r", encoding="utf-8") as f:
+            assert f.read() == serial["text"]
+        assert len(parallel["images"]) == len(serial["images"])
+
+        # 完整文本只保存在内存产物中，text 输出为开头的预览
+        preview_chars = pdf_module.TEXT_PREVIEW_CHARS
+        pdf_module.TEXT_PREVIEW_CHARS = 20
+        try:
+            in_memory = _make_node("extract", tmp, inputFile=pdf, outputName="memory",
+                                   parallel=True, workers=2, inMemory=True).run()
+        finally:
+            pdf_module.TEXT_PREVIEW_CHARS = preview_chars
+        assert in_memory["textFile"].read_text() == serial["text"]
+        assert in_memory["text"] == serial["text"][:20]
+
+
+def test_extract_worker_without_owners():
+    """未指定图片归属时每页保存自己引用的图片"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, "in.pdf")
+        _make_pdf(pdf, page_count=3)
+        results = _extract_pages_worker(pdf, [0, 1, 2], tmp, True)
+        assert [len(saved) for _, saved in results] == [1, 1, 1]
+        assert results[2][0].strip() == "page 3"
+
+def test_parallel_extract_uses_page_cache():
+    """并行提取先读页面缓存，只把未命中的页面交给工作进程"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, "in.pdf")
+        _make_pdf(pdf, page_count=40, with_logo=False)
+        cache = get_page_cache()
+
+        first = _make_node("extract", tmp, inputFile=pdf, outputName="first", parallel=True, workers=2, useCache=True).run()
+        hits_before = cache.hits
+        bus = EventBus()
+        messages = []
+        bus.on("message", lambda level, node_id, text: messages.append(text))
+        second = _make_node("extract", tmp, bus, inputFile=pdf, outputName="second", parallel=True, workers=2, useCache=True).run()
+        assert second["text"] == first["text"]
+        assert cache.hits - hits_before >= 40
+        # 全部命中时不启动工作进程
+        assert not any(text.startswith("并行提取") for text in messages)
+
+
+def test_shared_image_deduplicated():
+    """每页引用的同一张图片只保存、压缩一次"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, "in.pdf")
+        _make_pdf(pdf, page_count=20)
+
+        extracted = _make_node("extract", tmp, inputFile=pdf, extractImages=True, outputName="dedup").run()
+        assert extracted["uniqueImageCount"] == 1
+        assert extracted["imageReferenceCount"] == 20
+        assert len(extracted["images"]) == 1
+
+        compressed = _make_node("compress", tmp, inputFile=pdf, quality="low", outputName="small").run()
+        assert compressed["uniqueImageCount"] == 1
+        assert compressed["imageReferenceCount"] == 20
+        doc = fitz.open(compressed["outputFile"])
+        assert doc.page_count == 20
+        assert len({img[0] for page in doc for img in page.get_images()}) == 1
+        doc.close()
+
+
+
+def test_parallel_render_thumbnails():
+    """并行渲染缩略图：逐页发送进度，输出文件与页序一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, "in.pdf")
+        _make_pdf(pdf, page_count=6)
+        bus = EventBus()
+        progress = []
+        bus.on("node_progress", lambda event: progress.append(event["current"]))
+
+        result = _make_node("convert", tmp, bus=bus, inputFile=pdf, outputFormat="png", outputName="deck",
+                            preset="thumbnail", parallel=True, workers=2).run()
+
+        assert progress == list(range(1, 7))
+        assert [os.path.basename(path) for path in result["outputFiles"]] == \
+            [f"deck_thumb_page_{i}.png" for i in range(1, 7)]
+        with Image.open(result["outputFiles"][0]) as thumb:
+            # A4/Letter 页面在 36 DPI 下宽度约为 300 像素
+            assert thumb.width < 320
+
+
+
+def test_page_cache_serves_repeated_runs():
+    """同一文档再次提取时从页面缓存返回，结果一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, "in.pdf")
+        _make_pdf(pdf, page_count=5, with_logo=False)
+        cache = get_page_cache()
+
+        first = _make_node("extract", tmp, inputFile=pdf, outputName="first", useCache=True).run()
+        hits_before = cache.hits
+        second = _make_node("extract", tmp, inputFile=pdf, outputName="second", useCache=True).run()
+        assert second["text"] == first["text"]
+        assert cache.hits - hits_before >= 5
+
+        # 未开启 useCache 时不读写缓存
+        hits_before = cache.hits
+        _make_node("extract", tmp, inputFile=pdf, outputName="third").run()
+        assert cache.hits == hits_before
+
+        converted = _make_node("convert", tmp, inputFile=pdf, outputFormat="text", outputName="pages", useCache=True).run()
+        with open(converted["outputFiles"][0], "r", encoding="utf-8") as f:
+            assert f.read() == first["text"].split("\n")[0] + "\n"
+
+
+def test_page_cache_eviction():
+    """超过容量上限时淘汰最久未访问的记录"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PageCache(os.path.join(tmp, "pages.sqlite3"), max_bytes=1000)
+        cache.put_many("a" * 64, {i: "x" * 100 for i in range(5)}, "text")
+        cache.get("a" * 64, 0, "text")
+        cache.put_many("b" * 64, {i: "y" * 100 for i in range(10)}, "text")
+        assert cache.stats()["bytes"] <= 1000
+        assert cache.get("b" * 64, 9, "text") == "y" * 100
+        cache.close()
+
+
+def test_watermark_template_shared():
+    """同尺寸页面共用一个水印模板；批量模式为每个输入文件生成输出"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, "in.pdf")
+        _make_pdf(pdf, page_count=10, with_logo=False)
+
+        result = _make_node("watermark", tmp, inputFile=pdf, watermarkText="机密", outputName="wm").run()
+        doc = fitz.open(result["outputFile"])
+        # 每页只有一个轻量包装 XObject，引用的水印内容 XObject 全文档共享
+        shared = {xref for page in doc for xref, name, ref, _ in page.get_xobjects() if ref}
+        assert doc.page_count == 10
+        assert len(shared) == 1
+        doc.close()
+
+        other = os.path.join(tmp, "other.pdf")
+        _make_pdf(other, page_count=3, with_logo=False)
+        batch = _make_node("watermark", tmp, inputFiles=[pdf, other], watermarkText="机密",
+                           outputName="batch", workers=2).run()
+        assert batch["fileCount"] == 2
+        assert batch["pageCount"] == 13
+        assert all(os.path.exists(path) for path in batch["outputFiles"])
+
+
+def test_merge_counts_pages_and_deduplicates():
+    """合并时直接累计页数，开启去重后多个输入共用的图片只保留一份"""
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = []
+        for i in range(3):
+            path = os.path.join(tmp, f"part{i}.pdf")
+            _make_pdf(path, page_count=4)
+            inputs.append(path)
+
+        result = _make_node("merge", tmp, inputFiles=inputs, outputName="merged", deduplicate=True).run()
+        assert result["pageCount"] == 12
+        doc = fitz.open(result["outputFile"])
+        assert doc.page_count == 12
+        assert len({img[0] for page in doc for img in page.get_images()}) == 1
+        doc.close()
+
+
+def test_merge_accepts_streamed_inputs():
+    """引用上游的惰性文件流时先展开为列表，再排序合并"""
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = []
+        for i in range(3):
+            path = os.path.join(tmp, f"part{i}.pdf")
+            _make_pdf(path, page_count=i + 1, with_logo=False)
+            inputs.append(path)
+
+        bus = EventBus()
+        bus.on("askMessage", lambda node_id, port: Stream(list(reversed(inputs))))
+        node = _make_node("merge", tmp, bus, outputName="merged")
+        node.data["inputsValues"]["inputFiles"] = {"type": "ref", "content": ["folder_1", "files"]}
+        result = node.run()
+        assert result["pageCount"] == 6
+        with fitz.open(result["outputFile"]) as doc:
+            assert [page.get_text().strip() for page in doc] == \
+                ["page 1", "page 1", "page 2", "page 1", "page 2", "page 3"]
+
+
+if __name__ == "__main__":
+    test_parallel_extract_matches_serial()
+    test_extract_worker_without_owners()
+    test_parallel_extract_uses_page_cache()
+    test_shared_image_deduplicated()
+    test_parallel_render_thumbnails()
+    test_page_cache_serves_repeated_runs()
+    test_page_cache_eviction()
+    test_watermark_template_shared()
+    test_merge_counts_pages_and_deduplicates()
+    test_merge_accepts_streamed_inputs()
+    print("✅ PDF处理节点测试通过")
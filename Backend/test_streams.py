@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+测试节点之间的惰性数据流
+"""
+import csv
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from workflows.Engine import WorkflowEngine
+from workflows.events import EventBus
+from workflows.nodes.CSV import CSVProcessor
+from workflows.streams import Stream, StreamError, as_stream, materialize
+
+
+class MockSocketIO:
+    def emit(self, *args, **kwargs):
+        pass
+
+    def sleep(self, seconds):
+        pass
+
+
+def _write_rows(path, count):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "score"])
+        for i in range(count):
+            writer.writerow([i, i % 10])
+
+
+def test_prefetch_is_bounded():
+    produced = []
+
+    def source():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    stream = Stream(source, buffer_size=4)
+    consumed = 0
+    for item in stream:
+        assert item == consumed
+        consumed += 1
+        time.sleep(0.001)
+        # 生产方最多领先缓冲区大小加上正在等待放入的一项
+        assert len(produced) - consumed <= 4 + 1
+    assert consumed == 100 and stream.produced == 100
+    # 来源是函数时可以重复迭代
+    assert stream.to_list() == list(range(100))
+
+
+def test_errors_and_early_stop():
+    def failing():
+        yield 1
+        raise ValueError("boom")
+
+    try:
+        list(Stream(failing, buffer_size=2))
+        assert False, "生产方的异常应传给消费方"
+    except ValueError as e:
+        assert str(e) == "boom"
+
+    # 消费方提前停止后生产线程退出
+    before = threading.active_count()
+    iterator = iter(Stream(lambda: iter(range(10 ** 9)), buffer_size=2))
+    assert next(iterator) == 0
+    iterator.close()
+    time.sleep(0.3)
+    assert threading.active_count() <= before
+
+    once = Stream(iter([1, 2, 3]))
+    assert once.to_list() == [1, 2, 3]
+    try:
+        once.to_list()
+        assert False, "一次性迭代器不能重复消费"
+    except StreamError:
+        pass
+
+    assert as_stream([1, 2, 3]).map(lambda x: x * 2).filter(lambda x: x > 2).to_list() == [4, 6]
+    assert Stream(range(5)).batched(2).to_list() == [[0, 1], [2, 3], [4]]
+    assert materialize(Stream(range(3))) == [0, 1, 2]
+    assert materialize("abc") == "abc"
+
+
+def test_csv_stream_to_write():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "rows.csv")
+        _write_rows(source, 1000)
+        bus = EventBus()
+        reader = CSVProcessor("csv_stream", "csv-processor", [("next_id", "csv_write")], bus, {
+            "mode": "stream",
+            "inputsValues": {
+                "inputFile": {"type": "constant", "content": source},
+                "column": {"type": "constant", "content": "score"},
+                "condition": {"type": "constant", "content": "equals"},
+                "value": {"type": "constant", "content": "3"},
+                "bufferSize": {"type": "constant", "content": "8"}
+            }
+        })
+        nodes = {"csv_stream": reader}
+        bus.on("askMessage", lambda node_id, port: nodes[node_id].getMessage(port))
+        output = reader.run()
+        assert isinstance(output["rows"], Stream)
+        assert output["columns"] == ["id", "score"]
+
+        writer = CSVProcessor("csv_write", "csv-processor", [("next_id", "end")], bus, {
+            "mode": "write",
+            "inputsValues": {
+                "rows": {"type": "ref", "content": ["csv_stream", "rows"]},
+                "outputFolder": {"type": "constant", "content": tmp},
+                "outputName": {"type": "constant", "content": "threes"}
+            }
+        })
+        assert writer.run()["rowCount"] == 100
+        with open(os.path.join(tmp, "threes.csv"), encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 100 and all(row["score"] == "3" for row in rows)
+
+
+def test_loop_consumes_stream():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "rows.csv")
+        _write_rows(source, 50)
+        workflow = {
+            "nodes": [
+                {"id": "start_0", "type": "start", "data": {}},
+                {"id": "csv_1", "type": "csv-processor", "data": {
+                    "mode": "stream", "inputsValues": {"inputFile": {"type": "constant", "content": source}}}},
+                {"id": "loop_2", "type": "loop", "data": {
+                    "mode": "array", "bufferSize": 4, "batchFor": {"type": "ref", "content": ["csv_1", "rows"]}},
+                 "blocks": [
+                     {"id": "loop_start", "type": "start", "data": {}},
+                     {"id": "loop_print", "type": "print", "data": {
+                         "inputsValues": {"input": {"type": "ref", "content": ["loop_2", "item"]}}}},
+                     {"id": "loop_end", "type": "end", "data": {}}
+                 ],
+                 "edges": [
+                     {"sourceNodeID": "loop_start", "targetNodeID": "loop_print"},
+                     {"sourceNodeID": "loop_print", "targetNodeID": "loop_end"}
+                 ]},
+                {"id": "end_3", "type": "end", "data": {}}
+            ],
+            "edges": [
+                {"sourceNodeID": "start_0", "targetNodeID": "csv_1"},
+                {"sourceNodeID": "csv_1", "targetNodeID": "loop_2"},
+                {"sourceNodeID": "loop_2", "targetNodeID": "end_3"}
+            ]
+        }
+        engine = WorkflowEngine(workflow, MockSocketIO())
+        printed = []
+        engine.bus.on("nodes_output", lambda node_id, value: printed.append(value) if node_id == "loop_print" else None)
+        success, _ = engine.run()
+        assert success
+        assert len(printed) == 50 and "'id': '49'" in printed[-1]
+
+
+if __name__ == "__main__":
+    test_prefetch_is_bounded()
+    test_errors_and_early_stop()
+    test_csv_stream_to_write()
+    test_loop_consumes_stream()
+    print("✅ 数据流测试通过")
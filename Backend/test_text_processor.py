@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+测试文本处理节点
+"""
+import io
+import os
+import re
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from workflows.artifacts import Artifact
+from workflows.events import EventBus
+from workflows.nodes.TextProcessor import TextProcessor, stream_replace
+
+
+def _make_node(mode, output_folder, **inputs):
+    inputs_values = {key: {"type": "constant", "content": value} for key, value in inputs.items()}
+    inputs_values["outputFolder"] = {"type": "constant", "content": output_folder}
+    data = {"mode": mode, "inputsValues": inputs_values}
+    return TextProcessor("text_test", "text-processor", [("next_id", "end")], EventBus(), data)
+
+
+def test_stream_replace_matches_across_chunks():
+    """跨块边界的匹配、行首锚点与整体替换结果一致"""
+    text = "error: disk\nwarn: cpu\nerror: net\n" * 50
+    for pattern, replacement in [(r"^error", "ERR"), (r"(\w+): (\w+)", r"\2=\1"), (r"disk\nwarn", "X")]:
+        out = []
+        count = stream_replace(io.StringIO(text), out.append, re.compile(pattern, re.M), replacement,
+                               chunk_chars=7, overlap=12)
+        expected, expected_count = re.compile(pattern, re.M).subn(replacement, text)
+        assert "".join(out) == expected
+        assert count == expected_count
+
+
+
+def test_stream_replace_keeps_context_for_deferred_match():
+    """推迟的匹配正好从已写出位置开始时，下一块仍保留后顾断言所需的上下文"""
+    text = "yx" + "a" * 40 + "b" + "xa" * 5
+    for pattern in [r"(?<=x)a+", r"\ba+"]:
+        out = []
+        count = stream_replace(io.StringIO(text), out.append, re.compile(pattern), "-",
+                               chunk_chars=5, overlap=3)
+        expected, expected_count = re.compile(pattern).subn("-", text)
+        assert "".join(out) == expected
+        assert count == expected_count
+
+def test_streaming_replace_and_append():
+    """流式替换、追加与整体处理输出一致，保留原文件编码"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "log.txt")
+        with open(path, "w", encoding="gbk", newline="") as f:
+            f.write("状态: 正常\n" * 1000)
+
+        streamed = _make_node("replace", tmp, inputFile=path, searchText="正常", replaceText="异常",
+                              streaming=True, outputFileName="streamed").run()
+        whole = _make_node("replace", tmp, inputFile=path, searchText="正常", replaceText="异常",
+                           streaming=False, outputFileName="whole").run()
+        assert streamed["replacementCount"] == whole["replacementCount"] == 1000
+        assert streamed["outputEncoding"] == "gbk"
+        with open(streamed["outputFile"], "rb") as a, open(whole["outputFile"], "rb") as b:
+            assert a.read() == b.read()
+
+        appended = _make_node("append", tmp, inputFile=path, content="结束", streaming=True,
+                              outputFileName="appended").run()
+        with open(appended["outputFile"], "r", encoding="gbk") as f:
+            assert f.read().endswith("正常\n结束")
+
+
+def test_word_frequency_parallel_top_k():
+    """并行拆分统计与串行一致，只返回前 K 项，支持停用词和 n-gram"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "corpus.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(60000):
+                f.write(f"the quick fox {i % 7} jumps\n")
+
+        serial = _make_node("wordFreq", tmp, inputFile=path, topK=3, stopWords="the",
+                            outputFileName="serial").run()["statistics"]
+        parallel = _make_node("wordFreq", tmp, inputFile=path, topK=3, stopWords="the", parallel=True,
+                              workers=3, outputFileName="parallel").run()["statistics"]
+        assert parallel == serial
+        assert serial["totalWords"] == 60000 * 4
+        assert [item["word"] for item in serial["topWords"]] == ["fox", "jumps", "quick"]
+        assert len(serial["frequencies"]) == 3
+
+        other = os.path.join(tmp, "other.txt")
+        with open(other, "w", encoding="utf-8") as f:
+            f.write("quick fox quick fox")
+        bigrams = _make_node("wordFreq", tmp, inputFiles=[path, other], ngram=2, topK=1, parallel=True,
+                             outputFileName="bigrams").run()["statistics"]
+        assert bigrams["topWords"] == [{"word": "quick fox", "count": 60002}]
+
+
+def test_batch_replace_summary():
+    """批量模式并发处理文件列表，按模板命名输出，失败的文件记录在结果表中"""
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        for name in ("a", "b", "c"):
+            path = os.path.join(tmp, f"{name}.log")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("foo bar foo\n")
+            files.append(path)
+        files.append(os.path.join(tmp, "missing.log"))
+
+        out = os.path.join(tmp, "out")
+        result = _make_node("replace", out, batch=True, inputFiles=files, searchText="foo", replaceText="baz",
+                            outputTemplate="{stem}_clean", workers=2).run()
+
+        assert result["fileCount"] == 4
+        assert result["failedCount"] == 1
+        assert [os.path.basename(path) for path in result["outputFiles"]] == \
+            ["a_clean.log", "b_clean.log", "c_clean.log"]
+        assert [row.get("replacementCount") for row in result["summary"][:3]] == [2, 2, 2]
+        assert result["summary"][3]["status"] == "error"
+
+
+def test_batch_replace_with_artifact_inputs():
+    """内存产物在主进程中处理，溢出文件不会被工作进程删除；结果表记录产物的文件名"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "a.log")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("foo bar foo\n")
+        artifact = Artifact("notes.txt", b"foo foo foo\n", spill_bytes=4)
+        inputs = iter([path, artifact])
+
+        out = os.path.join(tmp, "out")
+        result = _make_node("replace", out, batch=True, inputFiles=inputs, searchText="foo", replaceText="baz",
+                            workers=2).run()
+
+        assert result["failedCount"] == 0
+        assert [row["inputFile"] for row in result["summary"]] == [path, "notes.txt"]
+        assert [row["replacementCount"] for row in result["summary"]] == [2, 3]
+        assert artifact.spilled and artifact.read_bytes() == b"foo foo foo\n"
+
+
+if __name__ == "__main__":
+    test_stream_replace_matches_across_chunks()
+    test_stream_replace_keeps_context_for_deferred_match()
+    test_streaming_replace_and_append()
+    test_word_frequency_parallel_top_k()
+    test_batch_replace_summary()
+    test_batch_replace_with_artifact_inputs()
+    print("✅ 文本处理节点测试通过")
@@ -0,0 +1,315 @@
+"""
+工作流编译与紧凑二进制格式
+
+将前端/后端 JSON 工作流预编译为执行计划（去除 meta、把 edges 折叠进每个节点的 next），
+并以带版本号的二进制格式保存，批处理或命令行工具加载保存的工作流时无需重复解析和转换 JSON。
+服务端运行的工作流由前端随请求发送，不经过这里的文件加载函数。
+"""
+import json
+import logging
+import os
+import pickle
+import struct
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 文件头：魔数 + 2字节大端序的 schema 版本号 + 源文件指纹（是否记录、大小、修改时间）
+# 版本历史：1 初始格式；2 执行计划增加 liveness 和运行级内存预算设置；3 源文件指纹移入文件头
+COMPILED_MAGIC = b"THRYVEWF"
+COMPILED_SCHEMA_VERSION = 3
+COMPILED_SUFFIX = ".twf"
+_HEADER = struct.Struct(">H")
+_SOURCE = struct.Struct(">?Qq")
+MEMORY_SETTINGS = ("memoryBudget", "memoryPolicy", "traceMemory")
+
+
+class CompiledWorkflowError(Exception):
+    """编译产物读写错误"""
+    pass
+
+
+def _strip_meta(node: Dict[str, Any]) -> Dict[str, Any]:
+    """移除节点及循环体内节点上仅供画布使用的 meta 信息"""
+    cleaned = {key: value for key, value in node.items() if key != 'meta'}
+    blocks = cleaned.get('blocks')
+    if isinstance(blocks, list):
+        cleaned['blocks'] = [_strip_meta(block) if isinstance(block, dict) else block for block in blocks]
+    return cleaned
+
+
+def prepare_nodes(workflow_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    准备节点和边数据：去除 meta，并根据 edges 生成每个节点的 next 列表。
+
+    Args:
+        workflow_data: 单个工作流数据，包含 nodes 和 edges
+
+    Returns:
+        以节点ID为键的节点字典，每个节点带有 next 列表
+    """
+    cleaned_nodes = {}
+    for node in workflow_data.get("nodes", []):
+        cleaned_node = {key: value for key, value in node.items() if key != 'meta'}
+        cleaned_nodes[node['id']] = cleaned_node
+
+    # 按源节点一次性分组边，保持边的原始顺序
+    outgoing: Dict[str, List[Dict[str, Any]]] = {}
+    for edge in workflow_data.get('edges', []):
+        outgoing.setdefault(edge.get('sourceNodeID'), []).append(edge)
+
+    for node in cleaned_nodes.values():
+        node['next'] = []
+        is_condition = node.get('type') == 'condition'
+        for edge in outgoing.get(node['id'], []):
+            target_node = cleaned_nodes.get(edge.get('targetNodeID'))
+            if target_node:
+                port = edge.get('sourcePortID') if is_condition else "next_id"
+                node['next'].append((port, target_node['id']))
+    return cleaned_nodes
+
+
+def _collect_refs(value: Any, refs: Set[Tuple[str, str]]):
+    """收集节点数据（包括循环体）中所有 {"type": "ref", "content": [节点, 属性]} 引用"""
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            content = item.get("content")
+            if item.get("type") == "ref" and isinstance(content, list) and len(content) >= 2:
+                node_id = content[0]
+                if isinstance(node_id, str) and isinstance(content[1], str):
+                    refs.add((node_id[:-7] if node_id.endswith("_locals") else node_id, content[1]))
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+
+
+def analyze_liveness(nodes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    节点输出的活跃性分析
+
+    节点引用的输出包括其数据和循环体中的全部 ref（循环体在循环节点执行期间运行，其引用计入循环节点）。
+    节点 N 执行后仍活跃的输出 = 从 N 的后继出发可达的所有节点（含条件分支和回边）引用的输出，
+    不在其中的输出此后不会再被读取，执行引擎在 N 执行完成后即可释放。
+
+    Returns:
+        {"liveOut": {节点ID: [[来源节点, 属性], ...]},
+         "lastUse": {"来源节点.属性": [执行后该输出不再活跃的引用节点, ...]}}
+    """
+    uses: Dict[str, Set[Tuple[str, str]]] = {}
+    for node_id, node in nodes.items():
+        refs: Set[Tuple[str, str]] = set()
+        _collect_refs(node.get("data"), refs)
+        _collect_refs(node.get("blocks"), refs)
+        # 只跟踪顶层节点的输出，循环体对循环节点自身（item）的引用不计入
+        uses[node_id] = {ref for ref in refs if ref[0] in nodes and ref[0] != node_id}
+
+    successors = {node_id: [target for _, target in node.get("next", []) if target in nodes]
+                  for node_id, node in nodes.items()}
+    live_out: Dict[str, List[List[str]]] = {}
+    last_use: Dict[str, List[str]] = {}
+    for node_id in nodes:
+        reachable: Set[str] = set()
+        stack = list(successors[node_id])
+        while stack:
+            current = stack.pop()
+            if current in reachable:
+                continue
+            reachable.add(current)
+            stack.extend(successors[current])
+        live = set()
+        for current in reachable:
+            live |= uses[current]
+        live_out[node_id] = sorted([list(ref) for ref in live])
+        for ref in uses[node_id] - live:
+            last_use.setdefault(f"{ref[0]}.{ref[1]}", []).append(node_id)
+    return {"liveOut": live_out, "lastUse": {key: sorted(value) for key, value in last_use.items()}}
+
+
+def compile_workflow(workflow_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将单个工作流编译为执行计划
+
+    Returns:
+        {"type", "name", "nodes", "compiled": True}，可直接交给 WorkflowEngine
+    """
+    nodes = prepare_nodes(workflow_data)
+    for node_id, node in nodes.items():
+        nodes[node_id] = _strip_meta(node)
+    plan = {
+        "type": workflow_data.get("type"),
+        "name": workflow_data.get("name"),
+        "nodes": nodes,
+        "liveness": analyze_liveness(nodes),
+        "compiled": True
+    }
+    # 运行级的内存预算设置原样保留
+    for key in MEMORY_SETTINGS:
+        if key in workflow_data:
+            plan[key] = workflow_data[key]
+    return plan
+
+
+def compile_workflows(source: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    编译任意受支持的工作流 JSON（前端格式、后端多工作流格式）
+
+    Returns:
+        {"workflows": {workflow_id: 执行计划}}，可直接传给 WorkflowManager.register_workflows
+    """
+    if 'workflows' not in source and 'nodes' in source and 'edges' in source:
+        # 与 app.py 保持一致：带 nodes 和 edges 的数据视为前端格式
+        from workflow_converter import convert_workflow_format
+        source = convert_workflow_format(source)
+
+    workflows = source.get("workflows")
+    if not isinstance(workflows, dict):
+        raise CompiledWorkflowError("无法识别的工作流格式：缺少 workflows 字段")
+
+    return {
+        "workflows": {
+            workflow_id: compile_workflow(data) for workflow_id, data in workflows.items()
+        }
+    }
+
+
+def source_fingerprint(path: str) -> Dict[str, int]:
+    """源文件指纹（大小 + 修改时间），用于判断编译产物是否过期"""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def save_compiled(compiled: Dict[str, Any], output_path: str, source_path: Optional[str] = None) -> str:
+    """
+    将编译结果写入紧凑二进制文件
+
+    Args:
+        compiled: compile_workflows 的返回值
+        output_path: 输出文件路径
+        source_path: 源 JSON 路径，用于记录指纹以便后续判断是否过期
+
+    Returns:
+        str: 写入的文件路径
+    """
+    source = source_fingerprint(source_path) if source_path else None
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # 先写临时文件再替换，避免并发加载读到半个文件
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(COMPILED_MAGIC)
+        f.write(_HEADER.pack(COMPILED_SCHEMA_VERSION))
+        f.write(_SOURCE.pack(source is not None, source["size"] if source else 0, source["mtime_ns"] if source else 0))
+        pickle.dump({"workflows": compiled["workflows"]}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, output_path)
+    return output_path
+
+
+def _read_header(f, path: str) -> Optional[Dict[str, int]]:
+    """
+    读取并校验文件头，返回记录的源文件指纹
+
+    Raises:
+        CompiledWorkflowError: 文件格式或 schema 版本不匹配时
+    """
+    magic = f.read(len(COMPILED_MAGIC))
+    if magic != COMPILED_MAGIC:
+        raise CompiledWorkflowError(f"{path} 不是有效的编译工作流文件")
+    header = f.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        raise CompiledWorkflowError(f"{path} 文件头不完整")
+    (version,) = _HEADER.unpack(header)
+    if version != COMPILED_SCHEMA_VERSION:
+        raise CompiledWorkflowError(
+            f"{path} 的 schema 版本为 {version}，当前支持 {COMPILED_SCHEMA_VERSION}，请重新编译")
+    source = f.read(_SOURCE.size)
+    if len(source) != _SOURCE.size:
+        raise CompiledWorkflowError(f"{path} 文件头不完整")
+    recorded, size, mtime_ns = _SOURCE.unpack(source)
+    return {"size": size, "mtime_ns": mtime_ns} if recorded else None
+
+
+def load_compiled(path: str) -> Dict[str, Any]:
+    """
+    加载编译产物
+
+    注意：产物使用 pickle 序列化，只应加载由本项目自身生成的可信文件。
+
+    Returns:
+        {"workflows": {...}, "source": 指纹或None}
+
+    Raises:
+        CompiledWorkflowError: 文件格式或 schema 版本不匹配时
+    """
+    with open(path, "rb") as f:
+        source = _read_header(f, path)
+        try:
+            payload = pickle.load(f)
+        except Exception as e:
+            raise CompiledWorkflowError(f"{path} 内容损坏: {str(e)}")
+    return {"workflows": payload["workflows"], "source": source}
+
+
+def compiled_path_for(source_path: str, output_dir: Optional[str] = None) -> str:
+    """根据源 JSON 路径生成编译产物路径"""
+    base = os.path.splitext(os.path.basename(source_path))[0] + COMPILED_SUFFIX
+    return os.path.join(output_dir or os.path.dirname(source_path), base)
+
+
+def is_stale(source_path: str, compiled_path: str) -> bool:
+    """判断编译产物是否已过期（不存在、版本不符或源文件已改变），只读取文件头，不反序列化执行计划"""
+    try:
+        with open(compiled_path, "rb") as f:
+            return _read_header(f, compiled_path) != source_fingerprint(source_path)
+    except (OSError, CompiledWorkflowError):
+        return True
+
+
+def compile_file(source_path: str, output_path: Optional[str] = None) -> str:
+    """读取 JSON 工作流文件并写出编译产物，返回产物路径"""
+    with open(source_path, "r", encoding="utf-8") as f:
+        source = json.load(f)
+    compiled = compile_workflows(source)
+    output_path = output_path or compiled_path_for(source_path)
+    save_compiled(compiled, output_path, source_path)
+    logger.info(f"已编译工作流 {source_path} -> {output_path}")
+    return output_path
+
+
+def load_workflow_file(source_path: str, cache_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    加载工作流：优先使用未过期的编译产物，否则重新编译并写入缓存
+
+    Returns:
+        {"workflows": {...}}
+    """
+    compiled_path = compiled_path_for(source_path, cache_dir)
+    if not is_stale(source_path, compiled_path):
+        try:
+            return {"workflows": load_compiled(compiled_path)["workflows"]}
+        except CompiledWorkflowError as e:
+            logger.warning(f"编译产物无法加载，重新编译: {str(e)}")
+    compile_file(source_path, compiled_path)
+    return {"workflows": load_compiled(compiled_path)["workflows"]}
+
+
+def load_compiled_directory(directory: str) -> Dict[str, Dict[str, Any]]:
+    """
+    批量加载目录下的所有编译产物
+
+    Returns:
+        {文件名(不含后缀): {"workflows": {...}}}，无法加载的文件会被记录并跳过
+    """
+    result = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file() or not entry.name.endswith(COMPILED_SUFFIX):
+                continue
+            try:
+                result[entry.name[:-len(COMPILED_SUFFIX)]] = {"workflows": load_compiled(entry.path)["workflows"]}
+            except CompiledWorkflowError as e:
+                logger.warning(f"跳过编译产物 {entry.path}: {str(e)}")
+    return result
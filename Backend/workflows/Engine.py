@@ -1,11 +1,19 @@
 import logging
-from typing import Optional, TYPE_CHECKING
+import os
+from typing import Callable, Dict, Optional, Set, Tuple, TYPE_CHECKING
 import threading
 from .Factory import NodeFactory
+from .Compiler import analyze_liveness, prepare_nodes
 from .events import EventBus
+from .cache import ImageCache
+from .artifacts import Artifact, DeferredRemoval, describe_artifacts
+from .memory import MemoryAccount, SpilledValue, walk_objects
 
 logger = logging.getLogger(__name__)
 
+# 是否在节点输出不再被引用后立即释放（设为 0 时保留到运行结束，便于排查问题）
+RELEASE_OUTPUTS = os.environ.get("THRYVE_RELEASE_OUTPUTS", "1") != "0"
+
 if TYPE_CHECKING:
     from .WorkflowManager import WorkflowManager
 
@@ -21,6 +29,22 @@ class WorkflowEngine:
         self.factory = NodeFactory(self.nodes, self.bus)
         self.backStack = []
         self.instance = {}
+        # 本次运行内各图像节点共享的已解码图像缓存
+        self.image_cache = ImageCache()
+
+        # 活跃性分析：每个节点执行后仍会被引用的输出，其余输出可以释放
+        liveness = workflowData.get("liveness") if workflowData.get("compiled") else None
+        self.liveness = liveness or analyze_liveness(self.nodes)
+        self._live_out: Dict[str, Set[Tuple[str, str]]] = {
+            node_id: {tuple(ref) for ref in refs} for node_id, refs in self.liveness["liveOut"].items()
+        }
+        self.release_outputs = RELEASE_OUTPUTS
+        # 节点输出的内存账本与本次运行的内存预算（memoryBudget / memoryPolicy / traceMemory）
+        self.memory = MemoryAccount.from_config(workflowData)
+        # 节点输出中 Artifact 的临时文件推迟到运行结束时删除，下游节点取得的路径在运行期间一直有效
+        self.artifact_files = DeferredRemoval()
+        # 节点注册的工作流成功结束回调（如提交文件快照），按节点 ID 保存
+        self._success_hooks: Dict[str, Callable[[], None]] = {}
         
         # 多工作流支持相关属性
         self.global_bus: Optional[EventBus] = None  # 全局事件总线，由WorkflowManager注入
@@ -49,33 +73,17 @@ class WorkflowEngine:
         self.bus.on("get_workflow_manager", self.get_workflow_manager)
         self.bus.on("nodes_output", self.nodes_output)
         self.bus.on("message", self.message)
+        self.bus.on("getImageCache", self.get_image_cache)
+        self.bus.on("registerSuccessHook", self.registerSuccessHook)
 
     def _prepare_nodes(self, workflowData):
         """
-        准备节点和边数据，与之前版本逻辑相同。
+        准备节点和边数据。已预编译的执行计划直接复用，否则现场编译。
         """
-        cleaned_nodes = {}
-        for node in workflowData.get("nodes", []):
-            cleaned_node = {key: value for key, value in node.items() if key != 'meta'}
-            cleaned_nodes[node['id']] = cleaned_node
-        
-        edges = workflowData.get('edges', [])
-        
-        for node in cleaned_nodes.values():
-            node['next'] = []
-            if node.get('type') == 'condition':
-                for edge in edges:
-                    if edge.get('sourceNodeID') == node['id']:
-                        target_node = cleaned_nodes.get(edge.get('targetNodeID'))
-                        if target_node:
-                            node['next'].append((edge.get('sourcePortID'), target_node['id']))
-            else:
-                for edge in edges:
-                    if edge.get('sourceNodeID') == node['id']:
-                        target_node = cleaned_nodes.get(edge.get('targetNodeID'))
-                        if target_node:
-                            node['next'].append(("next_id", target_node['id']))
-        return cleaned_nodes
+        if workflowData.get("compiled"):
+            # 执行过程中会向节点表追加循环体节点，这里复制一层避免污染共享的执行计划
+            return dict(workflowData["nodes"])
+        return prepare_nodes(workflowData)
 
     def _findStartNode(self):
         """查找起始节点ID"""
@@ -144,10 +152,17 @@ class WorkflowEngine:
         标准运行方法，为了向后兼容而保留。
         如果有断点则使用调试模式，否则使用标准模式。
         """
-        if self.debug_mode:
-            return self.debug_run()
-        else:
-            return self._standard_run()
+        if self.artifact_files.closed:
+            self.artifact_files = DeferredRemoval()
+        try:
+            if self.debug_mode:
+                return self.debug_run()
+            else:
+                return self._standard_run()
+        finally:
+            # 运行失败时丢弃未执行的成功回调
+            self._success_hooks = {}
+            self.artifact_files.close()
 
     def _standard_run(self):
         """
@@ -178,13 +193,18 @@ class WorkflowEngine:
                 last_node_type = self.nodes[curNodeID].get('type')
                 
                 # 执行节点并捕获返回值
-                result_payload = workNode.run()
+                with self.memory.track(curNodeID):
+                    result_payload = workNode.run()
+                
+                # 先记录输出、释放不再引用的输出并检查内存预算，超出预算时节点只报告一次 FAILED
+                payload = describe_artifacts(result_payload) if result_payload is not None else "Execution finished with no output."
+                self._after_node(curNodeID)
                 
                 # 2. 节点成功，将返回值作为 payload 发送
                 self.bus.emit("node_status_change", {
                     "nodeId": curNodeID, 
                     "status": "SUCCEEDED",
-                    "payload": result_payload if result_payload is not None else "Execution finished with no output."
+                    "payload": payload
                 })
 
             except Exception as e:
@@ -203,9 +223,12 @@ class WorkflowEngine:
                 curNodeID = self.popStack()
 
         self.is_running = False
+        self._finish_memory_report()
         if last_node_type != 'end':
             return False, "Workflow did not end with End node"
         
+        # 通知节点工作流已成功结束（如提交文件快照）
+        self._run_success_hooks()
         return True, "Workflow executed successfully"
 
     def debug_run(self):
@@ -277,13 +300,18 @@ class WorkflowEngine:
                 logger.info(f"Executing node {self.current_node_id} ({last_node_type})")
                 
                 # 执行节点
-                result_payload = workNode.run()
+                with self.memory.track(self.current_node_id):
+                    result_payload = workNode.run()
+                
+                # 先释放输出并检查内存预算，再发送成功状态
+                payload = describe_artifacts(result_payload) if result_payload is not None else "Execution finished with no output."
+                self._after_node(self.current_node_id)
                 
                 # 发送成功状态
                 self.bus.emit("node_status_change", {
                     "nodeId": self.current_node_id, 
                     "status": "SUCCEEDED", 
-                    "payload": result_payload if result_payload is not None else "Execution finished with no output."
+                    "payload": payload
                 })
                 
                 logger.info(f"Node {self.current_node_id} executed successfully")
@@ -321,6 +349,7 @@ class WorkflowEngine:
         # 执行完成
         self.is_running = False
         self.is_paused = False
+        self._finish_memory_report()
         
         if self.is_terminated:
             return False, "Execution terminated by user"
@@ -329,13 +358,84 @@ class WorkflowEngine:
         if last_node_type != 'end':
             return False, "Workflow did not end with End node"
 
+        self._run_success_hooks()
         # 发送完成信号
         self.bus.emit("over", {"message": "Workflow finished.", "status": "success"})
         logger.info("Debug workflow finished successfully")
         return True, "Workflow executed successfully"
 
+    def _after_node(self, node_id):
+        """
+        记录节点输出的大小，释放此后不再被引用的输出，再检查内存预算
+
+        Raises:
+            MemoryBudgetExceeded: 释放和转存后节点输出仍超出预算
+        """
+        instance = self.instance.get(node_id)
+        messages = getattr(instance, "MessageList", None)
+        if isinstance(messages, dict):
+            for port, value in messages.items():
+                self._track_output(node_id, port, value)
+        self.memory.update_peak()
+        if self.release_outputs:
+            self._release_dead_outputs(node_id)
+        self.memory.enforce(self.instance, node_id)
+
+    def _track_output(self, node_id, port, value):
+        self.memory.measure(node_id, port, value)
+        for item in walk_objects(value):
+            if isinstance(item, Artifact):
+                item.defer_removal(self.artifact_files)
+
+    def _release_dead_outputs(self, node_id):
+        """
+        释放 node_id 执行后不再活跃的顶层节点输出
+
+        所有输出都已释放且此后不再被引用的节点实例一并移除（连同循环体最后一轮留下的节点实例），
+        节点若因回边再次执行会重新创建实例。
+        """
+        live = self._live_out.get(node_id)
+        if live is None:
+            return
+        live_producers = {producer for producer, _ in live}
+        for producer_id in list(self.instance):
+            if producer_id not in self._live_out:
+                continue
+            messages = getattr(self.instance[producer_id], "MessageList", None)
+            if isinstance(messages, dict):
+                for port in [port for port in messages if (producer_id, port) not in live]:
+                    value = messages.pop(port)
+                    if isinstance(value, SpilledValue):
+                        value.release()
+                    self.memory.forget(producer_id, port)
+            if producer_id not in live_producers and not messages:
+                self._drop_instance(producer_id)
+                for block in self.nodes.get(producer_id, {}).get("blocks", []) or []:
+                    if isinstance(block, dict):
+                        self.cleanupNode(block.get("id"))
+
+    def _drop_instance(self, node_id):
+        instance = self.instance.pop(node_id, None)
+        if instance is None:
+            return
+        if hasattr(instance, 'cleanup'):
+            try:
+                instance.cleanup()
+            except Exception as e:
+                logger.warning(f"清理节点 {node_id} 时出现警告: {str(e)}")
+        self.memory.released_nodes += 1
+
+    def _finish_memory_report(self):
+        self.memory.finish()
+        report = self.memory.report()
+        logger.info(f"工作流 {getattr(self, 'workflow_id', 'unknown')} 节点输出: 峰值 {report['peakBytes']} 字节，"
+                    f"释放 {report['freedOutputs']} 个输出共 {report['freedBytes']} 字节，"
+                    f"移除 {report['releasedNodes']} 个节点实例，转存 {report['spilledOutputs']} 个输出共 {report['spilledBytes']} 字节")
+
     def askMessage(self, nodeId, nodePort):
-        return self.instance[nodeId].getMessage(nodePort)
+        value = self.instance[nodeId].getMessage(nodePort)
+        # 因内存预算转存到磁盘的输出在读取时还原
+        return value.load() if isinstance(value, SpilledValue) else value
 
     def putStack(self, nodeID):
         self.backStack.append(nodeID)
@@ -350,6 +450,18 @@ class WorkflowEngine:
             self.instance[nodeId] = self.factory.create_node_instance(nodeId)
         return self.instance[nodeId]
 
+    def registerSuccessHook(self, nodeId, hook):
+        """节点注册工作流成功结束时执行的回调，同一节点重复注册时替换之前的回调"""
+        self._success_hooks[nodeId] = hook
+
+    def _run_success_hooks(self):
+        hooks, self._success_hooks = self._success_hooks, {}
+        for node_id, hook in hooks.items():
+            try:
+                hook()
+            except Exception as e:
+                logger.warning(f"节点 {node_id} 的成功回调执行失败: {str(e)}")
+
     def getNodeInfo(self, nodeId):
         return self.nodes.get(nodeId, {})
 
@@ -360,6 +472,7 @@ class WorkflowEngine:
     def updateMessage(self, nodeId, nodePort, value):
         if nodeId in self.instance:
             self.instance[nodeId].setMessage(nodePort, value)
+            self._track_output(nodeId, nodePort, value)
 
     def get_global_bus(self):
         """返回全局事件总线给调用节点使用"""
@@ -369,6 +482,10 @@ class WorkflowEngine:
         """返回工作流管理器给调用节点使用"""
         return getattr(self, 'workflow_manager', None)
     
+    def get_image_cache(self):
+        """返回本次运行共享的图像缓存给图像节点使用"""
+        return self.image_cache
+
     def nodes_output(self, node_id, output_value):
         """处理节点输出事件"""
         logging.info(f"节点 {node_id} 输出: {output_value}")
@@ -404,6 +521,16 @@ class WorkflowEngine:
         
         # 清理堆栈
         self.backStack.clear()
+
+        # 停止本次运行开启的内存分配跟踪，删除推迟删除的产物临时文件
+        self.memory.finish()
+        self.artifact_files.close()
+
+        # 释放缓存的已解码图像
+        image_cache_stats = self.image_cache.stats()
+        self.image_cache.clear()
+        logging.info(f"图像缓存: 命中 {image_cache_stats['hits']}, 未命中 {image_cache_stats['misses']}, "
+                     f"淘汰 {image_cache_stats['evictions']} ({image_cache_stats['evictedBytes']} 字节)")
         
         logging.info(f"已清理 {node_count} 个节点实例，内存已释放")
     
@@ -414,5 +541,8 @@ class WorkflowEngine:
             "node_instances_count": len(self.instance),
             "instantiated_nodes": list(self.instance.keys()),
             "total_nodes_count": len(self.nodes),
-            "stack_size": len(self.backStack)
+            "stack_size": len(self.backStack),
+            "image_cache": self.image_cache.stats(),
+            "outputs": self.memory.report(),
+            "nodes": self.memory.node_report()
         }
\ No newline at end of file
@@ -135,6 +135,11 @@ class WorkflowManager:
             event_data["workflowId"] = workflow_id
             self.global_bus.emit("node_status_change", event_data)
         
+        # 转发节点进度事件，添加工作流ID
+        def forward_node_progress(event_data):
+            event_data["workflowId"] = workflow_id
+            self.global_bus.emit("node_progress", event_data)
+        
         # 转发节点消息事件
         def forward_message(event, nodeId, message):
             self.global_bus.emit("message", event, nodeId, message)
@@ -164,6 +169,7 @@ class WorkflowManager:
         
         # 注册事件监听器
         engine.bus.on('node_status_change', forward_node_status)
+        engine.bus.on('node_progress', forward_node_progress)
         engine.bus.on('message', forward_message)
         engine.bus.on('nodes_output', forward_nodes_output)
         engine.bus.on('over', forward_over)
@@ -321,17 +327,21 @@ class WorkflowManager:
             "total_workflows": len(self.workflows),
             "main_workflow": self.main_workflow_id,
             "active_workflows": [],
-            "memory_details": {}
+            "memory_details": {},
+            "total_output_bytes": 0
         }
         
         for workflow_id, engine in self.workflows.items():
             memory_info = engine.get_memory_usage_info()
             summary["memory_details"][workflow_id] = memory_info
+            summary["total_output_bytes"] += memory_info["outputs"]["liveBytes"]
             summary["active_workflows"].append({
                 "id": workflow_id,
                 "type": self.workflow_types[workflow_id].value,
                 "status": self.workflow_status[workflow_id].value,
-                "node_instances": memory_info["node_instances_count"]
+                "node_instances": memory_info["node_instances_count"],
+                "output_bytes": memory_info["outputs"]["liveBytes"],
+                "peak_output_bytes": memory_info["outputs"]["peakBytes"]
             })
         
         return summary
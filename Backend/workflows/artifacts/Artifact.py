@@ -0,0 +1,221 @@
+"""
+节点之间传递的内存产物
+
+节点默认以文件路径传递数据，上游写盘、下游再读盘。Artifact 把中间结果保存在内存中，
+超过阈值时溢出到临时文件（读取时通过 mmap 访问），只有在需要用户可见的输出文件时才落盘。
+Artifact 实现了 os.PathLike，只接受路径的旧代码会在首次使用时自动落盘到临时文件，
+因此节点可以互换地接收路径或 Artifact。
+
+Artifact 被回收时会删除自己的溢出文件和临时落盘文件，从中取得的路径只在持有 Artifact 期间有效。
+引擎把节点输出中的 Artifact 交给 DeferredRemoval，这些文件推迟到运行结束时删除，
+下游节点拿到的路径不会因为上游输出被提前释放而失效。
+"""
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+from typing import Any, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPILL_BYTES = int(os.environ.get("THRYVE_ARTIFACT_SPILL_BYTES", 16 * 1024 * 1024))
+
+
+class Artifact(os.PathLike):
+    """内存中的文件产物，超过阈值后溢出到临时文件"""
+
+    def __init__(self, name: str, data: bytes = b"", spill_bytes: int = DEFAULT_SPILL_BYTES):
+        """
+        Args:
+            name: 产物的文件名，落盘和推断文件类型时使用
+            data: 初始内容
+            spill_bytes: 内存中保存的最大字节数，超过后溢出到临时文件
+        """
+        self.name = name
+        self.spill_bytes = spill_bytes
+        self.size = 0
+        self.path: Optional[str] = None  # 已落盘的文件路径
+        self._memory = bytearray()
+        self._spill_path: Optional[str] = None
+        self._temp_path: Optional[str] = None
+        # 设置后 release 把溢出文件和临时落盘文件交给它延迟删除
+        self._deferred: Optional["DeferredRemoval"] = None
+        if data:
+            self.write(data)
+
+    @classmethod
+    def from_text(cls, name: str, text: str, encoding: str = "utf-8", **kwargs) -> "Artifact":
+        return cls(name, text.encode(encoding), **kwargs)
+
+    @property
+    def spilled(self) -> bool:
+        return self._spill_path is not None
+
+    def write(self, data: bytes):
+        """追加内容，超过阈值时把已有内容转移到临时文件"""
+        if not self.spilled and len(self._memory) + len(data) > self.spill_bytes:
+            fd, self._spill_path = tempfile.mkstemp(prefix="thryve_artifact_", suffix=os.path.splitext(self.name)[1])
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._memory)
+            self._memory = bytearray()
+        if self.spilled:
+            with open(self._spill_path, "ab") as f:
+                f.write(data)
+        else:
+            self._memory += data
+        self.size += len(data)
+
+    def write_text(self, text: str, encoding: str = "utf-8"):
+        self.write(text.encode(encoding))
+
+    def read_bytes(self) -> bytes:
+        if self.spilled:
+            with open(self._spill_path, "rb") as f:
+                return f.read()
+        return bytes(self._memory)
+
+    def read_text(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        return self.read_bytes().decode(encoding, errors)
+
+    def view(self) -> Union[memoryview, mmap.mmap]:
+        """不复制地访问内容：内存中的内容返回 memoryview，溢出的内容返回只读 mmap"""
+        if not self.spilled:
+            return memoryview(self._memory)
+        if self.size == 0:
+            return memoryview(b"")
+        with open(self._spill_path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def materialize(self, path: Optional[str] = None) -> str:
+        """
+        把内容写到磁盘并返回路径
+
+        Args:
+            path: 目标路径；为空时写入临时文件（溢出的产物直接返回溢出文件）
+        """
+        if path is None:
+            if self.path is not None:
+                return self.path
+            if self.spilled:
+                return self._spill_path
+            fd, self._temp_path = tempfile.mkstemp(prefix="thryve_artifact_", suffix=os.path.splitext(self.name)[1])
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._memory)
+            return self._temp_path
+
+        if self.spilled:
+            shutil.copyfile(self._spill_path, path)
+        else:
+            with open(path, "wb") as f:
+                f.write(self._memory)
+        self.path = path
+        return path
+
+    def defer_removal(self, deferred: "DeferredRemoval"):
+        """release 和回收时不立即删除溢出文件和临时落盘文件，而是交给 deferred 在运行结束时删除"""
+        self._deferred = deferred
+
+    def release(self):
+        """释放内存和临时文件，已落盘到用户路径的文件保留"""
+        self._memory = bytearray()
+        temp_files = [self._spill_path, self._temp_path]
+        if self._deferred is not None:
+            self._deferred.add(temp_files)
+        else:
+            remove_files(temp_files)
+        self._spill_path = self._temp_path = None
+
+    def __fspath__(self) -> str:
+        """
+        落盘到临时文件并返回路径
+
+        临时文件随 Artifact 回收而删除，调用方需要在使用路径期间持有 Artifact；
+        节点输出中的 Artifact 由引擎推迟到运行结束时删除。
+        """
+        return self.materialize()
+
+    def __del__(self):
+        try:
+            self.release()
+        except Exception:
+            pass
+
+    def __repr__(self) -> str:
+        location = "spilled" if self.spilled else "memory"
+        return f"<Artifact {self.name} {self.size} bytes ({location})>"
+
+    def describe(self) -> dict:
+        """可序列化的描述信息，用于发送到前端"""
+        return {"artifact": self.name, "size": self.size, "spilled": self.spilled, "path": self.path}
+
+
+def remove_files(paths: List[Optional[str]]):
+    """删除临时文件，忽略不存在的文件"""
+    for path in paths:
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class DeferredRemoval:
+    """推迟删除已回收 Artifact 的临时文件，close() 时统一删除，之后交来的文件立即删除"""
+
+    def __init__(self):
+        self.paths: List[str] = []
+        self.closed = False
+
+    def add(self, paths: List[Optional[str]]):
+        paths = [path for path in paths if path]
+        if self.closed:
+            remove_files(paths)
+        else:
+            self.paths.extend(paths)
+
+    def close(self):
+        remove_files(self.paths)
+        self.paths = []
+        self.closed = True
+
+
+# describe_artifacts 替换为描述信息的类型，数据流、惰性文件列表等模块通过 register_describable 注册
+_DESCRIBABLE_TYPES: Tuple[type, ...] = ()
+
+
+def register_describable(cls: type) -> type:
+    """类装饰器：注册带有 describe() 的类型，结果发送到前端时以描述信息代替对象本身"""
+    global _DESCRIBABLE_TYPES
+    _DESCRIBABLE_TYPES = _DESCRIBABLE_TYPES + (cls,)
+    return cls
+
+
+def is_artifact(value: Any) -> bool:
+    return isinstance(value, Artifact)
+
+
+def read_source_bytes(source) -> bytes:
+    """读取路径或 Artifact 的全部内容"""
+    if isinstance(source, Artifact):
+        return source.read_bytes()
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def source_name(source) -> str:
+    """路径或 Artifact 对应的文件名"""
+    if isinstance(source, Artifact):
+        return source.name
+    return os.path.basename(source)
+
+
+def describe_artifacts(value: Any) -> Any:
+    """把结果中的 Artifact、惰性文件列表等对象替换为可序列化的描述信息"""
+    if isinstance(value, (Artifact,) + _DESCRIBABLE_TYPES):
+        return value.describe()
+    if isinstance(value, dict):
+        return {key: describe_artifacts(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [describe_artifacts(item) for item in value]
+    return value
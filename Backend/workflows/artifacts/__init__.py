@@ -0,0 +1,8 @@
+#artifacts/__init__.py
+from .Artifact import (Artifact, DeferredRemoval, describe_artifacts, is_artifact, read_source_bytes,
+                       register_describable, source_name)
+
+__version__ = "1.0.0"
+
+__all__ = ["Artifact", "DeferredRemoval", "describe_artifacts", "is_artifact", "read_source_bytes",
+           "register_describable", "source_name"]
\ No newline at end of file
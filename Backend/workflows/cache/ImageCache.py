@@ -0,0 +1,109 @@
+"""
+运行期共享的已解码图像缓存
+
+同一次工作流运行中的多个图像节点处理同一文件时，按 (路径, 修改时间) 复用已解码的
+PIL.Image，避免重复从磁盘解码。节点写出的无损中间结果也会放入缓存，下游节点读取该文件时
+直接拿到内存中的图像。缓存按像素数据字节数计量，超过上限时按最近最少使用淘汰。
+
+缓存中的图像由多个节点共享，使用方不得原地修改，需要修改时先 copy()。
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = int(os.environ.get("THRYVE_IMAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# 写入缓存后像素内容与文件一致的格式；有损格式写出的文件与内存图像不同，不能缓存
+LOSSLESS_EXTENSIONS = ('.png', '.bmp', '.tif', '.tiff')
+
+
+def image_nbytes(image: Image.Image) -> int:
+    """估算图像像素数据占用的字节数"""
+    bits = {"1": 1, "I;16": 16, "I": 32, "F": 32}.get(image.mode, 8)
+    return image.width * image.height * len(image.getbands()) * bits // 8
+
+
+class ImageCache:
+    """按路径和修改时间索引的已解码图像 LRU 缓存，线程安全"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[Image.Image, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: str) -> Optional[Tuple[str, int]]:
+        try:
+            return os.path.abspath(path), os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self, path: str) -> Optional[Image.Image]:
+        """读取缓存的图像，未命中返回 None"""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key) if key else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def load(self, path: str) -> Image.Image:
+        """读取图像，未命中时从磁盘解码并放入缓存"""
+        image = self.get(path)
+        if image is None:
+            with Image.open(path) as opened:
+                opened.load()
+                image = opened
+            self.put(path, image)
+        return image
+
+    def put(self, path: str, image: Image.Image):
+        """以文件当前的修改时间为键缓存图像，超出上限时淘汰最久未使用的图像"""
+        key = self._key(path)
+        if key is None:
+            return
+        size = image_nbytes(image)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (image, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+                self.evicted_bytes += evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "evictedBytes": self.evicted_bytes
+            }
@@ -0,0 +1,193 @@
+"""
+解析一次、多个节点共享的 Markdown 文档模型
+
+按 (路径, 修改时间, 大小) 缓存文档的原文、编码、front matter、标题树和渲染后的 HTML，
+同一文件上串联的多个 Markdown 节点只读取和解析一次；文件被修改后键随之变化，自动失效。
+front matter、标题和 HTML 都在首次访问时才计算。
+
+markdown.Markdown 实例构建扩展的开销较大，按线程复用（实例本身不是线程安全的），
+Pygments 代码高亮样式只生成一次。
+"""
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import frontmatter as fm
+import markdown
+from pygments.formatters import HtmlFormatter
+
+from ..encoding import read_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 64
+MARKDOWN_EXTENSIONS = ('tables', 'fenced_code', 'codehilite')
+
+_FENCE = re.compile(r'^\s{0,3}(```|~~~)')
+_ATX_HEADING = re.compile(r'^\s*(#{1,6})\s+(.*?)\s*$')
+_renderers = threading.local()
+
+
+@lru_cache(maxsize=None)
+def pygments_css(selector: str = '.codehilite') -> str:
+    """代码高亮样式表，只生成一次"""
+    return HtmlFormatter().get_style_defs(selector)
+
+
+def render_markdown(text: str) -> str:
+    """使用当前线程复用的 Markdown 实例渲染 HTML"""
+    renderer = getattr(_renderers, "markdown", None)
+    if renderer is None:
+        renderer = markdown.Markdown(extensions=list(MARKDOWN_EXTENSIONS))
+        _renderers.markdown = renderer
+    return renderer.reset().convert(text)
+
+
+class MarkdownDocument:
+    """单个 Markdown 文件的解析结果，各部分在首次访问时计算后保留"""
+
+    def __init__(self, path: str, text: str, encoding: str):
+        self.path = path
+        self.text = text
+        self.encoding = encoding
+        self._lines: Optional[List[str]] = None
+        self._post = None
+        self._headings: Optional[List[Dict[str, Any]]] = None
+        self._html: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            self._lines = self.text.splitlines(keepends=True)
+        return self._lines
+
+    @property
+    def post(self) -> "fm.Post":
+        """front matter 解析结果；front matter 格式错误时抛出解析异常"""
+        if self._post is None:
+            self._post = fm.loads(self.text)
+        return self._post
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.post.metadata
+
+    @property
+    def body(self) -> str:
+        """去掉 front matter 后的正文，front matter 无法解析时返回原文"""
+        try:
+            return self.post.content
+        except Exception:
+            return self.text
+
+    @property
+    def headings(self) -> List[Dict[str, Any]]:
+        """ATX 标题列表 [{"level", "title", "line", "text"}]，围栏代码块中的 # 不算标题"""
+        if self._headings is None:
+            headings = []
+            in_fence = None
+            for number, line in enumerate(self.lines, 1):
+                fence = _FENCE.match(line)
+                if fence:
+                    if in_fence is None:
+                        in_fence = fence.group(1)
+                    elif fence.group(1) == in_fence:
+                        in_fence = None
+                    continue
+                if in_fence is not None:
+                    continue
+                heading = _ATX_HEADING.match(line)
+                if heading and heading.group(2):
+                    headings.append({
+                        "level": len(heading.group(1)),
+                        "title": heading.group(2),
+                        "line": number,
+                        "text": line.strip()
+                    })
+            self._headings = headings
+        return self._headings
+
+    @property
+    def heading_tree(self) -> List[Dict[str, Any]]:
+        """按级别嵌套的标题树，每个节点带 children"""
+        roots: List[Dict[str, Any]] = []
+        stack: List[Dict[str, Any]] = []
+        for heading in self.headings:
+            node = {"level": heading["level"], "title": heading["title"], "line": heading["line"], "children": []}
+            while stack and stack[-1]["level"] >= node["level"]:
+                stack.pop()
+            (stack[-1]["children"] if stack else roots).append(node)
+            stack.append(node)
+        return roots
+
+    @property
+    def html(self) -> str:
+        """正文渲染后的 HTML 片段"""
+        with self._lock:
+            if self._html is None:
+                self._html = render_markdown(self.body)
+            return self._html
+
+
+class MarkdownCache:
+    """按路径、修改时间和大小索引的文档 LRU 缓存，线程安全"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], MarkdownDocument]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, path: str) -> MarkdownDocument:
+        """读取文档，文件未变化时返回缓存的解析结果"""
+        key = os.path.abspath(path)
+        stat = os.stat(key)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        text, encoding = read_text(path)
+        document = MarkdownDocument(path, text, encoding)
+        with self._lock:
+            self._entries[key] = (version, document)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return document
+
+    def invalidate(self, path: str):
+        """文件被节点改写后移除缓存"""
+        with self._lock:
+            self._entries.pop(os.path.abspath(path), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_markdown_cache: Optional[MarkdownCache] = None
+_markdown_cache_lock = threading.Lock()
+
+
+def get_markdown_cache() -> MarkdownCache:
+    """获取进程内共享的 Markdown 文档缓存实例"""
+    global _markdown_cache
+    with _markdown_cache_lock:
+        if _markdown_cache is None:
+            _markdown_cache = MarkdownCache()
+        return _markdown_cache
@@ -0,0 +1,176 @@
+"""
+基于文件内容哈希的逐页提取缓存
+
+以 (文件内容哈希, 页码, 类型) 为键，持久化保存文本、HTML、图片列表等逐页提取结果，
+多次运行处理同一批未修改的文档时直接从缓存返回。缓存总大小超过上限时按最近访问时间淘汰。
+缓存内容保存在 THRYVE_CACHE_DIR（默认 ~/.thryve/cache）中，跨运行、跨用户共享，
+因此 PDF 节点只在 useCache 为 true 时使用缓存。
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".thryve", "cache")
+DEFAULT_MAX_BYTES = int(os.environ.get("THRYVE_PAGE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# 淘汰时清理到上限的该比例，避免每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class PageCache:
+    """持久化的逐页提取缓存，线程安全，可被多个进程共享"""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            path: SQLite 数据库路径，默认位于环境变量 THRYVE_CACHE_DIR 指定的目录下
+            max_bytes: 缓存值的总字节数上限
+        """
+        self.path = path or os.path.join(os.environ.get("THRYVE_CACHE_DIR", DEFAULT_CACHE_DIR), "pages.sqlite3")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "content_hash TEXT NOT NULL, page INTEGER NOT NULL, kind TEXT NOT NULL, "
+                "value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL, "
+                "PRIMARY KEY (content_hash, page, kind))")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+            # 文件哈希记忆表：路径、大小和修改时间不变时无需重新计算哈希
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_hashes ("
+                "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, content_hash TEXT NOT NULL)")
+
+    def file_hash(self, file_path: str) -> str:
+        """返回文件内容的 SHA-256，文件未变化时直接使用记忆值"""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, content_hash FROM file_hashes WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        content_hash = digest.hexdigest()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, content_hash) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, content_hash))
+        return content_hash
+
+    def get(self, content_hash: str, page: int, kind: str) -> Optional[Any]:
+        """读取单页缓存，未命中返回 None"""
+        return self.get_many(content_hash, [page], kind).get(page)
+
+    def get_many(self, content_hash: str, pages: Iterable[int], kind: str) -> Dict[int, Any]:
+        """批量读取多页缓存，只返回命中的页"""
+        pages = list(pages)
+        if not pages:
+            return {}
+        found = {}
+        with self._lock:
+            # SQLite 单条语句的参数个数有限，分批查询
+            for start in range(0, len(pages), 500):
+                batch = pages[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT page, value FROM pages WHERE content_hash = ? AND kind = ? AND page IN ({placeholders})",
+                    (content_hash, kind, *batch)).fetchall()
+                for page, value in rows:
+                    found[page] = json.loads(value)
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE pages SET last_access = ? WHERE content_hash = ? AND page = ? AND kind = ?",
+                        [(now, content_hash, page, kind) for page in found])
+        self.hits += len(found)
+        self.misses += len(pages) - len(found)
+        return found
+
+    def put(self, content_hash: str, page: int, kind: str, value: Any):
+        """写入单页缓存"""
+        self.put_many(content_hash, {page: value}, kind)
+
+    def put_many(self, content_hash: str, items: Dict[int, Any], kind: str):
+        """批量写入多页缓存，写入后按需淘汰"""
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for page, value in items.items():
+            encoded = json.dumps(value, ensure_ascii=False)
+            rows.append((content_hash, page, kind, encoded, len(encoded.encode("utf-8")), now))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (content_hash, page, kind, value, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.evict()
+
+    def evict(self):
+        """缓存超出上限时，按最近访问时间从旧到新淘汰"""
+        with self._lock:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            target = int(self.max_bytes * EVICT_TARGET_RATIO)
+            to_delete = []
+            for content_hash, page, kind, size in self._conn.execute(
+                    "SELECT content_hash, page, kind, size FROM pages ORDER BY last_access"):
+                if total <= target:
+                    break
+                to_delete.append((content_hash, page, kind))
+                total -= size
+            with self._conn:
+                self._conn.executemany(
+                    "DELETE FROM pages WHERE content_hash = ? AND page = ? AND kind = ?", to_delete)
+        logger.info(f"页面缓存淘汰 {len(to_delete)} 条记录")
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": total,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_page_cache: Optional[PageCache] = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> PageCache:
+    """获取进程内共享的页面缓存实例"""
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache()
+        return _page_cache
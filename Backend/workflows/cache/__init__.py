@@ -0,0 +1,9 @@
+#cache/__init__.py
+from .PageCache import PageCache, get_page_cache
+from .ImageCache import ImageCache, image_nbytes
+from .MarkdownCache import MarkdownCache, MarkdownDocument, get_markdown_cache, pygments_css, render_markdown
+
+__version__ = "1.0.0"
+
+__all__ = ["PageCache", "get_page_cache", "ImageCache", "image_nbytes",
+           "MarkdownCache", "MarkdownDocument", "get_markdown_cache", "pygments_css", "render_markdown"]
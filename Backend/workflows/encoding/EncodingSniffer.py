@@ -0,0 +1,138 @@
+"""
+共享的文本编码探测
+
+只读取文件开头的有限字节，依次检查 BOM 和候选编码（增量解码器允许前缀末尾截断在多字节字符中间），
+探测结果按 (路径, 大小, 修改时间) 缓存。读取全文时文件只从磁盘读一次，
+前缀探测失误时在内存中的字节上按候选顺序继续尝试，不再重复打开文件。
+"""
+import codecs
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from ..artifacts import Artifact
+
+# 与各节点原有的尝试顺序保持一致，latin1 可以解码任意字节，作为最后的回退
+ENCODING_CANDIDATES = ('utf-8', 'gbk', 'gb2312', 'gb18030', 'latin1')
+SNIFF_BYTES = 64 * 1024
+CACHE_SIZE = 1024
+
+# UTF-32 LE 的 BOM 以 UTF-16 LE 的 BOM 开头，必须先检查
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def sniff_encoding(prefix: bytes, final: bool = False,
+                   candidates: Iterable[str] = ENCODING_CANDIDATES) -> Optional[str]:
+    """
+    根据字节前缀判断编码
+
+    Args:
+        prefix: 文件开头的字节
+        final: prefix 是否为完整内容；为 False 时允许末尾存在不完整的多字节字符
+        candidates: 按优先级排列的候选编码
+
+    Returns:
+        第一个能解码前缀的编码，都不能解码时返回 None
+    """
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding
+    for encoding in candidates:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(prefix, final=final)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def decode_bytes(data: bytes, candidates: Iterable[str] = ENCODING_CANDIDATES) -> Tuple[str, str]:
+    """
+    解码完整内容，返回 (文本, 编码)
+
+    Raises:
+        UnicodeDecodeError: 所有候选编码都无法解码
+    """
+    candidates = tuple(candidates)
+    first = sniff_encoding(data[:SNIFF_BYTES], final=len(data) <= SNIFF_BYTES, candidates=candidates)
+    # 前缀就无法解码的候选不可能解码全文，从探测结果开始往后尝试即可
+    if first in candidates:
+        order = candidates[candidates.index(first):]
+    elif first:
+        order = (first,) + candidates  # BOM 指明的编码
+    else:
+        order = candidates
+    last_error = None
+    for encoding in order:
+        try:
+            return data.decode(encoding), encoding
+        except UnicodeDecodeError as e:
+            last_error = e
+    raise last_error
+
+
+def _file_key(path: str) -> Tuple[str, int, int]:
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def _remember(key: Tuple[str, int, int], encoding: str):
+    with _cache_lock:
+        _cache[key] = encoding
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _recall(key: Tuple[str, int, int]) -> Optional[str]:
+    with _cache_lock:
+        encoding = _cache.get(key)
+        if encoding is not None:
+            _cache.move_to_end(key)
+        return encoding
+
+
+def detect_encoding(path: str, candidates: Iterable[str] = ENCODING_CANDIDATES) -> str:
+    """只读取文件前缀探测编码，结果按文件缓存"""
+    key = _file_key(path)
+    encoding = _recall(key)
+    if encoding is None:
+        with open(path, 'rb') as f:
+            prefix = f.read(SNIFF_BYTES)
+        encoding = sniff_encoding(prefix, final=key[1] <= SNIFF_BYTES, candidates=candidates) or 'latin1'
+        _remember(key, encoding)
+    return encoding
+
+
+def read_text(source, candidates: Iterable[str] = ENCODING_CANDIDATES) -> Tuple[str, str]:
+    """
+    读取路径或 Artifact 的全部文本，返回 (文本, 编码)
+
+    Raises:
+        UnicodeDecodeError: 所有候选编码都无法解码
+    """
+    if isinstance(source, Artifact):
+        return decode_bytes(source.read_bytes(), candidates)
+
+    key = _file_key(source)
+    with open(source, 'rb') as f:
+        data = f.read()
+    encoding = _recall(key)
+    if encoding is not None:
+        try:
+            return data.decode(encoding), encoding
+        except UnicodeDecodeError:
+            pass
+    text, encoding = decode_bytes(data, candidates)
+    _remember(key, encoding)
+    return text, encoding
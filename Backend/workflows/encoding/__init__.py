@@ -0,0 +1,6 @@
+#encoding/__init__.py
+from .EncodingSniffer import ENCODING_CANDIDATES, decode_bytes, detect_encoding, read_text, sniff_encoding
+
+__version__ = "1.0.0"
+
+__all__ = ["ENCODING_CANDIDATES", "decode_bytes", "detect_encoding", "read_text", "sniff_encoding"]
@@ -0,0 +1,241 @@
+"""
+基于 os.scandir 的目录遍历
+
+scandir 返回的 DirEntry 自带文件类型信息，判断文件 / 目录不再额外 stat；只有启用大小或修改时间
+过滤时才读取 stat（Windows 上同样来自目录项缓存）。遍历使用显式栈而不是递归，
+结果以生成器逐个产出，下游可以在遍历完成前开始处理。
+"""
+import fnmatch
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..artifacts import register_describable
+
+OnError = Callable[[str, Exception], None]
+# 列出目录条目的函数，返回按名称排序、接口与 os.DirEntry 相同的对象
+ListDir = Callable[[str], List[Any]]
+
+
+def scandir_sorted(directory: str) -> List[os.DirEntry]:
+    with os.scandir(directory) as iterator:
+        return sorted(iterator, key=lambda entry: entry.name)
+
+
+def _as_list(value: Any) -> List[str]:
+    """配置中的模式列表：列表原样使用，字符串按逗号或换行分隔"""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in str(value).replace("\n", ",").split(",") if item.strip()]
+
+
+def _match_segments(parts: List[str], pattern: List[str]) -> bool:
+    """逐段匹配路径：** 段匹配零个或多个目录层级，其余段按 fnmatch 匹配单个名称"""
+    if not pattern:
+        return not parts
+    if pattern[0] == "**":
+        return any(_match_segments(parts[i:], pattern[1:]) for i in range(len(parts) + 1))
+    return bool(parts) and fnmatch.fnmatch(parts[0], pattern[0]) and _match_segments(parts[1:], pattern[1:])
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def _as_timestamp(value: Any) -> Optional[float]:
+    """修改时间过滤条件：数字按 Unix 时间戳，字符串按 ISO 8601 日期时间"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(str(value)).timestamp()
+
+
+class WalkOptions:
+    """遍历过滤条件"""
+
+    def __init__(self, include: Iterable[str] = (), exclude: Iterable[str] = (), extensions: Iterable[str] = (),
+                 min_size: Optional[float] = None, max_size: Optional[float] = None,
+                 modified_after: Optional[float] = None, modified_before: Optional[float] = None,
+                 max_depth: Optional[int] = None, recursive: bool = True):
+        """
+        Args:
+            include: 文件需匹配的 glob 之一，如 *.md、docs/**/*.txt；为空时不限制。
+                含 / 的模式按路径逐段匹配：* 和 ? 不跨越 /，** 段匹配零个或多个目录层级
+            exclude: 排除的 glob，匹配的目录整体跳过
+            extensions: 扩展名过滤，如 .md、pdf（不区分大小写）
+            min_size / max_size: 文件大小范围（字节）
+            modified_after / modified_before: 修改时间范围（Unix 时间戳）
+            max_depth: 最大递归深度，0 表示只列出根目录下的文件；None 不限制
+            recursive: 为 False 时不展开目录
+        """
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self.extensions = tuple(ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in extensions)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.modified_after = modified_after
+        self.modified_before = modified_before
+        self.max_depth = max_depth
+        self.recursive = recursive
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "WalkOptions":
+        """从 FolderInput 的 folders 配置项构建，deepSearch 控制是否展开目录"""
+        config = config or {}
+        max_depth = config.get("maxDepth")
+        return cls(
+            include=_as_list(config.get("include")),
+            exclude=_as_list(config.get("exclude")),
+            extensions=_as_list(config.get("extensions")),
+            min_size=_as_number(config.get("minSize")),
+            max_size=_as_number(config.get("maxSize")),
+            modified_after=_as_timestamp(config.get("modifiedAfter")),
+            modified_before=_as_timestamp(config.get("modifiedBefore")),
+            max_depth=int(max_depth) if max_depth not in (None, "") else None,
+            recursive=bool(config.get("deepSearch", False))
+        )
+
+    @property
+    def needs_stat(self) -> bool:
+        return any(value is not None for value in (self.min_size, self.max_size, self.modified_after, self.modified_before))
+
+    @staticmethod
+    def _match(relative: str, patterns: List[str]) -> bool:
+        # 不含 / 的模式只匹配文件名，含 / 的模式逐段匹配相对根目录的路径
+        parts = relative.split("/")
+        return any(_match_segments(parts, pattern.split("/")) if "/" in pattern else fnmatch.fnmatch(parts[-1], pattern)
+                   for pattern in patterns)
+
+    def excludes(self, relative: str) -> bool:
+        return bool(self.exclude) and self._match(relative, self.exclude)
+
+    def accepts_name(self, relative: str) -> bool:
+        """只依据路径的过滤条件"""
+        if self.extensions and not relative.lower().endswith(self.extensions):
+            return False
+        if self.include and not self._match(relative, self.include):
+            return False
+        return not self.excludes(relative)
+
+    def accepts_stat(self, stat: os.stat_result) -> bool:
+        """依据大小和修改时间的过滤条件"""
+        if self.min_size is not None and stat.st_size < self.min_size:
+            return False
+        if self.max_size is not None and stat.st_size > self.max_size:
+            return False
+        if self.modified_after is not None and stat.st_mtime < self.modified_after:
+            return False
+        if self.modified_before is not None and stat.st_mtime > self.modified_before:
+            return False
+        return True
+
+
+def walk_entries(root: str, options: Optional[WalkOptions] = None, on_error: Optional[OnError] = None,
+                 list_dir: ListDir = scandir_sorted) -> Iterator[Tuple[str, Optional[os.DirEntry]]]:
+    """
+    遍历 root 下符合条件的文件，逐个产出 (路径, DirEntry)
+
+    root 本身是文件时直接按文件名过滤后产出，此时 DirEntry 为 None。
+    每个目录先产出其中的文件，再按名称顺序进入子目录；跟随指向目录的符号链接，但不会重复进入同一目录。
+
+    Args:
+        on_error: 目录无法读取等错误的回调，为空时忽略错误继续遍历
+        list_dir: 列出目录条目的函数，默认直接 scandir，快照索引可以替换为带缓存的实现
+    """
+    options = options or WalkOptions()
+    try:
+        if not os.path.isdir(root):
+            if os.path.exists(root):
+                name = os.path.basename(root)
+                if options.accepts_name(name) and (not options.needs_stat or options.accepts_stat(os.stat(root))):
+                    yield root, None
+            return
+    except OSError as e:
+        if on_error:
+            on_error(root, e)
+        return
+    if not options.recursive:
+        return
+
+    visited = set()
+    stack = [(root, "", 0)]
+    while stack:
+        directory, prefix, depth = stack.pop()
+        try:
+            entries = list_dir(directory)
+        except OSError as e:
+            if on_error:
+                on_error(directory, e)
+            continue
+
+        subdirectories = []
+        for entry in entries:
+            relative = prefix + entry.name
+            try:
+                if entry.is_dir():
+                    if options.max_depth is not None and depth >= options.max_depth:
+                        continue
+                    if options.excludes(relative):
+                        continue
+                    if entry.is_symlink():
+                        stat = entry.stat()
+                        if (stat.st_dev, stat.st_ino) in visited:
+                            continue
+                        visited.add((stat.st_dev, stat.st_ino))
+                    subdirectories.append((entry.path, relative + "/", depth + 1))
+                elif entry.is_file():
+                    if not options.accepts_name(relative):
+                        continue
+                    if options.needs_stat and not options.accepts_stat(entry.stat()):
+                        continue
+                    yield entry.path, entry
+            except OSError as e:
+                if on_error:
+                    on_error(entry.path, e)
+        # 逆序入栈，使子目录按名称顺序出栈
+        stack.extend(reversed(subdirectories))
+
+
+def walk_files(root: str, options: Optional[WalkOptions] = None, on_error: Optional[OnError] = None,
+               list_dir: ListDir = scandir_sorted) -> Iterator[str]:
+    """遍历 root 下符合条件的文件路径"""
+    for path, _ in walk_entries(root, options, on_error, list_dir):
+        yield path
+
+
+@register_describable
+class FileWalk:
+    """
+    可重复迭代的惰性文件列表
+
+    每次迭代重新遍历一次，迭代过程中逐个产出路径，循环节点可以在遍历完成前开始处理。
+    """
+
+    def __init__(self, roots: Iterable[str], options: Optional[WalkOptions] = None, on_error: Optional[OnError] = None,
+                 list_dir: ListDir = scandir_sorted):
+        self.roots = list(roots)
+        self.options = options or WalkOptions()
+        self.on_error = on_error
+        self.list_dir = list_dir
+
+    def __iter__(self) -> Iterator[str]:
+        for root in self.roots:
+            yield from walk_files(root, self.options, self.on_error, self.list_dir)
+
+    def to_list(self) -> List[str]:
+        return list(self)
+
+    def __repr__(self) -> str:
+        return f"<FileWalk {self.roots}>"
+
+    def describe(self) -> dict:
+        """可序列化的描述信息，用于发送到前端"""
+        return {"fileWalk": self.roots, "lazy": True}
@@ -0,0 +1,299 @@
+"""
+持久化的目录快照索引
+
+dirs 表缓存每个目录的条目列表：目录的修改时间只在条目增删或改名时变化，
+修改时间与上次列出时相同就直接使用缓存的列表，不再读取目录内容。
+files 表保存每个根目录上次成功运行时的文件快照（大小、修改时间和可选的内容哈希），
+ChangeScan 遍历时与快照比较，只产出新增或修改过的文件；工作流成功结束后再提交新快照，
+运行失败时下次仍会重新产出这些文件。
+
+修改时间的精度有限，列出目录或记录快照前后很短时间内发生的修改无法通过修改时间区分，
+这类“可疑”的记录（参考 git 的 racy-clean 处理）不予信任，下次重新检查。
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..artifacts import register_describable
+from .FolderWalker import OnError, WalkOptions, scandir_sorted, walk_entries
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".thryve", "cache")
+# 修改时间与记录时间的差小于该值时，同一修改时间内可能还有后续修改，记录不可信
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+HASH_BLOCK_SIZE = 1024 * 1024
+
+_KIND_DIR = "d"
+_KIND_FILE = "f"
+_KIND_OTHER = "o"
+
+
+class _CachedEntry:
+    """从索引还原的目录条目，接口与 os.DirEntry 相同，stat 在首次调用时才读取"""
+
+    __slots__ = ("name", "path", "_kind", "_symlink", "_stat")
+
+    def __init__(self, directory: str, name: str, kind: str, symlink: bool):
+        self.name = name
+        self.path = os.path.join(directory, name)
+        self._kind = kind
+        self._symlink = symlink
+        self._stat: Optional[os.stat_result] = None
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        return self._kind == _KIND_DIR and (follow_symlinks or not self._symlink)
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        return self._kind == _KIND_FILE and (follow_symlinks or not self._symlink)
+
+    def is_symlink(self) -> bool:
+        return self._symlink
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        if not follow_symlinks:
+            return os.lstat(self.path)
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+    def __repr__(self) -> str:
+        return f"<_CachedEntry {self.name!r}>"
+
+
+def _entry_kind(entry: os.DirEntry) -> str:
+    try:
+        if entry.is_dir():
+            return _KIND_DIR
+        if entry.is_file():
+            return _KIND_FILE
+    except OSError:
+        pass
+    return _KIND_OTHER
+
+
+def file_digest(path: str) -> str:
+    """文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SnapshotIndex:
+    """目录列表缓存与文件快照的持久化索引，线程安全，可被多个进程共享"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: SQLite 数据库路径，默认位于环境变量 THRYVE_CACHE_DIR 指定的目录下
+        """
+        self.path = path or os.path.join(os.environ.get("THRYVE_CACHE_DIR", DEFAULT_CACHE_DIR), "snapshots.sqlite3")
+        self.dir_hits = 0
+        self.dir_misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dirs ("
+                "path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, listed_ns INTEGER NOT NULL, entries TEXT NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "scope TEXT NOT NULL, dir TEXT NOT NULL, name TEXT NOT NULL, size INTEGER NOT NULL, "
+                "mtime_ns INTEGER NOT NULL, content_hash TEXT, PRIMARY KEY (scope, dir, name))")
+            # 每个快照的提交时间，用于判断快照中哪些修改时间不可信
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS scopes (scope TEXT PRIMARY KEY, committed_ns INTEGER NOT NULL)")
+
+    def list_dir(self, directory: str) -> List[Any]:
+        """
+        按名称排序列出目录条目，可直接作为 walk_entries 的 list_dir 参数
+
+        目录修改时间与缓存一致且缓存不在可疑窗口内时使用缓存，否则重新 scandir 并更新缓存。
+        """
+        mtime_ns = os.stat(directory).st_mtime_ns
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime_ns, listed_ns, entries FROM dirs WHERE path = ?", (directory,)).fetchone()
+        if row and row[0] == mtime_ns and row[1] - mtime_ns > RACY_WINDOW_NS:
+            self.dir_hits += 1
+            return [_CachedEntry(directory, name, kind, bool(symlink)) for name, kind, symlink in json.loads(row[2])]
+
+        self.dir_misses += 1
+        listed_ns = time.time_ns()
+        entries = scandir_sorted(directory)
+        encoded = json.dumps([[entry.name, _entry_kind(entry), int(entry.is_symlink())] for entry in entries],
+                             ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dirs (path, mtime_ns, listed_ns, entries) VALUES (?, ?, ?, ?)",
+                (directory, mtime_ns, listed_ns, encoded))
+        return entries
+
+    def committed_ns(self, scope: str) -> Optional[int]:
+        """快照的提交时间，从未提交过时返回 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT committed_ns FROM scopes WHERE scope = ?", (scope,)).fetchone()
+        return row[0] if row else None
+
+    def snapshot_dir(self, scope: str, directory: str) -> Dict[str, Tuple[int, int, Optional[str]]]:
+        """快照中某个目录下的文件：{文件名: (大小, 修改时间, 内容哈希)}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, size, mtime_ns, content_hash FROM files WHERE scope = ? AND dir = ?",
+                (scope, directory)).fetchall()
+        return {name: (size, mtime_ns, content_hash) for name, size, mtime_ns, content_hash in rows}
+
+    def commit(self, scope: str, rows: Iterable[Tuple[str, str, int, int, Optional[str]]], committed_ns: int):
+        """用 (目录, 文件名, 大小, 修改时间, 内容哈希) 列表整体替换快照"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE scope = ?", (scope,))
+            self._conn.executemany(
+                "INSERT INTO files (scope, dir, name, size, mtime_ns, content_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                [(scope, *row) for row in rows])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scopes (scope, committed_ns) VALUES (?, ?)", (scope, committed_ns))
+
+    def forget(self, scope: str):
+        """删除快照，下次运行重新产出全部文件"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE scope = ?", (scope,))
+            self._conn.execute("DELETE FROM scopes WHERE scope = ?", (scope,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            directories = self._conn.execute("SELECT COUNT(*) FROM dirs").fetchone()[0]
+            files = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        return {"directories": directories, "files": files, "dirHits": self.dir_hits, "dirMisses": self.dir_misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+@register_describable
+class ChangeScan:
+    """
+    只产出新增或修改过的文件的可重复迭代文件列表
+
+    每个根目录使用独立的快照（scope 为 "键:根目录绝对路径"）。大小和修改时间都与快照一致的文件视为未变化；
+    启用 hash_content 时，大小或修改时间变化的文件再比较内容哈希，只是被 touch 的文件不会产出。
+    完整迭代一次后调用 commit() 提交新快照，迭代中途停止时不提交。
+    """
+
+    def __init__(self, index: SnapshotIndex, key: str, roots: Iterable[str], options: Optional[WalkOptions] = None,
+                 hash_content: bool = False, on_error: Optional[OnError] = None):
+        self.index = index
+        self.key = key
+        self.roots = list(roots)
+        self.options = options or WalkOptions()
+        self.hash_content = hash_content
+        self.on_error = on_error
+        self.complete = False
+        self.added = 0
+        self.modified = 0
+        self.unchanged = 0
+        self._pending: Dict[str, List[Tuple[str, str, int, int, Optional[str]]]] = {}
+        self._started_ns = 0
+
+    def scope(self, root: str) -> str:
+        return f"{self.key}:{os.path.abspath(root)}"
+
+    def __iter__(self) -> Iterator[str]:
+        self.complete = False
+        self.added = self.modified = self.unchanged = 0
+        self._pending = {}
+        self._started_ns = time.time_ns()
+        for root in self.roots:
+            yield from self._scan_root(root)
+        self.complete = True
+
+    def _scan_root(self, root: str) -> Iterator[str]:
+        scope = self.scope(root)
+        committed_ns = self.index.committed_ns(scope)
+        rows = self._pending.setdefault(scope, [])
+        current_dir = None
+        previous: Dict[str, Tuple[int, int, Optional[str]]] = {}
+
+        # 同一目录下的文件连续产出，快照按目录分批读取
+        for path, entry in walk_entries(root, self.options, self.on_error, self.index.list_dir):
+            directory, name = os.path.split(path)
+            if directory != current_dir:
+                current_dir = directory
+                previous = self.index.snapshot_dir(scope, directory) if committed_ns is not None else {}
+            try:
+                stat = entry.stat() if entry is not None else os.stat(path)
+                changed, content_hash = self._compare(path, stat, previous.get(name), committed_ns)
+            except OSError as e:
+                if self.on_error:
+                    self.on_error(path, e)
+                continue
+            rows.append((directory, name, stat.st_size, stat.st_mtime_ns, content_hash))
+            if changed:
+                yield path
+
+    def _compare(self, path: str, stat: os.stat_result, old: Optional[Tuple[int, int, Optional[str]]],
+                 committed_ns: Optional[int]) -> Tuple[bool, Optional[str]]:
+        """返回 (是否产出, 记录的内容哈希)"""
+        if old is None:
+            self.added += 1
+            return True, file_digest(path) if self.hash_content else None
+        size, mtime_ns, old_hash = old
+        racy = committed_ns is None or committed_ns - mtime_ns <= RACY_WINDOW_NS
+        if size == stat.st_size and mtime_ns == stat.st_mtime_ns and not racy:
+            self.unchanged += 1
+            return False, old_hash
+        if self.hash_content:
+            content_hash = file_digest(path)
+            if content_hash == old_hash:
+                self.unchanged += 1
+                return False, content_hash
+            self.modified += 1
+            return True, content_hash
+        self.modified += 1
+        return True, None
+
+    def to_list(self) -> List[str]:
+        return list(self)
+
+    def commit(self) -> bool:
+        """提交最近一次完整迭代的快照，没有完整迭代过时返回 False"""
+        if not self.complete:
+            return False
+        for scope, rows in self._pending.items():
+            self.index.commit(scope, rows, self._started_ns)
+        self._pending = {}
+        self.complete = False
+        return True
+
+    def __repr__(self) -> str:
+        return f"<ChangeScan {self.roots}>"
+
+    def describe(self) -> dict:
+        """可序列化的描述信息，用于发送到前端"""
+        return {"changeScan": self.roots, "added": self.added, "modified": self.modified,
+                "unchanged": self.unchanged, "lazy": True}
+
+
+_snapshot_index: Optional[SnapshotIndex] = None
+_snapshot_index_lock = threading.Lock()
+
+
+def get_snapshot_index() -> SnapshotIndex:
+    """获取进程内共享的快照索引实例"""
+    global _snapshot_index
+    with _snapshot_index_lock:
+        if _snapshot_index is None:
+            _snapshot_index = SnapshotIndex()
+        return _snapshot_index
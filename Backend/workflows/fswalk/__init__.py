@@ -0,0 +1,8 @@
+#fswalk/__init__.py
+from .FolderWalker import FileWalk, WalkOptions, scandir_sorted, walk_entries, walk_files
+from .SnapshotIndex import ChangeScan, SnapshotIndex, get_snapshot_index
+
+__version__ = "1.0.0"
+
+__all__ = ["FileWalk", "WalkOptions", "scandir_sorted", "walk_entries", "walk_files",
+           "ChangeScan", "SnapshotIndex", "get_snapshot_index"]
\ No newline at end of file
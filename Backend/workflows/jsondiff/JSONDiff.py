@@ -0,0 +1,261 @@
+"""
+JSON 结构化差异比较
+
+相同的子树在 C 层比较后直接跳过，不再逐层递归。数组按元素对齐而不是按下标比较：
+默认用结构哈希（按对象 id 记忆，每个子树只计算一次）作为元素标识做最长匹配对齐，
+指定 key_field 时对象数组按该字段对齐，开头插入一个元素只产生一条 add。
+结果为 RFC 6902 JSON Patch，按顺序应用到原文档即可得到新文档。
+
+值的相等按 Python 语义判断：根节点类型不同时总会生成 replace，但容器内部的 true、1 与 1.0
+在 == 比较中相等，所在子树会被当作相同而跳过，不生成补丁。
+"""
+import copy
+import json
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Union
+
+PathToken = Union[str, int]
+
+
+class JSONPatchError(Exception):
+    """补丁无法应用"""
+    pass
+
+
+class _Hasher:
+    """
+    结构哈希：键顺序无关，按 JSON 文本区分类型（true 与 1、1 与 1.0 的哈希不同）
+
+    容器的哈希取键排序后 JSON 序列化结果的哈希，序列化在 C 层完成，远快于逐节点递归；
+    结果按对象 id 记忆，数组对齐时计算过的元素在后续比较中不再重复计算。
+    """
+
+    def __init__(self):
+        # 比较期间文档一直被引用，对象 id 不会被复用
+        self._memo: Dict[int, int] = {}
+
+    def __call__(self, value: Any) -> int:
+        if isinstance(value, (dict, list)):
+            result = self._memo.get(id(value))
+            if result is None:
+                result = hash(json.dumps(value, sort_keys=True, separators=(",", ":"), default=str))
+                self._memo[id(value)] = result
+            return result
+        return hash((type(value), value))
+
+
+def structural_hash(value: Any) -> int:
+    """计算 JSON 值的结构哈希"""
+    return _Hasher()(value)
+
+
+def _escape(token: PathToken) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _pointer(path: List[PathToken]) -> str:
+    """RFC 6901 JSON Pointer"""
+    return "".join("/" + _escape(token) for token in path)
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _parse_pointer(pointer: str) -> List[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JSONPatchError(f"非法的 JSON Pointer: {pointer}")
+    return [_unescape(token) for token in pointer[1:].split("/")]
+
+
+class _Differ:
+    def __init__(self, key_field: Optional[str], include_old: bool):
+        self.key_field = key_field
+        self.include_old = include_old
+        self.hash = _Hasher()
+        self.ops: List[Dict[str, Any]] = []
+
+    def _add(self, path: List[PathToken], value: Any):
+        self.ops.append({"op": "add", "path": _pointer(path), "value": value})
+
+    def _remove(self, path: List[PathToken], old: Any):
+        op = {"op": "remove", "path": _pointer(path)}
+        if self.include_old:
+            op["oldValue"] = old
+        self.ops.append(op)
+
+    def _replace(self, path: List[PathToken], old: Any, value: Any):
+        op = {"op": "replace", "path": _pointer(path), "value": value}
+        if self.include_old:
+            op["oldValue"] = old
+        self.ops.append(op)
+
+    def diff(self, path: List[PathToken], first: Any, second: Any):
+        # 相同子树直接跳过：== 在 C 层比较并在第一处不同时短路，不需要为整棵树计算哈希；
+        # 容器内部的 True、1 与 1.0 在 == 下相等，这类差异不会生成补丁
+        if first is second or (type(first) is type(second) and first == second):
+            return
+        if isinstance(first, dict) and isinstance(second, dict):
+            self._diff_dict(path, first, second)
+        elif isinstance(first, list) and isinstance(second, list):
+            self._diff_list(path, first, second)
+        else:
+            self._replace(path, first, second)
+
+    def _diff_dict(self, path: List[PathToken], first: dict, second: dict):
+        for key, value in first.items():
+            if key not in second:
+                self._remove(path + [key], value)
+            else:
+                self.diff(path + [key], value, second[key])
+        for key, value in second.items():
+            if key not in first:
+                self._add(path + [key], value)
+
+    def _keyed(self, first: list, second: list) -> bool:
+        key = self.key_field
+        return bool(key) and all(isinstance(item, dict) and key in item for items in (first, second) for item in items)
+
+    def _diff_list(self, path: List[PathToken], first: list, second: list):
+        keyed = self._keyed(first, second)
+        if keyed:
+            identity = [[self.hash(item[self.key_field]) for item in items] for items in (first, second)]
+        else:
+            identity = [[self.hash(item) for item in items] for items in (first, second)]
+
+        # index 为元素在逐条应用补丁过程中的当前下标
+        index = 0
+        matcher = SequenceMatcher(None, identity[0], identity[1], autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                # 按哈希对齐的元素相同会立即跳过；按键对齐的元素继续比较内部差异
+                for i, j in zip(range(i1, i2), range(j1, j2)):
+                    self.diff(path + [index], first[i], second[j])
+                    index += 1
+                continue
+            # 未按键对齐时，同一位置被替换的元素视为修改，递归生成更小的补丁
+            paired = 0 if keyed or tag != "replace" else min(i2 - i1, j2 - j1)
+            for offset in range(paired):
+                self.diff(path + [index], first[i1 + offset], second[j1 + offset])
+                index += 1
+            for i in range(i1 + paired, i2):
+                self._remove(path + [index], first[i])
+            for j in range(j1 + paired, j2):
+                self._add(path + [index], second[j])
+                index += 1
+
+
+def json_diff(first: Any, second: Any, key_field: Optional[str] = None,
+              include_old: bool = False) -> List[Dict[str, Any]]:
+    """
+    生成把 first 变为 second 的 JSON Patch
+
+    Args:
+        first: 原文档
+        second: 新文档
+        key_field: 对象数组的对齐字段（如 "id"），数组中所有元素都是包含该字段的对象时生效
+        include_old: 是否在 remove / replace 操作中附带 oldValue（RFC 6902 要求应用方忽略未定义的成员）
+
+    Returns:
+        add / remove / replace 操作列表，数组下标为按顺序应用时的当前下标；
+        容器内部仅 true / 1 / 1.0 之间的不同视为相等，不生成操作
+    """
+    differ = _Differ(key_field, include_old)
+    differ.diff([], first, second)
+    return differ.ops
+
+
+def _walk(document: Any, tokens: List[str]) -> Any:
+    """沿路径取值，数组容器中的令牌按下标解析"""
+    for token in tokens:
+        document = document[int(token)] if isinstance(document, list) else document[token]
+    return document
+
+
+def _apply_op(document: Any, op: Dict[str, Any]) -> Any:
+    """在文档上就地应用一个操作，返回应用后的文档（替换根节点时为新对象）"""
+    tokens = _parse_pointer(op.get("path", ""))
+    kind = op.get("op")
+    if kind not in ("add", "remove", "replace"):
+        raise JSONPatchError(f"不支持的补丁操作: {kind}")
+    if not tokens:
+        if kind == "remove":
+            raise JSONPatchError("不能删除文档根节点")
+        return copy.deepcopy(op["value"])
+    try:
+        parent = _walk(document, tokens[:-1])
+        last = tokens[-1]
+        if isinstance(parent, list):
+            position = len(parent) if (kind == "add" and last == "-") else int(last)
+            if kind == "add":
+                if position > len(parent):
+                    raise IndexError(position)
+                parent.insert(position, copy.deepcopy(op["value"]))
+            elif kind == "remove":
+                del parent[position]
+            else:
+                parent[position] = copy.deepcopy(op["value"])
+        else:
+            if kind != "add" and last not in parent:
+                raise KeyError(last)
+            if kind == "remove":
+                del parent[last]
+            else:
+                parent[last] = copy.deepcopy(op["value"])
+    except (KeyError, IndexError, ValueError, TypeError) as e:
+        raise JSONPatchError(f"补丁路径无效: {op.get('path')} ({e!r})")
+    return document
+
+
+def apply_patch(document: Any, patch: List[Dict[str, Any]]) -> Any:
+    """
+    把 add / remove / replace 补丁应用到文档副本上并返回结果
+
+    Raises:
+        JSONPatchError: 路径不存在或操作不支持
+    """
+    document = copy.deepcopy(document)
+    for op in patch:
+        document = _apply_op(document, op)
+    return document
+
+
+def patch_to_differences(patch: List[Dict[str, Any]], document: Any) -> List[Dict[str, Any]]:
+    """
+    把补丁转换为 diff 模式原有的差异列表格式
+
+    路径写作 a.b[0] 形式，add / remove / replace 分别对应 missing_in_first / missing_in_second /
+    value_different；remove 和 replace 需要 json_diff(include_old=True) 生成的 oldValue。
+    令牌写成下标还是键取决于原文档中对应容器的类型（纯数字的对象键仍写作 .123），
+    补丁在原文档副本上逐条应用，后续操作按应用到该处时的文档解析路径。
+
+    Raises:
+        JSONPatchError: 补丁路径在原文档中不存在
+    """
+    document = copy.deepcopy(document)
+    differences = []
+    for op in patch:
+        tokens = _parse_pointer(op["path"])
+        path = ""
+        parent = document
+        for position, token in enumerate(tokens):
+            if isinstance(parent, list):
+                path += f"[{token}]"
+            else:
+                path = f"{path}.{token}" if path else token
+            if position < len(tokens) - 1:
+                try:
+                    parent = _walk(parent, [token])
+                except (KeyError, IndexError, ValueError, TypeError) as e:
+                    raise JSONPatchError(f"补丁路径无效: {op['path']} ({e!r})")
+        if op["op"] == "add":
+            differences.append({"path": path, "type": "missing_in_first", "value": op["value"]})
+        elif op["op"] == "remove":
+            differences.append({"path": path, "type": "missing_in_second", "value": op.get("oldValue")})
+        else:
+            differences.append({"path": path, "type": "value_different",
+                                "first_value": op.get("oldValue"), "second_value": op["value"]})
+        document = _apply_op(document, op)
+    return differences
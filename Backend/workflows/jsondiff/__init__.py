@@ -0,0 +1,6 @@
+#jsondiff/__init__.py
+from .JSONDiff import JSONPatchError, apply_patch, json_diff, patch_to_differences, structural_hash
+
+__version__ = "1.0.0"
+
+__all__ = ["JSONPatchError", "apply_patch", "json_diff", "patch_to_differences", "structural_hash"]
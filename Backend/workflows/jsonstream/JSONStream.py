@@ -0,0 +1,352 @@
+"""
+大文件 JSON / JSON Lines 的流式读取
+
+JSONStreamReader 按块读取文本，沿简单路径（键、下标和一个通配符）向下定位，
+路径之外的内容只扫描括号和字符串边界直接跳过，通配符下的元素逐个解析后交给调用方，
+内存占用只与单条记录的大小有关。JSON Lines 逐行解析。匹配结果通过 MatchWriter 增量写出。
+"""
+import json
+import operator
+import os
+import re
+from typing import Any, Callable, Iterator, List, Optional, Tuple, Union
+
+STREAM_CHUNK_CHARS = 1024 * 1024
+
+WILDCARD = object()  # 路径中的 [*] / .*
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_NUMBER_TAIL = re.compile(r'[0-9.eE+\-]*')
+_STRING_TAIL = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_PATH_TOKEN = re.compile(
+    r"""\.(?P<name>[^\W\d][\w$\-]*)"""
+    r"""|\[(?P<index>\d+)\]"""
+    r"""|\[(?P<quoted>'[^']*'|"[^"]*")\]"""
+    r"""|(?P<wildcard>\[\*\]|\.\*)"""
+)
+_FILTER = re.compile(r'^\s*(?P<field>[^\s=!<>]+)\s*(?:(?P<op>==|!=|>=|<=|>|<|contains)\s*(?P<value>.+?))?\s*$')
+_FILTER_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+    "contains": operator.contains,
+}
+
+
+class JSONStreamError(Exception):
+    """流式解析错误"""
+    pass
+
+
+def parse_stream_path(path: str) -> Tuple[List[Any], Optional[str]]:
+    """
+    把 JSONPath 拆成流式定位步骤和逐条记录上求值的剩余路径
+
+    定位部分只能由键（.key / ['key']）、下标（[0]）和至多一个通配符组成，
+    通配符之后的部分作为剩余路径原样返回，例如 $.data.items[*].name 拆为
+    (['data', 'items', WILDCARD], '$.name')。
+
+    Raises:
+        JSONStreamError: 路径不是简单路径
+    """
+    path = (path or "$").strip()
+    if not path.startswith("$"):
+        raise JSONStreamError(f"路径必须以 $ 开头: {path}")
+    steps: List[Any] = []
+    pos = 1
+    while pos < len(path):
+        match = _PATH_TOKEN.match(path, pos)
+        if match is None:
+            raise JSONStreamError(f"流式查询只支持由键、下标和一个通配符组成的简单路径: {path}")
+        pos = match.end()
+        if match.group("wildcard"):
+            rest = path[pos:]
+            return steps + [WILDCARD], ("$" + rest) if rest else None
+        if match.group("index") is not None:
+            steps.append(int(match.group("index")))
+        elif match.group("quoted") is not None:
+            steps.append(match.group("quoted")[1:-1])
+        else:
+            steps.append(match.group("name"))
+    return steps, None
+
+
+class JSONStreamReader:
+    """从文本流中按路径增量读取 JSON 值"""
+
+    def __init__(self, stream, chunk_chars: int = STREAM_CHUNK_CHARS):
+        self._stream = stream
+        self._chunk_chars = chunk_chars
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self.chars_read = 0
+
+    @property
+    def offset(self) -> int:
+        """已消费的字符数"""
+        return self.chars_read - (len(self._buffer) - self._pos)
+
+    def _fill(self) -> bool:
+        """丢弃已消费的内容并读入下一块，读取量随未消费内容增长，避免大记录反复重解析"""
+        if self._eof:
+            return False
+        data = self._stream.read(max(self._chunk_chars, len(self._buffer) - self._pos))
+        if not data:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + data
+        self._pos = 0
+        self.chars_read += len(data)
+        return True
+
+    def _peek(self) -> str:
+        """跳过空白，返回下一个字符，文件结束时返回空串"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if not char or char not in chars:
+            raise JSONStreamError(f"JSON格式错误: 位置 {self.offset} 处期望 {chars!r}，实际为 {char or 'EOF'!r}")
+        self._pos += 1
+        return char
+
+    def read_value(self) -> Any:
+        """完整解析下一个值"""
+        if not self._peek():
+            raise JSONStreamError("JSON格式错误: 内容意外结束")
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise JSONStreamError(f"JSON解析失败: {e.msg}（位置 {self.offset}）")
+            # 数字可能被截断在缓冲区末尾（"-2." 会被解析为 -2），读入更多内容后重新解析
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and _NUMBER_TAIL.fullmatch(self._buffer, end) and self._fill()):
+                continue
+            self._pos = end
+            return value
+
+    def skip_value(self):
+        """跳过下一个值，只扫描括号和字符串边界，不构造对象"""
+        if self._peek() not in "{[":
+            self.read_value()
+            return
+        depth = 0
+        pos = self._pos
+        while True:
+            match = _STRUCTURAL.search(self._buffer, pos)
+            if match is None:
+                self._pos = len(self._buffer)
+                if not self._fill():
+                    raise JSONStreamError("JSON格式错误: 内容意外结束")
+                pos = self._pos
+                continue
+            char, pos = match.group(), match.end()
+            if char == '"':
+                while True:
+                    tail = _STRING_TAIL.match(self._buffer, pos)
+                    if tail is not None:
+                        pos = tail.end()
+                        break
+                    # 字符串跨越了缓冲区边界，保留字符串内容后继续读取
+                    self._pos = pos
+                    if not self._fill():
+                        raise JSONStreamError("JSON格式错误: 字符串未结束")
+                    pos = self._pos
+            elif char in "{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    self._pos = pos
+                    return
+
+    def _enter_key(self, key: str) -> bool:
+        """进入当前对象中指定键的值，找不到时返回 False"""
+        if self._peek() != "{":
+            return False
+        self._pos += 1
+        if self._peek() == "}":
+            self._pos += 1
+            return False
+        while True:
+            name = self.read_value()
+            self._expect(":")
+            if name == key:
+                return True
+            self.skip_value()
+            if self._expect(",}") == "}":
+                return False
+
+    def _enter_index(self, index: int) -> bool:
+        """进入当前数组中指定下标的元素，找不到时返回 False"""
+        if self._peek() != "[":
+            return False
+        self._pos += 1
+        if self._peek() == "]":
+            self._pos += 1
+            return False
+        position = 0
+        while position < index:
+            self.skip_value()
+            if self._expect(",]") == "]":
+                return False
+            position += 1
+        return True
+
+    def iter_children(self) -> Iterator[Any]:
+        """逐个解析当前数组的元素或对象的值"""
+        opening = self._peek()
+        if opening not in ("[", "{"):
+            return
+        closing = "]" if opening == "[" else "}"
+        self._pos += 1
+        if self._peek() == closing:
+            self._pos += 1
+            return
+        while True:
+            if opening == "{":
+                self.read_value()
+                self._expect(":")
+            yield self.read_value()
+            if self._expect("," + closing) == closing:
+                return
+
+    def iter_path(self, steps: List[Union[str, int, object]]) -> Iterator[Any]:
+        """
+        沿 parse_stream_path 得到的步骤定位并逐个产出匹配的值
+
+        到达目标后立即停止，目标之后的内容不再读取。
+        """
+        for step in steps:
+            if step is WILDCARD:
+                yield from self.iter_children()
+                return
+            found = self._enter_key(step) if isinstance(step, str) else self._enter_index(step)
+            if not found:
+                return
+        yield self.read_value()
+
+
+def iter_jsonl(stream) -> Iterator[Any]:
+    """逐行解析 JSON Lines，空行跳过"""
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise JSONStreamError(f"第 {line_number} 行 JSON 解析失败: {e.msg}")
+
+
+def _field_getter(field: str) -> Callable[[Any], Any]:
+    """把 a.b[0] / @.a.b / $.a.b 形式的字段路径编译为取值函数，路径不存在时抛出 LookupError"""
+    field = re.sub(r'^[@$]\.?', '', field)
+    parts: List[Union[str, int]] = []
+    for name, index in re.findall(r'([^.\[\]]+)|\[(\d+)\]', field):
+        parts.append(int(index) if index else name)
+
+    def getter(record: Any) -> Any:
+        value = record
+        for part in parts:
+            if isinstance(part, int):
+                if not isinstance(value, list):
+                    raise LookupError(part)
+            elif not isinstance(value, dict):
+                raise LookupError(part)
+            value = value[part]
+        return value
+
+    return getter
+
+
+def compile_filter(expression: Optional[str]) -> Callable[[Any], bool]:
+    """
+    编译记录过滤条件
+
+    支持 `字段 运算符 值`（运算符为 == != > >= < <= contains，值按 JSON 解析，解析失败按字符串处理）
+    以及只写字段表示字段存在且为真，例如 `user.age >= 18`、`level == "error"`、`tags contains "x"`。
+    字段不存在或类型无法比较的记录视为不匹配。
+
+    Raises:
+        JSONStreamError: 条件格式错误
+    """
+    if not expression or not expression.strip():
+        return lambda record: True
+    match = _FILTER.match(expression)
+    if match is None:
+        raise JSONStreamError(f"过滤条件格式错误: {expression}")
+    getter = _field_getter(match.group("field"))
+    op = match.group("op")
+    if op is None:
+        def truthy(record: Any) -> bool:
+            try:
+                return bool(getter(record))
+            except LookupError:
+                return False
+        return truthy
+
+    raw = match.group("value")
+    try:
+        expected = json.loads(raw)
+    except json.JSONDecodeError:
+        expected = raw.strip("'\"")
+    compare = _FILTER_OPS[op]
+
+    def predicate(record: Any) -> bool:
+        try:
+            return bool(compare(getter(record), expected))
+        except (LookupError, TypeError):
+            return False
+
+    return predicate
+
+
+class MatchWriter:
+    """把匹配的记录增量写出：.jsonl / .ndjson 每行一条，其他扩展名写成 JSON 数组"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self.lines = path.endswith((".jsonl", ".ndjson"))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+        if not self.lines:
+            self._file.write("[")
+
+    def write(self, record: Any):
+        text = json.dumps(record, ensure_ascii=False)
+        if self.lines:
+            self._file.write(text + "\n")
+        else:
+            self._file.write(("\n  " if self.count == 0 else ",\n  ") + text)
+        self.count += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        if not self.lines:
+            self._file.write("\n]" if self.count else "]")
+        self._file.close()
+
+    def __enter__(self) -> "MatchWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
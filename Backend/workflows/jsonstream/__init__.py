@@ -0,0 +1,8 @@
+#jsonstream/__init__.py
+from .JSONStream import (WILDCARD, JSONStreamError, JSONStreamReader, MatchWriter, compile_filter,
+                         iter_jsonl, parse_stream_path)
+
+__version__ = "1.0.0"
+
+__all__ = ["WILDCARD", "JSONStreamError", "JSONStreamReader", "MatchWriter", "compile_filter",
+           "iter_jsonl", "parse_stream_path"]
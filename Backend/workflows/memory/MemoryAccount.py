@@ -0,0 +1,279 @@
+"""
+单次运行的节点输出内存账本与内存预算
+
+MemoryAccount 按 (节点, 属性) 记录每个输出的字节数（deep_sizeof），汇总出当前仍被持有的输出总量、
+峰值、释放量以及每个节点的统计；启用 tracemalloc 时还记录每个节点 run() 期间的分配峰值。
+
+设置了预算后，每个节点执行完成时检查持有的输出总量：超出预算时按 spill 策略把最大的输出
+转存到磁盘（Artifact 临时文件，读取时通过 mmap 访问），下游通过 askMessage 读取时透明还原；
+转存后仍超出预算，或策略为 fail 时，抛出 MemoryBudgetExceeded 终止运行，而不是等到进程被 OOM 杀掉。
+"""
+import logging
+import mmap
+import os
+import pickle
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from ..artifacts import Artifact, register_describable
+from .MemorySize import deep_sizeof, peak_rss_bytes, walk_objects
+
+logger = logging.getLogger(__name__)
+
+POLICY_SPILL = "spill"
+POLICY_FAIL = "fail"
+# 小于该值的输出转存收益不大，不参与转存
+DEFAULT_SPILL_MIN_BYTES = int(os.environ.get("THRYVE_SPILL_MIN_BYTES", 1024 * 1024))
+
+_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "m": 1024 ** 2, "mb": 1024 ** 2, "g": 1024 ** 3, "gb": 1024 ** 3}
+_SIZE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*$')
+
+OutputKey = Tuple[str, str]
+# 可以安全 pickle 后原样还原的值：Artifact、数据流等对象引用着临时文件或迭代状态，不能复制
+_PLAIN_TYPES = (str, bytes, bytearray, int, float, bool, type(None), dict, list, tuple, set, frozenset)
+
+
+class MemoryBudgetExceeded(Exception):
+    """节点输出超出运行的内存预算"""
+    pass
+
+
+def parse_bytes(value: Any) -> Optional[int]:
+    """解析字节数配置：数字，或带 K / M / G 单位的字符串（如 "512MB"）；空值和 0 表示不限制"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) or None
+    match = _SIZE.match(str(value))
+    if match is None or match.group(2).lower() not in _UNITS:
+        raise ValueError(f"无法识别的字节数: {value}")
+    return int(float(match.group(1)) * _UNITS[match.group(2).lower()]) or None
+
+
+def is_spillable(value: Any) -> bool:
+    """值（包括容器中的所有对象）是否只由普通数据组成，可以转存到磁盘"""
+    return all(type(item) in _PLAIN_TYPES for item in walk_objects(value))
+
+
+@register_describable
+class SpilledValue:
+    """转存到磁盘的节点输出，load() 通过 mmap 读回原值"""
+
+    def __init__(self, name: str, value: Any):
+        """
+        Raises:
+            TypeError: 值中包含 Artifact、数据流等不能复制的对象
+        """
+        if not is_spillable(value):
+            raise TypeError(f"{name} 包含不能转存的对象，只支持字符串、字节、数字和由它们组成的容器")
+        if isinstance(value, str):
+            self.kind, data = "text", value.encode("utf-8")
+        elif isinstance(value, (bytes, bytearray)):
+            self.kind, data = "bytes", bytes(value)
+        else:
+            self.kind, data = "pickle", pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self.type_name = type(value).__name__
+        self.artifact = Artifact(name, data, spill_bytes=0)
+
+    @property
+    def size(self) -> int:
+        return self.artifact.size
+
+    def load(self) -> Any:
+        """读回原值，直接从映射的文件内容解码，不经过中间副本"""
+        view = self.artifact.view()
+        try:
+            if self.kind == "text":
+                return str(view, "utf-8")
+            if self.kind == "bytes":
+                return bytes(view)
+            return pickle.loads(view)
+        finally:
+            if isinstance(view, mmap.mmap):
+                view.close()
+
+    def release(self):
+        self.artifact.release()
+
+    def __repr__(self) -> str:
+        return f"<SpilledValue {self.type_name} {self.size} bytes>"
+
+    def describe(self) -> dict:
+        """可序列化的描述信息，用于发送到前端"""
+        return {"spilled": True, "type": self.type_name, "size": self.size}
+
+
+class MemoryAccount:
+    """单次运行的节点输出内存账本"""
+
+    def __init__(self, budget_bytes: Optional[int] = None, policy: str = POLICY_SPILL, trace: bool = False,
+                 spill_min_bytes: int = DEFAULT_SPILL_MIN_BYTES):
+        """
+        Args:
+            budget_bytes: 持有的节点输出总字节数上限，None 表示不限制
+            policy: 超出预算时的处理方式，spill（先转存最大的输出）或 fail（立即失败）
+            trace: 是否使用 tracemalloc 记录每个节点 run() 期间的内存分配
+            spill_min_bytes: 参与转存的输出的最小字节数
+        """
+        if policy not in (POLICY_SPILL, POLICY_FAIL):
+            raise ValueError(f"不支持的内存预算策略: {policy}")
+        self.budget_bytes = budget_bytes
+        self.policy = policy
+        self.trace = trace
+        self.spill_min_bytes = spill_min_bytes
+        self.outputs: Dict[OutputKey, int] = {}
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.live_bytes = 0
+        self.peak_bytes = 0
+        self.freed_bytes = 0
+        self.freed_outputs = 0
+        self.released_nodes = 0
+        self.spilled_bytes = 0
+        self.spilled_outputs = 0
+        self._started_tracing = False
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> "MemoryAccount":
+        """
+        从工作流数据构建：memoryBudget（如 "2GB"）、memoryPolicy（spill / fail）、traceMemory，
+        未配置时使用环境变量 THRYVE_MEMORY_BUDGET、THRYVE_MEMORY_POLICY、THRYVE_TRACE_MEMORY
+        """
+        config = config or {}
+        budget = config.get("memoryBudget", os.environ.get("THRYVE_MEMORY_BUDGET"))
+        policy = config.get("memoryPolicy") or os.environ.get("THRYVE_MEMORY_POLICY", POLICY_SPILL)
+        trace = config.get("traceMemory", os.environ.get("THRYVE_TRACE_MEMORY", "0") not in ("", "0"))
+        return cls(parse_bytes(budget), policy, bool(trace))
+
+    def _node(self, node_id: str) -> Dict[str, Any]:
+        stats = self.nodes.get(node_id)
+        if stats is None:
+            stats = self.nodes[node_id] = {
+                "runs": 0, "outputBytes": 0, "peakOutputBytes": 0, "freedBytes": 0, "spilledBytes": 0,
+                "allocatedBytes": None, "peakAllocatedBytes": None, "seconds": 0.0
+            }
+        return stats
+
+    def _set_size(self, key: OutputKey, size: int) -> int:
+        previous = self.outputs.get(key, 0)
+        self.outputs[key] = size
+        self.live_bytes += size - previous
+        stats = self._node(key[0])
+        stats["outputBytes"] += size - previous
+        stats["peakOutputBytes"] = max(stats["peakOutputBytes"], stats["outputBytes"])
+        return previous
+
+    def measure(self, node_id: str, port: str, value: Any) -> int:
+        """记录输出的字节数"""
+        size = deep_sizeof(value)
+        self._set_size((node_id, port), size)
+        return size
+
+    def update_peak(self):
+        self.peak_bytes = max(self.peak_bytes, self.live_bytes)
+
+    def forget(self, node_id: str, port: str) -> int:
+        """输出被释放，返回释放的字节数"""
+        size = self._set_size((node_id, port), 0)
+        del self.outputs[(node_id, port)]
+        self.freed_bytes += size
+        self.freed_outputs += 1
+        self._node(node_id)["freedBytes"] += size
+        return size
+
+    @contextmanager
+    def track(self, node_id: str) -> Iterator[None]:
+        """
+        记录节点 run() 的耗时，启用 tracemalloc 时记录净分配量和分配峰值
+
+        tracemalloc 是进程级的，子工作流或并发运行会计入同一统计，数值只作参考。
+        """
+        stats = self._node(node_id)
+        stats["runs"] += 1
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        tracing = self.trace and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats["seconds"] += time.perf_counter() - start
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                stats["allocatedBytes"] = current - before
+                stats["peakAllocatedBytes"] = max(stats["peakAllocatedBytes"] or 0, peak - before)
+
+    def over_budget(self) -> bool:
+        return self.budget_bytes is not None and self.live_bytes > self.budget_bytes
+
+    def enforce(self, instances: Dict[str, Any], node_id: str):
+        """
+        在 node_id 执行完成后检查预算，spill 策略下按大小依次转存输出直到回到预算内
+
+        Raises:
+            MemoryBudgetExceeded: 策略为 fail 或转存后仍超出预算
+        """
+        if not self.over_budget():
+            return
+        if self.policy == POLICY_SPILL:
+            for key, size in sorted(self.outputs.items(), key=lambda item: item[1], reverse=True):
+                if not self.over_budget() or size < self.spill_min_bytes:
+                    break
+                self._spill(instances, key)
+        if self.over_budget():
+            largest = sorted(self.outputs.items(), key=lambda item: item[1], reverse=True)[:3]
+            details = ", ".join(f"{producer}.{port}={size}" for (producer, port), size in largest)
+            raise MemoryBudgetExceeded(
+                f"节点 {node_id} 执行后节点输出共 {self.live_bytes} 字节，超出内存预算 {self.budget_bytes} 字节"
+                f"（最大的输出: {details}）")
+
+    def _spill(self, instances: Dict[str, Any], key: OutputKey):
+        producer_id, port = key
+        messages = getattr(instances.get(producer_id), "MessageList", None)
+        if not isinstance(messages, dict) or port not in messages:
+            return
+        value = messages[port]
+        # 已转存的输出、产物、数据流以及包含它们的容器不转存
+        if isinstance(value, SpilledValue) or not is_spillable(value):
+            return
+        try:
+            spilled = SpilledValue(f"{producer_id}.{port}", value)
+        except Exception as e:
+            logger.warning(f"输出 {producer_id}.{port} 无法转存到磁盘: {str(e)}")
+            return
+        messages[port] = spilled
+        before = self._set_size(key, deep_sizeof(spilled))
+        self.spilled_bytes += before
+        self.spilled_outputs += 1
+        self._node(producer_id)["spilledBytes"] += before
+        logger.info(f"内存预算: 输出 {producer_id}.{port}（{before} 字节）已转存到磁盘")
+
+    def finish(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def report(self) -> Dict[str, Any]:
+        """整次运行的统计"""
+        return {
+            "liveBytes": self.live_bytes,
+            "peakBytes": self.peak_bytes,
+            "freedBytes": self.freed_bytes,
+            "freedOutputs": self.freed_outputs,
+            "releasedNodes": self.released_nodes,
+            "spilledBytes": self.spilled_bytes,
+            "spilledOutputs": self.spilled_outputs,
+            "budgetBytes": self.budget_bytes,
+            "policy": self.policy,
+            "peakRssBytes": peak_rss_bytes()
+        }
+
+    def node_report(self) -> Dict[str, Dict[str, Any]]:
+        """每个节点的统计"""
+        return {node_id: dict(stats) for node_id, stats in self.nodes.items()}
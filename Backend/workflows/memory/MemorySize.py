@@ -0,0 +1,62 @@
+"""
+节点输出的内存占用估算
+
+deep_sizeof 沿容器（字典、列表、元组、集合）递归累加 sys.getsizeof，同一对象只计算一次；
+Artifact 只计算仍在内存中的内容，图像按像素数据估算，numpy 数组等带 nbytes 的对象按数据大小计算。
+数据流、惰性文件列表等其他对象只计算对象本身，不迭代、不沿属性展开
+（属性中往往引用着节点和事件总线，展开会把整个引擎算进去）。
+"""
+import sys
+from typing import Any, Iterator, Optional
+
+from PIL import Image
+
+from ..artifacts import Artifact
+from ..cache import image_nbytes
+
+_CONTAINERS = (dict, list, tuple, set, frozenset)
+
+
+def _object_size(value: Any) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, Artifact):
+        return size + (0 if value.spilled else len(value._memory))
+    if isinstance(value, Image.Image):
+        return size + image_nbytes(value)
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int) and not isinstance(value, (bytes, bytearray)):
+        return max(size, nbytes)
+    return size
+
+
+def walk_objects(value: Any) -> Iterator[Any]:
+    """遍历值本身及容器（字典、列表、元组、集合）中包含的对象，同一对象只返回一次"""
+    seen = set()
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        yield item
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, _CONTAINERS):
+            stack.extend(item)
+
+
+def deep_sizeof(value: Any) -> int:
+    """估算值及其包含的对象占用的字节数"""
+    return sum(_object_size(item) for item in walk_objects(value))
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """进程的常驻内存峰值（字节），平台不支持时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为 KB，macOS 上为字节
+    return peak if sys.platform == "darwin" else peak * 1024
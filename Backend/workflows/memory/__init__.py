@@ -0,0 +1,7 @@
+#memory/__init__.py
+from .MemorySize import deep_sizeof, peak_rss_bytes, walk_objects
+from .MemoryAccount import MemoryAccount, MemoryBudgetExceeded, SpilledValue, parse_bytes
+
+__version__ = "1.0.0"
+
+__all__ = ["deep_sizeof", "peak_rss_bytes", "walk_objects", "MemoryAccount", "MemoryBudgetExceeded", "SpilledValue", "parse_bytes"]
\ No newline at end of file
@@ -1,8 +1,13 @@
 import csv
-from typing import Dict, Any, List, Optional
+from itertools import islice
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional
 from .MessageNode import MessageNode
 import json
 import os
+import io
+from ..artifacts import describe_artifacts
+from ..encoding import detect_encoding, read_text
+from ..streams import DEFAULT_BUFFER_SIZE, Stream
 
 class CSVProcessError(Exception):
     """CSV处理错误"""
@@ -17,19 +22,48 @@ def generate_output_path(output_folder: str, output_name: str) -> str:
 def read_csv_file(file_path: str) -> List[Dict[str, str]]:
     """读取CSV文件并返回字典列表"""
     try:
-        with open(file_path, 'r', encoding='utf-8', newline='') as f:
-            reader = csv.DictReader(f)
-            return list(reader)
+        try:
+            with open(file_path, 'r', encoding=detect_encoding(file_path), newline='') as f:
+                reader = csv.DictReader(f)
+                return list(reader)
+        except UnicodeDecodeError:
+            # 前缀探测的编码无法解码后面的内容时，读取全文重新判断
+            text, _ = read_text(file_path)
+            return list(csv.DictReader(io.StringIO(text, newline='')))
     except Exception as e:
         raise CSVProcessError(f"读取CSV文件失败: {str(e)}")
 
-def write_csv_file(file_path: str, data: List[Dict[str, str]], fieldnames: List[str]) -> None:
-    """将数据写入CSV文件"""
+def iter_csv_rows(file_path: str) -> Iterator[Dict[str, str]]:
+    """逐行读取CSV文件，不整体载入内存"""
+    yielded = 0
+    try:
+        with open(file_path, 'r', encoding=detect_encoding(file_path), newline='') as f:
+            for row in csv.DictReader(f):
+                yield row
+                yielded += 1
+        return
+    except UnicodeDecodeError:
+        pass
+    # 前缀探测的编码无法解码后面的内容时，读取全文重新判断，跳过已经产出的行
+    text, _ = read_text(file_path)
+    yield from islice(csv.DictReader(io.StringIO(text, newline='')), yielded, None)
+
+def read_csv_header(file_path: str) -> List[str]:
+    """读取CSV文件的列名"""
+    with open(file_path, 'r', encoding=detect_encoding(file_path), errors='replace', newline='') as f:
+        return next(csv.reader(f), [])
+
+def write_csv_file(file_path: str, data: Iterable[Dict[str, str]], fieldnames: List[str]) -> int:
+    """将数据写入CSV文件，data 可以是列表或数据流，逐行写出，返回写入的行数"""
     try:
+        count = 0
         with open(file_path, 'w', encoding='utf-8', newline='') as f:
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
-            writer.writerows(data)
+            for row in data:
+                writer.writerow(row)
+                count += 1
+        return count
     except Exception as e:
         raise CSVProcessError(f"写入CSV文件失败: {str(e)}")
 
@@ -45,6 +79,34 @@ def convert_value(value: str, column: str) -> Any:
         # 如果转换失败，返回原始字符串
         return value
 
+def make_row_filter(column: str, condition: str, value: str) -> Callable[[Dict[str, str]], bool]:
+    """
+    构建行过滤函数
+
+    Raises:
+        CSVProcessError: 不支持的过滤条件
+    """
+    filter_value = convert_value(value, column)
+    if condition == "equals":
+        return lambda row: convert_value(row[column], column) == filter_value
+    if condition == "contains":
+        return lambda row: str(convert_value(row[column], column)).find(str(filter_value)) != -1
+    if condition == "greater than":
+        def greater(row):
+            row_value = convert_value(row[column], column)
+            return isinstance(row_value, (int, float)) and row_value > filter_value
+        return greater
+    if condition == "less than":
+        def less(row):
+            row_value = convert_value(row[column], column)
+            return isinstance(row_value, (int, float)) and row_value < filter_value
+        return less
+    raise CSVProcessError(f"不支持的过滤条件: {condition}")
+
+def _chain_first(first: Any, rest: Iterator[Any]) -> Iterator[Any]:
+    yield first
+    yield from rest
+
 class CSVProcessor(MessageNode):
     def __init__(self, id: str, type: str, nextNodes: list, eventBus: Any, data: Dict[str, Any]):
         """
@@ -204,25 +266,8 @@ class CSVProcessor(MessageNode):
             
             # 过滤数据
             try:
-                filtered_data = []
-                for row in data:
-                    row_value = convert_value(row[column], column)
-                    filter_value = convert_value(value, column)
-                    
-                    if condition == "equals":
-                        if row_value == filter_value:
-                            filtered_data.append(row)
-                    elif condition == "contains":
-                        if str(row_value).find(str(filter_value)) != -1:
-                            filtered_data.append(row)
-                    elif condition == "greater than":
-                        if isinstance(row_value, (int, float)) and row_value > filter_value:
-                            filtered_data.append(row)
-                    elif condition == "less than":
-                        if isinstance(row_value, (int, float)) and row_value < filter_value:
-                            filtered_data.append(row)
-                    else:
-                        raise CSVProcessError(f"不支持的过滤条件: {condition}")
+                matches = make_row_filter(column, condition, value)
+                filtered_data = [row for row in data if matches(row)]
                 
                 self._eventBus.emit("message", "info", self._id, f"过滤完成，结果包含 {len(filtered_data)} 行数据")
                 
@@ -342,6 +387,81 @@ class CSVProcessor(MessageNode):
             self._eventBus.emit("message", "error", self._id, f"聚合CSV数据失败: {str(e)}")
             raise CSVProcessError(f"聚合CSV数据失败: {str(e)}")
 
+    def stream_csv(self) -> Dict[str, Any]:
+        """以数据流输出CSV行，可选按条件过滤，下游节点逐行消费，不整体载入内存"""
+        try:
+            input_file = self._get_input_value(self.inputs.get("inputFile"))
+            if not input_file:
+                raise CSVProcessError("输入文件路径为空")
+            if not os.path.exists(input_file):
+                raise CSVProcessError(f"输入文件不存在: {input_file}")
+
+            columns = read_csv_header(input_file)
+            if not columns:
+                raise CSVProcessError("CSV文件为空")
+
+            column = self._get_input_value(self.inputs.get("column")) if self.inputs.get("column") else ""
+            buffer_size = self._get_input_value(self.inputs.get("bufferSize")) if self.inputs.get("bufferSize") else ""
+            buffer_size = int(buffer_size) if str(buffer_size).strip() else DEFAULT_BUFFER_SIZE
+
+            rows = Stream(lambda: iter_csv_rows(input_file), buffer_size, os.path.basename(input_file))
+            if column:
+                if column not in columns:
+                    raise CSVProcessError(f"列名 '{column}' 不存在，可用的列名有: {', '.join(columns)}")
+                condition = self._get_input_value(self.inputs.get("condition"))
+                value = self._get_input_value(self.inputs.get("value"))
+                rows = rows.filter(make_row_filter(column, condition, value))
+                self._eventBus.emit("message", "info", self._id, f"过滤条件: {column} {condition} {value}")
+
+            self._eventBus.emit("message", "info", self._id, f"已创建CSV数据流: {input_file}")
+            return {
+                "rows": rows,
+                "columns": columns,
+                "filePath": input_file
+            }
+        except Exception as e:
+            self._eventBus.emit("message", "error", self._id, f"创建CSV数据流失败: {str(e)}")
+            raise CSVProcessError(f"创建CSV数据流失败: {str(e)}")
+
+    def write_csv(self) -> Dict[str, Any]:
+        """把行列表或数据流逐行写入CSV文件"""
+        try:
+            rows = self._get_input_value(self.inputs.get("rows"))
+            if rows is None or isinstance(rows, str):
+                raise CSVProcessError("输入行必须是列表或数据流")
+
+            output_folder = self._get_input_value(self.inputs.get("outputFolder"))
+            output_name = self._get_input_value(self.inputs.get("outputName"))
+            if not output_folder or not output_name:
+                raise CSVProcessError("输出路径参数不完整")
+            output_file = generate_output_path(output_folder, output_name)
+            os.makedirs(output_folder, exist_ok=True)
+
+            columns_input = self._get_input_value(self.inputs.get("columns")) if self.inputs.get("columns") else ""
+            if isinstance(columns_input, list):
+                columns = [str(column) for column in columns_input]
+            else:
+                columns = [column.strip() for column in str(columns_input).split(",") if column.strip()]
+
+            iterator = iter(rows)
+            if not columns:
+                # 未指定列名时使用第一行的键
+                first = next(iterator, None)
+                if first is None:
+                    raise CSVProcessError("输入行为空且未指定列名")
+                columns = list(first.keys())
+                iterator = _chain_first(first, iterator)
+
+            row_count = write_csv_file(output_file, iterator, columns)
+            self._eventBus.emit("message", "info", self._id, f"已写入 {row_count} 行到: {output_file}")
+            return {
+                "rowCount": row_count,
+                "filePath": output_file
+            }
+        except Exception as e:
+            self._eventBus.emit("message", "error", self._id, f"写入CSV数据失败: {str(e)}")
+            raise CSVProcessError(f"写入CSV数据失败: {str(e)}")
+
     def run(self):
         """
         执行CSV处理节点
@@ -356,6 +476,10 @@ class CSVProcessor(MessageNode):
                     result = self.sort_csv()
                 case "aggregate":
                     result = self.aggregate_csv()
+                case "stream":
+                    result = self.stream_csv()
+                case "write":
+                    result = self.write_csv()
                 case _:
                     raise CSVProcessError(f"不支持的操作模式: {self.mode}")
 
@@ -366,8 +490,8 @@ class CSVProcessor(MessageNode):
             if "filePath" in result:
                 self.MessageList["outputFile"] = result["filePath"]
             
-            # 将结果转换为字符串
-            result_str = json.dumps(result, ensure_ascii=False)
+            # 将结果转换为字符串，数据流只输出描述信息
+            result_str = json.dumps(describe_artifacts(result), ensure_ascii=False)
             
             # 发送处理结果
             self._eventBus.emit("nodes_output", self._id, result_str)
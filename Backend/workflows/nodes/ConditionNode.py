@@ -1,6 +1,7 @@
 from enum import Enum
 from typing import Dict, Optional, Any, List
 from .Node import Node
+from ..streams import materialize
 
 class ConditionError(Exception):
     """条件表达式错误"""
@@ -175,7 +176,7 @@ class ConditionNode(Node):
                 if node_id.endswith("_locals"):
                     node_id = node_id[:-7]
                 param_name = content[1]
-                return self._eventBus.emit("askMessage", node_id, param_name)
+                return materialize(self._eventBus.emit("askMessage", node_id, param_name))
             else:
                 return None
         
@@ -1,11 +1,24 @@
 from .MessageNode import MessageNode
-from typing import Dict, Any, List
-import os
+from functools import partial
+from typing import Dict, Any, List, Union
+from ..fswalk import ChangeScan, FileWalk, WalkOptions, get_snapshot_index
 
 class FolderInputError(Exception):
     """文件夹输入节点错误"""
     pass
 
+def _report_walk_error(eventBus, node_id: str, path: str, error: Exception):
+    """记录错误但继续遍历"""
+    eventBus.emit("message", "warning", node_id, f"处理文件 {path} 时出错: {str(error)}")
+
+
+def _commit_snapshots(eventBus, node_id: str, scans: Dict[str, ChangeScan]):
+    """工作流成功结束后提交 changedOnly 的文件快照"""
+    for propName, scan in scans.items():
+        if not scan.commit():
+            eventBus.emit("message", "warning", node_id, f"{propName} 未完整遍历，不更新文件快照")
+
+
 class FolderInput(MessageNode):
 
     def __init__(self, id, type, nextNodes, eventBus, data: Dict[str, Any]):
@@ -25,6 +38,13 @@ class FolderInput(MessageNode):
         super(MessageNode, self).__init__(id, type, nextNodes, eventBus)
         
         self.MessageList = {}
+        # 文件列表属性的遍历配置，在运行时才遍历目录
+        self._walks: Dict[str, Union[FileWalk, ChangeScan]] = {}
+        self._lazy: Dict[str, bool] = {}
+        # 运行前已被下游按需遍历的属性，run() 直接使用结果，不再重复遍历
+        self._prefetched = set()
+        # 遍历错误回调不引用节点自身，ChangeScan 交给引擎保存时不会让节点实例无法释放
+        self._on_walk_error = partial(_report_walk_error, eventBus, id)
         
         # 验证data结构
         if not isinstance(data, dict):
@@ -51,21 +71,17 @@ class FolderInput(MessageNode):
                     
                 # 处理文件夹路径和文件列表
                 if propName.endswith('_files'):
-                    # 文件列表属性 - 根据deepSearch决定是否递归处理
-                    file_list = []
+                    # 文件列表属性 - 根据deepSearch决定是否递归处理，过滤条件来自对应的folder配置
                     default_files = propInfo.get('default', [])
                     
                     # 获取对应的folder配置
                     folder_name = propName[:-6]  # 移除'_files'后缀
                     folder_config = next((f for f in folders if f.get('variableName') == folder_name), None)
-                    deep_search = folder_config.get('deepSearch', False) if folder_config else False
                     
-                    # 处理所有文件，包括子文件夹中的文件
-                    for file_info in default_files:
-                        if isinstance(file_info, dict) and 'path' in file_info:
-                            self._add_files_recursively(file_info['path'], file_list, deep_search)
-                                
-                    self.MessageList[propName] = file_list
+                    roots = [file_info['path'] for file_info in default_files
+                             if isinstance(file_info, dict) and 'path' in file_info]
+                    self._walks[propName] = self._create_walk(propName, roots, folder_config or {})
+                    self._lazy[propName] = bool(folder_config.get('lazy', False)) if folder_config else False
                 else:
                     # 文件夹路径属性
                     self.MessageList[propName] = propInfo.get('default', '')
@@ -73,29 +89,37 @@ class FolderInput(MessageNode):
         except Exception as e:
             raise FolderInputError(f"节点 {id} 初始化属性失败: {str(e)}",11)
 
-    def _add_files_recursively(self, path: str, file_list: List[str], deep_search: bool):
+        # changedOnly 模式在工作流成功结束后才提交快照，失败的运行下次会重新产出这些文件；
+        # 回调按节点 ID 注册，循环体中重新创建的实例替换之前的回调
+        scans = {propName: walk for propName, walk in self._walks.items() if isinstance(walk, ChangeScan)}
+        if scans:
+            self._eventBus.emit("registerSuccessHook", id, partial(_commit_snapshots, eventBus, id, scans))
+
+    def _create_walk(self, propName: str, roots: List[str], folder_config: Dict[str, Any]):
         """
-        递归处理文件列表，将所有文件（包括子文件夹中的文件）添加到同一个列表中
-        
-        Args:
-            path: 文件或文件夹的路径
-            file_list: 存储所有文件路径的列表
-            deep_search: 是否进行深度搜索
+        changedOnly: 只输出上次成功运行以来新增或修改的文件，hashContent 时再比较内容哈希
+        useIndex: 目录未变化时使用快照索引中缓存的目录列表
         """
-        try:
-            if os.path.exists(path):
-                if os.path.isdir(path):
-                    if deep_search:
-                        # 如果是目录且启用了深度搜索，递归处理
-                        for item in os.listdir(path):
-                            item_path = os.path.join(path, item)
-                            self._add_files_recursively(item_path, file_list, deep_search)
-                else:
-                    # 如果是文件，添加到结果列表
-                    file_list.append(path)
-        except Exception as e:
-            # 记录错误但继续处理
-            self._eventBus.emit("message", "warning", self._id, f"处理文件 {path} 时出错: {str(e)}")
+        options = WalkOptions.from_config(folder_config)
+        if folder_config.get('changedOnly'):
+            key = folder_config.get('snapshotKey') or f"{self._id}/{propName}"
+            return ChangeScan(get_snapshot_index(), key, roots, options,
+                              bool(folder_config.get('hashContent', False)), self._on_walk_error)
+        if folder_config.get('useIndex'):
+            return FileWalk(roots, options, self._on_walk_error, get_snapshot_index().list_dir)
+        return FileWalk(roots, options, self._on_walk_error)
+
+    def _resolve_files(self, propName: str):
+        """lazy 模式输出可重复迭代的惰性文件列表，循环节点边遍历边处理；否则一次性展开为列表"""
+        walk = self._walks[propName]
+        self.MessageList[propName] = walk if self._lazy[propName] else walk.to_list()
+
+    def getMessage(self, paramName):
+        # 节点尚未运行时被引用，按需遍历
+        if paramName not in self.MessageList and paramName in self._walks:
+            self._resolve_files(paramName)
+            self._prefetched.add(paramName)
+        return super().getMessage(paramName)
 
     def run(self):
         """
@@ -109,6 +133,13 @@ class FolderInput(MessageNode):
             raise FolderInputError(f"节点 {self._id} 没有指定下一个节点",11)
             
         try:
+            for propName, walk in self._walks.items():
+                if propName not in self._prefetched:
+                    self._resolve_files(propName)
+                if isinstance(walk, ChangeScan) and not self._lazy[propName]:
+                    self._eventBus.emit("message", "info", self._id,
+                                        f"{propName}: 新增 {walk.added}，修改 {walk.modified}，未变化 {walk.unchanged}")
+            self._prefetched.clear()
             self.updateNext()
             self._eventBus.emit("message", "info", self._id, "Folderinput success!")
             return self.MessageList
@@ -3,6 +3,107 @@ import os
 from typing import Dict, Any, List
 from PIL import Image, ImageDraw, ImageFont, ImageEnhance, ImageFilter
 import io
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from ..cache.ImageCache import LOSSLESS_EXTENSIONS
+from ..streams import materialize
+
+# 缩小时的 reducing_gap：先用 reduce() 整数倍缩小到目标尺寸的该倍数以内，再做 LANCZOS 重采样
+REDUCING_GAP = 3.0
+# JPEG draft 解码保留的余量：DCT 域缩放到不小于目标尺寸的该倍数，保证最终重采样质量
+DRAFT_MARGIN = 2
+WATERMARK_FONT_PATHS = (
+    "C:\\Windows\\Fonts\\simhei.ttf",  # 黑体
+    "C:\\Windows\\Fonts\\simsun.ttc",  # 宋体
+    "C:\\Windows\\Fonts\\msyh.ttc",    # 微软雅黑
+    "arial.ttf"  # 回退到英文字体
+)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.tif', '.webp')
+
+
+def downscale_image(image: Image.Image, size) -> Image.Image:
+    """
+    将图像缩放到指定尺寸，缩小时走快速路径
+
+    - JPEG 尚未解码时用 draft 在 DCT 域直接按 1/2、1/4、1/8 解码，减少解码耗时和内存
+    - 缩小比例较大时通过 reducing_gap 先用 reduce() 做整数倍缩小，再做 LANCZOS 重采样
+    - 放大或尺寸不变时保持原有的全质量 LANCZOS 重采样
+    """
+    width, height = size
+    if width >= image.width and height >= image.height:
+        return image.resize((width, height), Image.LANCZOS)
+    if image.format == 'JPEG' and image.mode in ('RGB', 'L', 'CMYK'):
+        image.draft(image.mode, (width * DRAFT_MARGIN, height * DRAFT_MARGIN))
+    return image.resize((width, height), Image.LANCZOS, reducing_gap=REDUCING_GAP)
+
+
+def _make_thumbnail(input_file: str, output_file: str, max_size: int) -> Dict[str, Any]:
+    """为单个图像生成缩略图，保持宽高比"""
+    with Image.open(input_file) as image:
+        ratio = min(max_size / image.width, max_size / image.height, 1)
+        size = (max(1, int(image.width * ratio)), max(1, int(image.height * ratio)))
+        thumbnail = downscale_image(image, size)
+        if os.path.splitext(output_file)[1].lower() in ('.jpg', '.jpeg') and thumbnail.mode not in ('RGB', 'L'):
+            thumbnail = thumbnail.convert('RGB')
+        thumbnail.save(output_file)
+    return {"source": input_file, "thumbnail": output_file, "width": size[0], "height": size[1]}
+
+
+@lru_cache(maxsize=32)
+def load_watermark_font(font_size: int):
+    """
+    按字号加载水印字体，进程内缓存
+
+    Returns:
+        tuple: (字体对象, 字体路径)，找不到可用字体时路径为 None 并使用默认字体
+    """
+    for font_path in WATERMARK_FONT_PATHS:
+        try:
+            return ImageFont.truetype(font_path, font_size), font_path
+        except Exception:
+            continue
+    return ImageFont.load_default(), None
+
+
+@lru_cache(maxsize=256)
+def render_watermark_tile(text: str, font, alpha: int):
+    """
+    绘制只包含文本包围盒的水印图块，按 (文本, 字体, 透明度) 缓存
+
+    Args:
+        font: load_watermark_font 返回的字体对象，同一字号始终是同一对象，可以作为缓存键
+
+    Returns:
+        tuple: (RGBA 图块, 图块相对绘制原点的偏移, 文本宽高)
+    """
+    left, top, right, bottom = ImageDraw.Draw(Image.new('RGBA', (1, 1))).textbbox((0, 0), text, font=font)
+    tile = Image.new('RGBA', (max(1, right - left), max(1, bottom - top)), (0, 0, 0, 0))
+    ImageDraw.Draw(tile).text((-left, -top), text, font=font, fill=(255, 0, 0, alpha))
+    return tile, (left, top), (right - left, bottom - top)
+
+
+def _tile_overlap(image: Image.Image, tile: Image.Image, position):
+    """图块与图像相交的区域，返回 (图像中的区域, 图块中的区域)，不相交时返回 None"""
+    x, y = position
+    box = (max(x, 0), max(y, 0), min(x + tile.width, image.width), min(y + tile.height, image.height))
+    if box[0] >= box[2] or box[1] >= box[3]:
+        return None
+    return box, (box[0] - x, box[1] - y, box[2] - x, box[3] - y)
+
+
+def composite_tile(image: Image.Image, tile: Image.Image, position) -> Image.Image:
+    """将 RGBA 图块原地合成到图像的指定位置，只处理二者相交的区域"""
+    overlap = _tile_overlap(image, tile, position)
+    if overlap is not None:
+        box, source = overlap
+        if image.mode == 'RGBA':
+            image.alpha_composite(tile, dest=box[:2], source=source)
+        else:
+            # 不带透明通道的图像以图块的 alpha 通道为蒙版粘贴
+            region = tile.crop(source)
+            image.paste(region, box[:2], region)
+    return image
+
 
 class ImageProcessor(MessageNode):
     def __init__(self, id: str, type: str, nextNodes: List, eventBus, data: Dict):
@@ -20,6 +121,7 @@ class ImageProcessor(MessageNode):
         self.data = data
         self.mode = data.get('mode', '')
         self.input_file = None
+        self._image_cache = None
         
         # 获取输出路径配置
         self.output_folder = self._get_input_value(data, 'outputFolder') or "output"
@@ -44,7 +146,7 @@ class ImageProcessor(MessageNode):
                 if node_id.endswith("_locals"):
                     node_id = node_id[:-7]
                 param_name = content[1]
-                return self._eventBus.emit("askMessage", node_id, param_name)
+                return materialize(self._eventBus.emit("askMessage", node_id, param_name))
         return None
 
     def _get_unique_filename(self, filepath: str) -> str:
@@ -71,6 +173,41 @@ class ImageProcessor(MessageNode):
                 return new_filepath
             counter += 1
 
+    def _get_image_cache(self):
+        """获取本次运行共享的图像缓存，未在引擎中运行时返回 None"""
+        if self._image_cache is None:
+            self._image_cache = self._eventBus.emit("getImageCache")
+        return self._image_cache
+
+    def _open_image(self, lazy: bool = False) -> Image.Image:
+        """
+        打开输入图像：上游直接传入的内存图像原样使用，文件优先从运行期图像缓存读取
+
+        Args:
+            lazy: 缓存未命中时返回未解码的图像且不放入缓存，便于缩小时使用 draft 解码
+        """
+        if isinstance(self.input_file, Image.Image):
+            return self.input_file
+        cache = self._get_image_cache()
+        if cache is None:
+            return Image.open(self.input_file)
+        if lazy:
+            image = cache.get(self.input_file)
+            return image if image is not None else Image.open(self.input_file)
+        return cache.load(self.input_file)
+
+    def _input_extension(self) -> str:
+        """输出文件沿用输入文件的扩展名，内存图像按其格式推断"""
+        if isinstance(self.input_file, Image.Image):
+            return f".{(self.input_file.format or 'png').lower()}"
+        return os.path.splitext(self.input_file)[1]
+
+    def _cache_output(self, output_file: str, image: Image.Image):
+        """无损格式的输出放入运行期缓存，下游节点读取该文件时无需重新解码"""
+        cache = self._get_image_cache()
+        if cache is not None and os.path.splitext(output_file)[1].lower() in LOSSLESS_EXTENSIONS:
+            cache.put(output_file, image)
+
     def run(self) -> bool:
         """
         执行图像处理节点
@@ -97,6 +234,8 @@ class ImageProcessor(MessageNode):
                 result = self._apply_filter()
             elif self.mode == 'watermark':
                 result = self._add_watermark()
+            elif self.mode == 'thumbnail':
+                result = self._generate_thumbnails()
             else:
                 raise ValueError(f"不支持的操作模式: {self.mode}")
 
@@ -124,7 +263,7 @@ class ImageProcessor(MessageNode):
             maintain_aspect_ratio = self._get_input_value(self.data, 'maintainAspectRatio')or False
 
             # 打开图像
-            image = Image.open(self.input_file)
+            image = self._open_image(lazy=True)
             original_width, original_height = image.size
 
             # 计算新尺寸
@@ -136,12 +275,13 @@ class ImageProcessor(MessageNode):
                 new_width = width
                 new_height = height
 
-            # 调整大小
-            resized_image = image.resize((new_width, new_height), Image.LANCZOS)
+            # 调整大小（缩小时使用 draft/reduce 快速路径）
+            resized_image = downscale_image(image, (new_width, new_height))
 
             # 保存结果
-            output_file = self._get_unique_filename(os.path.join(self.output_folder, f"{self.output_name}{os.path.splitext(self.input_file)[1]}"))
+            output_file = self._get_unique_filename(os.path.join(self.output_folder, f"{self.output_name}{self._input_extension()}"))
             resized_image.save(output_file)
+            self._cache_output(output_file, resized_image)
 
             # 获取处理后的图像信息
             processed_info = {
@@ -158,13 +298,61 @@ class ImageProcessor(MessageNode):
         except Exception as e:
             raise RuntimeError(f"调整图像大小时发生错误: {str(e)}")
 
+    def _generate_thumbnails(self) -> Dict[str, Any]:
+        """为文件夹中的所有图像批量生成缩略图"""
+        try:
+            input_folder = self._get_input_value(self.data, 'inputFolder')
+            max_size = int(self._get_input_value(self.data, 'maxSize') or 256)
+            recursive = self._get_input_value(self.data, 'recursive') or False
+            workers = int(self._get_input_value(self.data, 'workers') or os.cpu_count() or 1)
+
+            if not input_folder or not os.path.isdir(input_folder):
+                raise ValueError(f"输入文件夹不存在: {input_folder}")
+
+            input_files = []
+            for root, dirs, files in os.walk(input_folder):
+                input_files.extend(os.path.join(root, name) for name in sorted(files)
+                                   if name.lower().endswith(IMAGE_EXTENSIONS))
+                if not recursive:
+                    break
+                dirs.sort()
+
+            # 缩略图统一放在以 output_name 命名的子文件夹中，保留相对路径避免重名
+            output_dir = os.path.join(self.output_folder, self.output_name)
+            tasks = []
+            for input_file in input_files:
+                relative = os.path.relpath(input_file, input_folder)
+                output_file = os.path.join(output_dir, relative)
+                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+                tasks.append((input_file, output_file))
+
+            # Pillow 解码和重采样期间释放 GIL，线程池即可利用多核
+            thumbnails = []
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                futures = [executor.submit(_make_thumbnail, src, dst, max_size) for src, dst in tasks]
+                for future in futures:
+                    try:
+                        thumbnails.append(future.result())
+                    except Exception as e:
+                        self._eventBus.emit("message", "warning", self._id, f"生成缩略图失败: {str(e)}")
+
+            self._eventBus.emit("message", "info", self._id, f"{len(thumbnails)} thumbnails generated!")
+            return {
+                "outputFolder": output_dir,
+                "thumbnails": [item["thumbnail"] for item in thumbnails],
+                "count": len(thumbnails)
+            }
+
+        except Exception as e:
+            raise RuntimeError(f"生成缩略图时发生错误: {str(e)}")
+
     def _compress_image(self) -> Dict[str, Any]:
         """压缩图像"""
         try:
             quality = self._get_input_value(self.data, 'quality')
 
             # 打开图像
-            image = Image.open(self.input_file)
+            image = self._open_image()
             
             # 确保图像为RGB模式
             if image.mode in ('RGBA', 'LA'):
@@ -203,7 +391,7 @@ class ImageProcessor(MessageNode):
             quality = self._get_input_value(self.data, 'quality')
 
             # 打开图像
-            image = Image.open(self.input_file)
+            image = self._open_image()
 
             # 转换格式
             if format == 'jpeg' and image.mode in ('RGBA', 'LA'):
@@ -217,6 +405,7 @@ class ImageProcessor(MessageNode):
             # 保存转换后的图像
             output_file = self._get_unique_filename(os.path.join(self.output_folder, f"{self.output_name}.{format}"))
             image.save(output_file, format.upper(), quality=quality)
+            self._cache_output(output_file, image)
 
             # 获取处理后的图像信息
             processed_info = {
@@ -239,14 +428,15 @@ class ImageProcessor(MessageNode):
             angle = self._get_input_value(self.data, 'angle')
 
             # 打开图像
-            image = Image.open(self.input_file)
+            image = self._open_image()
 
             # 旋转图像
             rotated_image = image.rotate(angle, expand=True)
 
             # 保存旋转后的图像
-            output_file = self._get_unique_filename(os.path.join(self.output_folder, f"{self.output_name}{os.path.splitext(self.input_file)[1]}"))
+            output_file = self._get_unique_filename(os.path.join(self.output_folder, f"{self.output_name}{self._input_extension()}"))
             rotated_image.save(output_file)
+            self._cache_output(output_file, rotated_image)
 
             # 获取处理后的图像信息
             processed_info = {
@@ -272,14 +462,15 @@ class ImageProcessor(MessageNode):
             height = self._get_input_value(self.data, 'height')
 
             # 打开图像
-            image = Image.open(self.input_file)
+            image = self._open_image()
 
             # 裁剪图像
             cropped_image = image.crop((x, y, x + width, y + height))
 
             # 保存裁剪后的图像
-            output_file = self._get_unique_filename(os.path.join(self.output_folder, f"{self.output_name}{os.path.splitext(self.input_file)[1]}"))
+            output_file = self._get_unique_filename(os.path.join(self.output_folder, f"{self.output_name}{self._input_extension()}"))
             cropped_image.save(output_file)
+            self._cache_output(output_file, cropped_image)
 
             # 获取处理后的图像信息
             processed_info = {
@@ -303,7 +494,7 @@ class ImageProcessor(MessageNode):
             intensity = self._get_input_value(self.data, 'intensity') / 100.0  # 转换为0-1范围
 
             # 打开图像
-            image = Image.open(self.input_file)
+            image = self._open_image()
 
             # 应用滤镜
             if filter_type == 'grayscale':
@@ -334,8 +525,9 @@ class ImageProcessor(MessageNode):
                 raise ValueError(f"不支持的滤镜类型: {filter_type}")
 
             # 保存处理后的图像
-            output_file = self._get_unique_filename(os.path.join(self.output_folder, f"{self.output_name}{os.path.splitext(self.input_file)[1]}"))
+            output_file = self._get_unique_filename(os.path.join(self.output_folder, f"{self.output_name}{self._input_extension()}"))
             filtered_image.save(output_file)
+            self._cache_output(output_file, filtered_image)
 
             # 获取处理后的图像信息
             processed_info = {
@@ -361,40 +553,15 @@ class ImageProcessor(MessageNode):
             position = self._get_input_value(self.data, 'position')
 
             # 打开图像
-            image = Image.open(self.input_file)
-            
-            # 创建一个透明的图层用于水印
-            watermark = Image.new('RGBA', image.size, (0, 0, 0, 0))
-            draw = ImageDraw.Draw(watermark)
-
-            # 尝试加载字体，如果失败则使用默认字体
-            try:
-                # 尝试多个中文字体
-                font_paths = [
-                    "C:\\Windows\\Fonts\\simhei.ttf",  # 黑体
-                    "C:\\Windows\\Fonts\\simsun.ttc",  # 宋体
-                    "C:\\Windows\\Fonts\\msyh.ttc",    # 微软雅黑
-                    "arial.ttf"  # 回退到英文字体
-                ]
-                font = None
-                for font_path in font_paths:
-                    try:
-                        font = ImageFont.truetype(font_path, font_size)
-                        break
-                    except:
-                        continue
-                
-                if font is None:
-                    font = ImageFont.load_default()
-                    self._eventBus.emit("message", "warning", self._id, "未找到合适的字体，使用默认字体")
-            except:
-                font = ImageFont.load_default()
-                self._eventBus.emit("message", "warning", self._id, "加载字体失败，使用默认字体")
-
-            # 获取文本大小
-            text_bbox = draw.textbbox((0, 0), watermark_text, font=font)
-            text_width = text_bbox[2] - text_bbox[0]
-            text_height = text_bbox[3] - text_bbox[1]
+            image = self._open_image()
+
+            # 字体和水印图块在进程内缓存，批量处理时只加载、绘制一次
+            font, font_path = load_watermark_font(font_size)
+            if font_path is None:
+                self._eventBus.emit("message", "warning", self._id, "未找到合适的字体，使用默认字体")
+            # 使用红色作为水印颜色，提高不透明度
+            tile, (offset_x, offset_y), (text_width, text_height) = render_watermark_tile(
+                watermark_text, font, int(255 * opacity))
 
             # 计算水印位置
             if position == 'center':
@@ -413,25 +580,25 @@ class ImageProcessor(MessageNode):
                 x = image.width - text_width - 10
                 y = image.height - text_height - 10
 
-            # 绘制水印文本 - 修改颜色和透明度
-            # 使用红色作为水印颜色，提高不透明度
-            red_color = (255, 0, 0, int(255 * opacity))  # 红色水印
-            draw.text((x, y), watermark_text, font=font, fill=red_color)
-
-            # 将水印合并到原图
-            if image.mode != 'RGBA':
-                image = image.convert('RGBA')
-            watermarked = Image.alpha_composite(image, watermark)
+            # 只在文本包围盒范围内合成水印
+            # 缓存中的图像由多个节点共享，合成前先复制；RGB 图像直接粘贴，不转换整帧
+            if image.mode in ('RGB', 'RGBA'):
+                image = image.copy()
+            else:
+                image = image.convert('RGB')
+            watermarked = composite_tile(image, tile, (x + offset_x, y + offset_y))
 
             # 保存结果
-            output_file = self._get_unique_filename(os.path.join(self.output_folder, f"{self.output_name}{os.path.splitext(self.input_file)[1]}"))
+            output_file = self._get_unique_filename(os.path.join(self.output_folder, f"{self.output_name}{self._input_extension()}"))
             # 转换为RGB模式并保存
             if watermarked.mode == 'RGBA':
                 rgb_image = Image.new('RGB', watermarked.size, (255, 255, 255))
                 rgb_image.paste(watermarked, mask=watermarked.split()[3])
                 rgb_image.save(output_file)
+                self._cache_output(output_file, rgb_image)
             else:
                 watermarked.save(output_file)
+                self._cache_output(output_file, watermarked)
 
             # 获取处理后的图像信息
             processed_info = {
@@ -3,8 +3,26 @@ from typing import Dict, Any, List, Optional
 from .MessageNode import MessageNode
 from .Node import Node
 from jsonpath_ng import parse as parse_jsonpath
-from jsonschema import validate as validate_schema, ValidationError
+from jsonschema import SchemaError
+from jsonschema.validators import validator_for
+from collections import OrderedDict
+from functools import lru_cache
+import hashlib
+import threading
 import os
+from ..encoding import detect_encoding
+from ..jsondiff import json_diff, patch_to_differences
+from ..jsonstream import JSONStreamError, JSONStreamReader, MatchWriter, compile_filter, iter_jsonl, parse_stream_path
+from ..streams import materialize
+
+# 进程内缓存的编译结果数量上限
+JSONPATH_CACHE_SIZE = 256
+VALIDATOR_CACHE_SIZE = 64
+# 流式查询未指定输出文件时，结果中最多保留的匹配数
+MAX_INLINE_RESULTS = 1000
+# 流式查询每处理多少条记录发送一次进度
+STREAM_PROGRESS_RECORDS = 10000
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
 
 class JSONProcessError(Exception):
     """JSON处理错误"""
@@ -22,7 +40,7 @@ def deep_merge(dict1: Dict, dict2: Dict) -> Dict:
 
 def generate_output_path(output_folder: str, output_name: str) -> str:
     """生成输出文件路径"""
-    if not output_name.endswith('.json'):
+    if not output_name.endswith(('.json',) + JSONL_EXTENSIONS):
         output_name += '.json'
     return os.path.join(output_folder, output_name)
 
@@ -32,6 +50,56 @@ def save_json_to_file(data: Any, file_path: str, indent: int = 2) -> None:
     with open(file_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=indent)
 
+@lru_cache(maxsize=JSONPATH_CACHE_SIZE)
+def compile_jsonpath(path: str):
+    """编译JSONPath表达式，进程内缓存（jsonpath-ng 的解析器很慢，编译结果可重复使用）"""
+    return parse_jsonpath(path)
+
+
+_validator_cache: "OrderedDict[str, Any]" = OrderedDict()
+_validator_cache_lock = threading.Lock()
+
+
+def schema_hash(schema: Any) -> str:
+    """Schema 的规范化哈希：键排序后序列化，字段顺序不同的同一 Schema 得到相同的哈希"""
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def get_validator(schema: Any):
+    """
+    获取预先构建好的校验器，按 Schema 的规范化哈希在进程内做 LRU 缓存
+
+    Schema 本身的合法性检查只在首次构建时进行一次。
+
+    Raises:
+        SchemaError: Schema 不合法
+    """
+    key = schema_hash(schema)
+    with _validator_cache_lock:
+        validator = _validator_cache.get(key)
+        if validator is not None:
+            _validator_cache.move_to_end(key)
+            return validator
+
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    validator = cls(schema)
+    with _validator_cache_lock:
+        _validator_cache[key] = validator
+        while len(_validator_cache) > VALIDATOR_CACHE_SIZE:
+            _validator_cache.popitem(last=False)
+    return validator
+
+
+def format_error_path(path) -> str:
+    """把校验错误的路径格式化为 $.a[0].b 形式"""
+    result = "$"
+    for part in path:
+        result += f"[{part}]" if isinstance(part, int) else f".{part}"
+    return result
+
+
 class JSONProcessor(MessageNode):
     def __init__(self, id: str, type: str, nextNodes: list, eventBus: Any, data: Dict[str, Any]):
         """
@@ -60,7 +128,7 @@ class JSONProcessor(MessageNode):
                     if node_id.endswith("_locals"):
                         node_id = node_id[:-7]
                     param_name = content[1]
-                    result = self._eventBus.emit("askMessage", node_id, param_name)
+                    result = materialize(self._eventBus.emit("askMessage", node_id, param_name))
                     self._eventBus.emit("message", "info", self._id, f"获取引用值 {node_id}.{param_name} = {result}")
                     return result
             elif value.get("type") == "constant":
@@ -90,7 +158,7 @@ class JSONProcessor(MessageNode):
 
             # 执行JSONPath查询
             try:
-                jsonpath_expr = parse_jsonpath(path)
+                jsonpath_expr = compile_jsonpath(path)
                 matches = [match.value for match in jsonpath_expr.find(input_data)]
                 
                 # 保存查询结果到文件
@@ -113,6 +181,104 @@ class JSONProcessor(MessageNode):
             self._eventBus.emit("message", "error", self._id, f"JSON查询操作失败: {str(e)}")
             raise JSONProcessError(f"JSON查询操作失败: {str(e)}")
 
+    def stream_query_json(self) -> Dict[str, Any]:
+        """
+        流式查询大文件中的JSON / JSON Lines
+
+        JSON 文件沿路径的键、下标定位到通配符处后逐条解析元素；JSON Lines 逐行解析，
+        在每条记录上求值完整路径。过滤条件作用于每条记录，通配符之后的剩余路径再从
+        通过过滤的记录中取值。匹配结果边解析边写入输出文件，内存占用与文件大小无关。
+        """
+        try:
+            input_file = self._get_input_value(self.inputs.get("inputFile"))
+            path = self._get_input_value(self.inputs.get("path"))
+            filter_expr = self._get_input_value(self.inputs.get("filter"))
+            input_format = self._get_input_value(self.inputs.get("format")) or "auto"
+            limit_value = self._get_input_value(self.inputs.get("limit"))
+            output_folder = self._get_input_value(self.inputs.get("outputFolder"))
+            output_name = self._get_input_value(self.inputs.get("outputName"))
+
+            if not input_file or not os.path.exists(input_file):
+                raise JSONProcessError("未指定或找不到输入文件")
+            if input_format == "auto":
+                input_format = "jsonl" if os.fspath(input_file).lower().endswith(JSONL_EXTENSIONS) else "json"
+            if input_format not in ("json", "jsonl"):
+                raise JSONProcessError(f"不支持的输入格式: {input_format}")
+            try:
+                limit = int(limit_value) if limit_value else 0
+            except ValueError:
+                raise JSONProcessError(f"limit 必须是整数: {limit_value}")
+
+            try:
+                predicate = compile_filter(filter_expr)
+                if input_format == "json":
+                    steps, remainder = parse_stream_path(path or "$[*]")
+                else:
+                    steps, remainder = None, path if path and path.strip() != "$" else None
+            except JSONStreamError as e:
+                raise JSONProcessError(str(e))
+            project = compile_jsonpath(remainder) if remainder else None
+
+            self._eventBus.emit("message", "info", self._id,
+                                f"准备流式查询 {os.fspath(input_file)}（{input_format}），路径: {path or '默认'}")
+
+            output_file = generate_output_path(output_folder, output_name) if output_folder and output_name else None
+            writer = MatchWriter(output_file) if output_file else None
+            total_bytes = os.path.getsize(input_file)
+            scanned = 0
+            matched = 0
+            first = None
+            results = []
+            try:
+                with open(input_file, "r", encoding=detect_encoding(input_file)) as f:
+                    records = iter_jsonl(f) if input_format == "jsonl" else JSONStreamReader(f).iter_path(steps)
+                    for record in records:
+                        scanned += 1
+                        if scanned % STREAM_PROGRESS_RECORDS == 0:
+                            self._eventBus.emit("node_progress", {"nodeId": self._id, "current": f.buffer.tell(),
+                                                                  "total": total_bytes})
+                        if not predicate(record):
+                            continue
+                        values = [match.value for match in project.find(record)] if project else [record]
+                        for value in values:
+                            if matched == 0:
+                                first = value
+                            matched += 1
+                            if writer:
+                                writer.write(value)
+                            elif len(results) < MAX_INLINE_RESULTS:
+                                results.append(value)
+                        if limit and matched >= limit:
+                            break
+            except JSONStreamError as e:
+                raise JSONProcessError(str(e))
+            except UnicodeDecodeError as e:
+                raise JSONProcessError(f"文件编码无法识别: {str(e)}")
+            finally:
+                if writer:
+                    writer.close()
+
+            self._eventBus.emit("node_progress", {"nodeId": self._id, "current": total_bytes, "total": total_bytes})
+            if output_file:
+                self._eventBus.emit("message", "info", self._id, f"已保存查询结果到: {output_file}")
+            elif matched > MAX_INLINE_RESULTS:
+                self._eventBus.emit("message", "warning", self._id,
+                                    f"匹配结果过多，仅保留前 {MAX_INLINE_RESULTS} 条，请指定输出文件获取全部结果")
+            self._eventBus.emit("message", "info", self._id, f"流式查询完成，扫描 {scanned} 条记录，找到 {matched} 个匹配")
+
+            return {
+                "result": first,
+                "found": matched > 0,
+                "matchCount": matched,
+                "scannedCount": scanned,
+                "results": None if output_file else results,
+                "filePath": output_file
+            }
+
+        except Exception as e:
+            self._eventBus.emit("message", "error", self._id, f"JSON流式查询操作失败: {str(e)}")
+            raise JSONProcessError(f"JSON流式查询操作失败: {str(e)}")
+
     def update_json(self) -> Dict[str, Any]:
         """更新JSON数据"""
         try:
@@ -145,7 +311,7 @@ class JSONProcessor(MessageNode):
 
             # 执行更新
             try:
-                jsonpath_expr = parse_jsonpath(path)
+                jsonpath_expr = compile_jsonpath(path)
                 matches = jsonpath_expr.find(input_data)
                 
                 if not matches:
@@ -203,20 +369,24 @@ class JSONProcessor(MessageNode):
                 except json.JSONDecodeError as e:
                     raise JSONProcessError(f"Schema解析失败: {str(e)}")
 
-            # 执行验证
+            # 执行验证：使用缓存的校验器，一次遍历收集全部错误
             try:
-                validate_schema(instance=input_data, schema=schema)
+                validator = get_validator(schema)
+            except SchemaError as e:
+                raise JSONProcessError(f"Schema不合法: {e.message}")
+            errors = sorted(validator.iter_errors(input_data), key=lambda error: list(map(str, error.absolute_path)))
+            if not errors:
                 result = {
                     "isValid": True,
                     "errors": []
                 }
                 self._eventBus.emit("message", "info", self._id, "验证成功")
-            except ValidationError as e:
+            else:
                 result = {
                     "isValid": False,
-                    "errors": [str(e)]
+                    "errors": [f"{format_error_path(error.absolute_path)}: {error.message}" for error in errors]
                 }
-                self._eventBus.emit("message", "warning", self._id, f"验证失败: {str(e)}")
+                self._eventBus.emit("message", "warning", self._id, f"验证失败，共 {len(errors)} 处错误: {result['errors'][0]}")
 
             # 保存验证结果到文件
             if output_folder and output_name:
@@ -299,6 +469,7 @@ class JSONProcessor(MessageNode):
             # 获取输入参数
             input_data = self._get_input_value(self.inputs.get("inputData"))
             compare_data = self._get_input_value(self.inputs.get("compareData"))
+            key_field = self._get_input_value(self.inputs.get("keyField"))
             output_folder = self._get_input_value(self.inputs.get("outputFolder"))
             output_name = self._get_input_value(self.inputs.get("outputName"))
             
@@ -320,14 +491,15 @@ class JSONProcessor(MessageNode):
                 except json.JSONDecodeError as e:
                     raise JSONProcessError(f"比较JSON解析失败: {str(e)}")
 
-            # 执行差异比较
-            differences = []
-            self._compare_objects("", input_data, compare_data, differences)
+            # 执行差异比较：相同子树按结构哈希跳过，数组按元素对齐
+            patch = json_diff(input_data, compare_data, key_field=key_field or None, include_old=True)
+            differences = patch_to_differences(patch, input_data)
             
             are_equal = len(differences) == 0
             result = {
                 "differences": differences,
-                "areEqual": are_equal
+                "areEqual": are_equal,
+                "patch": [{key: value for key, value in op.items() if key != "oldValue"} for op in patch]
             }
             
             # 保存比较结果到文件
@@ -346,54 +518,6 @@ class JSONProcessor(MessageNode):
             self._eventBus.emit("message", "error", self._id, f"JSON比较操作失败: {str(e)}")
             raise JSONProcessError(f"JSON比较操作失败: {str(e)}")
 
-    def _compare_objects(self, path: str, obj1: Any, obj2: Any, differences: List[Dict[str, Any]]):
-        """递归比较两个对象的差异"""
-        if isinstance(obj1, dict) and isinstance(obj2, dict):
-            # 比较字典
-            all_keys = set(obj1.keys()) | set(obj2.keys())
-            for key in all_keys:
-                new_path = f"{path}.{key}" if path else key
-                if key not in obj1:
-                    differences.append({
-                        "path": new_path,
-                        "type": "missing_in_first",
-                        "value": obj2[key]
-                    })
-                elif key not in obj2:
-                    differences.append({
-                        "path": new_path,
-                        "type": "missing_in_second",
-                        "value": obj1[key]
-                    })
-                else:
-                    self._compare_objects(new_path, obj1[key], obj2[key], differences)
-        elif isinstance(obj1, list) and isinstance(obj2, list):
-            # 比较列表
-            for i in range(max(len(obj1), len(obj2))):
-                new_path = f"{path}[{i}]"
-                if i >= len(obj1):
-                    differences.append({
-                        "path": new_path,
-                        "type": "missing_in_first",
-                        "value": obj2[i]
-                    })
-                elif i >= len(obj2):
-                    differences.append({
-                        "path": new_path,
-                        "type": "missing_in_second",
-                        "value": obj1[i]
-                    })
-                else:
-                    self._compare_objects(new_path, obj1[i], obj2[i], differences)
-        elif obj1 != obj2:
-            # 比较基本类型
-            differences.append({
-                "path": path,
-                "type": "value_different",
-                "first_value": obj1,
-                "second_value": obj2
-            })
-
     def run(self):
         """
         执行JSON处理节点
@@ -404,6 +528,8 @@ class JSONProcessor(MessageNode):
             match self.mode:
                 case "query":
                     result = self.query_json()
+                case "streamQuery":
+                    result = self.stream_query_json()
                 case "update":
                     result = self.update_json()
                 case "validate":
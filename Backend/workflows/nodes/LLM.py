@@ -9,6 +9,12 @@ import base64
 import os
 import mimetypes
 from pathlib import Path
+from ..artifacts import Artifact, read_source_bytes, source_name
+from ..encoding import decode_bytes
+from ..streams import materialize
+
+# 文本文件的候选编码，都无法解码时作为二进制发送
+TEXT_ENCODINGS = ('utf-8', 'gbk', 'gb2312')
 
 # 禁用不安全的HTTPS警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -59,7 +65,7 @@ class LLMProcessor(MessageNode):
                         if node_id.endswith("_locals"):
                             node_id = node_id[:-7]
                         param_name = content[1]
-                        result = self._eventBus.emit("askMessage", node_id, param_name)
+                        result = materialize(self._eventBus.emit("askMessage", node_id, param_name))
                         self._eventBus.emit("message", "info", self._id, f"获取引用值 {node_id}.{param_name} = {result}")
                         return result
                 elif value["type"] == "constant":
@@ -122,53 +128,39 @@ class LLMProcessor(MessageNode):
             if not file_path or not file_name:
                 raise LLMError("文件信息不完整")
                 
-            # 获取文件类型
-            mime_type, _ = mimetypes.guess_type(file_path)
+            # 获取文件类型（内存产物按其文件名判断）
+            type_name = source_name(file_path)
+            mime_type, _ = mimetypes.guess_type(type_name)
             if not mime_type:
                 # 根据文件扩展名判断类型
-                ext = os.path.splitext(file_path)[1].lower()
+                ext = os.path.splitext(type_name)[1].lower()
                 if ext in ['.txt', '.md', '.json', '.csv']:
                     mime_type = 'text/plain'
                 elif ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']:
                     mime_type = f'image/{ext[1:]}'
                 else:
                     mime_type = 'application/octet-stream'
-                
-            try:
-                # 读取文件内容
-                with open(file_path, 'rb') as f:
-                    if mime_type.startswith('text/'):
-                        content = f.read().decode('utf-8')
-                        # 限制文本长度，防止超出API限制
-                        if len(content) > 10000:  # 设置一个合理的限制
-                            content = content[:10000] + "\n... (内容已截断)"
-                    else:
-                        content = base64.b64encode(f.read()).decode('utf-8')
-                    
-                    return {
-                        "type": mime_type,
-                        "name": file_name,
-                        "content": content
-                    }
-            except UnicodeDecodeError:
-                # 如果UTF-8解码失败，尝试其他编码
-                with open(file_path, 'rb') as f:
-                    content = f.read()
-                    try:
-                        content = content.decode('gbk')
-                    except UnicodeDecodeError:
-                        try:
-                            content = content.decode('gb2312')
-                        except UnicodeDecodeError:
-                            # 如果所有编码都失败，则作为二进制处理
-                            content = base64.b64encode(content).decode('utf-8')
-                            mime_type = 'application/octet-stream'
-                    
-                    return {
-                        "type": mime_type,
-                        "name": file_name,
-                        "content": content
-                    }
+            
+            # 读取文件内容，路径和内存产物只读取一次
+            raw = read_source_bytes(file_path)
+            if mime_type.startswith('text/'):
+                try:
+                    content, _ = decode_bytes(raw, TEXT_ENCODINGS)
+                    # 限制文本长度，防止超出API限制
+                    if len(content) > 10000:  # 设置一个合理的限制
+                        content = content[:10000] + "\n... (内容已截断)"
+                except UnicodeDecodeError:
+                    # 如果所有编码都失败，则作为二进制处理
+                    content = base64.b64encode(raw).decode('utf-8')
+                    mime_type = 'application/octet-stream'
+            else:
+                content = base64.b64encode(raw).decode('utf-8')
+            
+            return {
+                "type": mime_type,
+                "name": file_name,
+                "content": content
+            }
                     
         except Exception as e:
             self._eventBus.emit("message", "error", self._id, f"处理文件失败: {str(e)}")
@@ -186,8 +178,14 @@ class LLMProcessor(MessageNode):
             file_contents = []
             for file_data in files:
                 try:
+                    # 内存产物与路径一样处理，文件名取产物名称
+                    if isinstance(file_data, Artifact):
+                        file_data = {
+                            "path": file_data,
+                            "name": file_data.name
+                        }
                     # 如果file_data是字符串（文件路径），转换为字典格式
-                    if isinstance(file_data, str):
+                    elif isinstance(file_data, str):
                         # 从路径中提取文件名
                         file_name = os.path.basename(file_data)
                         file_data = {
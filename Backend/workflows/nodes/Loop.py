@@ -1,5 +1,6 @@
 from .MessageNode import MessageNode
 from typing import Dict, Any, List, Optional
+from ..streams import as_stream, is_stream
 
 class LoopError(Exception):
     """循环节点错误"""
@@ -37,6 +38,9 @@ class Loop(MessageNode):
         if self.mode == "array":
             if not isinstance(self.batchFor, dict):
                 raise LoopError(f"节点 {id} 缺少有效的batchFor配置")
+
+        # 惰性输入（数据流、惰性文件列表）的预取缓冲项数，0 表示按需拉取
+        self.bufferSize = int(data.get("bufferSize", 0) or 0)
         
         # 获取节点信息
         node_info = self._eventBus.emit("getNodeInfo", id)
@@ -154,6 +158,7 @@ class Loop(MessageNode):
         """
         self._eventBus.emit("message", "info", self._id, "Loop start!")
         
+        items = None
         try:
             # 获取循环数据
             array_data = []
@@ -178,6 +183,9 @@ class Loop(MessageNode):
                     raise LoopError(f"节点 {self._id} 无法获取循环数组")
                 if not array_data:
                     array_data = []
+                # 惰性输入逐项拉取，上游在循环体执行的同时继续产生数据
+                if is_stream(array_data) and self.bufferSize > 0:
+                    array_data = as_stream(array_data, self.bufferSize, f"{ref_node_id}.{ref_node_property}")
             else:  # times mode
                 # 创建一个包含指定次数的范围列表
                 array_data = range(int(self.times))
@@ -192,7 +200,8 @@ class Loop(MessageNode):
                 raise LoopError(f"节点 {self._id} 的循环体中缺少End节点")
                 
             # 执行循环
-            for item in array_data:
+            items = iter(array_data)
+            for item in items:
                 # 每次循环开始时先清理旧的节点实例
                 for block in self.blocks:
                     self._eventBus.emit("cleanupNode", block["id"])
@@ -245,6 +254,11 @@ class Loop(MessageNode):
             raise
         except Exception as e:
             raise LoopError(f"节点 {self._id} 执行失败: {str(e)}")
+        finally:
+            # 循环中途出错时立即关闭数据流，停止上游的后台生产
+            close = getattr(items, "close", None)
+            if close:
+                close()
 
     def updateNext(self):
         """
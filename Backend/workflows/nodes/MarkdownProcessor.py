@@ -1,11 +1,23 @@
 import os
-import markdown
+import copy
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import frontmatter as fm
 import yaml
 from .MessageNode import MessageNode
 #from ..dict_viewer import pretty_print_dict
-from pygments.formatters import HtmlFormatter
 import pypandoc
+from ..cache import get_markdown_cache, pygments_css
+from ..streams import materialize
+
+TABLE_CSS = '''
+        table { border-collapse: collapse; width: 100%; }
+        th, td { border: 1px solid #ccc; padding: 6px 12px; }
+        th { background: #f8f8f8; }
+        '''
+MATHJAX_SCRIPT = '<script src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"></script>'
+# 批量转换时同时运行的 pandoc / xelatex 子进程数量上限
+DEFAULT_CONVERT_WORKERS = min(4, os.cpu_count() or 1)
 
 class MarkdownProcessorError(Exception):
     """MarkdownProcessor 节点执行时的异常"""
@@ -17,6 +29,31 @@ def generate_output_path(output_folder: str, output_name: str, ext: str = ".md")
     print(output_folder, output_name)
     return os.path.join(output_folder, output_name)
 
+def convert_to_pdf(input_file: str, output_file: str):
+    """调用 pandoc + xelatex 把 Markdown 文件转换为 PDF"""
+    try:
+        # 使用 pypandoc 调用 pandoc，指定 pdf-engine 和中文字体
+        pypandoc.convert_file(
+            input_file,
+            to='latex',
+            outputfile=output_file,
+            format='md',
+            # extra_args=[
+            #     '--pdf-engine=xelatex',
+            #     '-V', 'mainfont=Noto Sans CJK SC'
+            # ]
+            extra_args=['--pdf-engine=xelatex']
+        )
+    except Exception as e:
+        raise MarkdownProcessorError(f"PDF 生成失败: {str(e)}。请确保 pandoc、xelatex 及中文字体已安装。")
+
+def is_up_to_date(input_file: str, output_file: str) -> bool:
+    """输出文件存在且不早于源文件时无需重新生成"""
+    try:
+        return os.stat(output_file).st_mtime_ns >= os.stat(input_file).st_mtime_ns
+    except OSError:
+        return False
+
 class MarkdownProcessor(MessageNode):
     def __init__(self, id, type, nextNodes, eventBus, data):
         super().__init__(id, type, nextNodes, eventBus)
@@ -36,7 +73,7 @@ class MarkdownProcessor(MessageNode):
                     if node_id.endswith("_locals"):
                         node_id = node_id[:-7]
                     param_name = content[1]
-                    result = self._eventBus.emit("askMessage", node_id, param_name)
+                    result = materialize(self._eventBus.emit("askMessage", node_id, param_name))
                     return str(result) if result is not None else default
             elif value.get("type") == "constant":
                 return str(value.get("content", default))
@@ -51,6 +88,9 @@ class MarkdownProcessor(MessageNode):
             if self.mode == "convert":
                 result = self.handle_convert()
                 self.MessageList = {"convertedFile": result.get("filePath")}
+            elif self.mode == "batchConvert":
+                result = self.handle_batch_convert()
+                self.MessageList = result
             elif self.mode == "write":
                 result = self.handle_write()
                 self.MessageList = {"outputFile": result.get("filePath")}
@@ -62,7 +102,7 @@ class MarkdownProcessor(MessageNode):
                 self.MessageList = {"outputFile": result.get("filePath"), "metadata": result.get("frontMatter")}
             elif self.mode == "toc":
                 result = self.handle_toc()
-                self.MessageList = {"tableOfContents": result.get("toc")}
+                self.MessageList = {"tableOfContents": result.get("toc"), "headingTree": result.get("tree")}
             elif self.mode == "lint":
                 result = self.handle_lint()
                 self.MessageList = result
@@ -90,42 +130,83 @@ class MarkdownProcessor(MessageNode):
             raise MarkdownProcessorError("未指定或找不到输入文件")
         
         
-        with open(input_file, "r", encoding="utf-8") as f:
-            md_text = f.read()
-        
-        
-
-        
-        html_body = markdown.markdown(md_text, extensions=['tables', 'fenced_code', 'codehilite'])
-        html = self._get_html_with_style(html_body)
         os.makedirs(output_folder, exist_ok=True)
         output_file = generate_output_path(output_folder, output_name, f'.{target_format}')
         if target_format == "html":
-            with open(output_file, "w", encoding="utf-8") as f:
-                f.write(html)
+            html = self._write_html(input_file, output_file)
             self._eventBus.emit("message", "info", self._id, "Markdown conversion to HTML completed successfully!")
             return {"filePath": output_file, "html": html}
         elif target_format == "pdf":
-            try:
-                # 使用 pypandoc 调用 pandoc，指定 pdf-engine 和中文字体
-                pypandoc.convert_file(
-                    input_file,
-                    to='latex',
-                    outputfile=output_file,
-                    format='md',
-                    # extra_args=[
-                    #     '--pdf-engine=xelatex',
-                    #     '-V', 'mainfont=Noto Sans CJK SC'
-                    # ]
-                    extra_args=['--pdf-engine=xelatex']
-                )
-            except Exception as e:
-                raise MarkdownProcessorError(f"PDF 生成失败: {str(e)}。请确保 pandoc、xelatex 及中文字体已安装。")
+            convert_to_pdf(input_file, output_file)
             self._eventBus.emit("message", "info", self._id, "Markdown conversion to PDF completed successfully!")
             return {"filePath": output_file}
         else:
             raise MarkdownProcessorError(f"暂不支持的目标格式: {target_format}")
 
+    def handle_batch_convert(self):
+        """
+        批量转换 inputFiles 中的 Markdown 文件
+
+        HTML 在进程内渲染（各线程复用自己的 Markdown 实例），PDF 由有界线程池并发调用 pandoc，
+        同时运行的 pandoc / xelatex 子进程不超过 workers 个。输出按源文件相对于公共目录的路径
+        放到 outputFolder 下，输出文件不早于源文件时跳过，force 为 true 时全部重新生成。
+        """
+        input_files = self._get_input_files(self.inputs.get("inputFiles"))
+        target_format = self._get_input_value(self.inputs.get("targetFormat"), "html") or "html"
+        output_folder = self._get_input_value(self.inputs.get("outputFolder"), "output") or "output"
+        workers = int(self._get_input_value(self.inputs.get("workers"), "") or DEFAULT_CONVERT_WORKERS)
+        force = str(self._get_input_value(self.inputs.get("force"), "false")).lower() == "true"
+
+        if not input_files:
+            raise MarkdownProcessorError("批量转换需要提供 inputFiles 文件列表")
+        if target_format not in ("html", "pdf"):
+            raise MarkdownProcessorError(f"暂不支持的目标格式: {target_format}")
+        missing = [path for path in input_files if not os.path.exists(path)]
+        if missing:
+            raise MarkdownProcessorError(f"找不到输入文件: {', '.join(missing)}")
+
+        sources = [os.path.abspath(path) for path in input_files]
+        base = os.path.commonpath([os.path.dirname(path) for path in sources])
+        tasks = []
+        for source in sources:
+            relative = os.path.splitext(os.path.relpath(source, base))[0]
+            tasks.append((source, os.path.join(output_folder, f"{relative}.{target_format}")))
+
+        def convert(source, output_file):
+            if not force and is_up_to_date(source, output_file):
+                return "skipped"
+            os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+            if target_format == "html":
+                self._write_html(source, output_file)
+            else:
+                convert_to_pdf(source, output_file)
+            return "converted"
+
+        summary = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tasks)))) as executor:
+            futures = {executor.submit(convert, source, output_file): (source, output_file)
+                       for source, output_file in tasks}
+            for completed, future in enumerate(as_completed(futures), start=1):
+                source, output_file = futures[future]
+                try:
+                    summary[source] = {"inputFile": source, "outputFile": output_file, "status": future.result()}
+                except Exception as e:
+                    summary[source] = {"inputFile": source, "outputFile": output_file, "status": "error", "error": str(e)}
+                self._eventBus.emit("node_progress", {"nodeId": self._id, "current": completed, "total": len(tasks)})
+
+        rows = [summary[source] for source, _ in tasks]
+        counts = {status: sum(1 for row in rows if row["status"] == status) for status in ("converted", "skipped", "error")}
+        self._eventBus.emit("message", "info" if not counts["error"] else "warning", self._id,
+                            f"Batch conversion to {target_format} finished: {counts['converted']} converted, "
+                            f"{counts['skipped']} up to date, {counts['error']} failed")
+        return {
+            "convertedFiles": [row["outputFile"] for row in rows if row["status"] != "error"],
+            "summary": rows,
+            "convertedCount": counts["converted"],
+            "skippedCount": counts["skipped"],
+            "failedCount": counts["error"]
+        }
+
     def handle_write(self):
         content = self._get_input_value(self.inputs.get("content"), "") or ""
         output_folder = self._get_input_value(self.inputs.get("outputFolder"), "output") or "output"
@@ -134,6 +215,7 @@ class MarkdownProcessor(MessageNode):
         output_file = generate_output_path(output_folder, output_name, ".md")
         with open(output_file, "w", encoding="utf-8") as f:
             f.write(content)
+        get_markdown_cache().invalidate(output_file)
         self._eventBus.emit("message", "info", self._id, "Markdown write completed successfully!")
         return {"filePath": output_file}
 
@@ -142,8 +224,11 @@ class MarkdownProcessor(MessageNode):
         content = self._get_input_value(self.inputs.get("content"), "") or ""
         if not input_file or not os.path.exists(input_file):
             raise MarkdownProcessorError("未指定或找不到输入文件")
-        with open(input_file, "a", encoding="utf-8") as f:
+        # 追加内容沿用原文件的编码；以完整解码得到的编码为准，只看文件开头可能误判
+        encoding = get_markdown_cache().load(input_file).encoding
+        with open(input_file, "a", encoding=encoding) as f:
             f.write("\n" + content)
+        get_markdown_cache().invalidate(input_file)
         self._eventBus.emit("message", "info", self._id, "Markdown append completed successfully!")
         return {"filePath": input_file}
 
@@ -152,13 +237,16 @@ class MarkdownProcessor(MessageNode):
         front_matter = self._get_input_value(self.inputs.get("frontMatter"), "")
         if not input_file or not os.path.exists(input_file):
             raise MarkdownProcessorError("未指定或找不到输入文件")
-        with open(input_file, "r", encoding="utf-8") as f:
-            post = fm.load(f)
+        document = get_markdown_cache().load(input_file)
+        # 缓存中的解析结果由多个节点共享，修改前先复制
+        post = copy.copy(document.post)
+        post.metadata = dict(document.metadata)
         if front_matter:
             fm_dict = yaml.safe_load(front_matter)
             post.metadata.update(fm_dict)
-            with open(input_file, "w", encoding="utf-8") as f:
+            with open(input_file, "w", encoding=document.encoding) as f:
                 f.write(fm.dumps(post))
+            get_markdown_cache().invalidate(input_file)
         self._eventBus.emit("message", "info", self._id, "Markdown front matter update completed successfully!")
         return {"filePath": input_file, "frontMatter": post.metadata}
 
@@ -166,19 +254,17 @@ class MarkdownProcessor(MessageNode):
         input_file = self._get_input_value(self.inputs.get("inputFile"), "")
         if not input_file or not os.path.exists(input_file):
             raise MarkdownProcessorError("未指定或找不到输入文件")
-        with open(input_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        # 只识别以 # 开头且后面有空格的 Markdown 标题
-        toc = [line.strip() for line in lines if line.lstrip().startswith('#') and len(line.lstrip()) > 1 and line.lstrip()[1] == ' ']
+        document = get_markdown_cache().load(input_file)
+        # 识别 1~6 级 ATX 标题（# 后有空格），围栏代码块中的注释不算
+        toc = [heading["text"] for heading in document.headings]
         self._eventBus.emit("message", "info", self._id, "Markdown TOC generation completed successfully!")
-        return {"toc": toc}
+        return {"toc": toc, "tree": document.heading_tree}
 
     def handle_lint(self):
         input_file = self._get_input_value(self.inputs.get("inputFile"), "")
         if not input_file or not os.path.exists(input_file):
             raise MarkdownProcessorError("未指定或找不到输入文件")
-        with open(input_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
+        lines = get_markdown_cache().load(input_file).lines
         issues = []
         for i, line in enumerate(lines):
             if line.startswith("#") and line.strip() == "#":
@@ -191,15 +277,35 @@ class MarkdownProcessor(MessageNode):
             raise MarkdownProcessorError(f"节点 {self._id}: 缺少后续节点配置",7)
         self._next = self._nextNodes[0][1]
 
+    def _get_input_files(self, value) -> list:
+        """文件列表输入：引用得到的列表原样使用，字符串按 JSON 数组或逐行、逗号分隔解析"""
+        if isinstance(value, dict) and value.get("type") == "ref":
+            content = value.get("content", [])
+            if len(content) >= 2:
+                node_id = content[0][:-7] if content[0].endswith("_locals") else content[0]
+                value = materialize(self._eventBus.emit("askMessage", node_id, content[1]))
+        elif isinstance(value, dict):
+            value = value.get("content")
+        if isinstance(value, (list, tuple)):
+            return [str(item) for item in value]
+        if not value:
+            return []
+        text = str(value).strip()
+        if text.startswith("["):
+            try:
+                return [str(item) for item in json.loads(text)]
+            except json.JSONDecodeError:
+                pass
+        return [item.strip() for item in text.replace(",", "\n").splitlines() if item.strip()]
+
+    def _write_html(self, input_file: str, output_file: str) -> str:
+        """渲染带样式的 HTML 页面并写入文件"""
+        # 同一文件的解析和渲染结果在节点之间共享，front matter 不参与渲染
+        html = self._get_html_with_style(get_markdown_cache().load(input_file).html)
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write(html)
+        return html
+
     def _get_html_with_style(self, html_body: str) -> str:
-        pygments_css = HtmlFormatter().get_style_defs('.codehilite')
-        table_css = '''
-        table { border-collapse: collapse; width: 100%; }
-        th, td { border: 1px solid #ccc; padding: 6px 12px; }
-        th { background: #f8f8f8; }
-        '''
-        style_block = f"<style>{pygments_css}\n{table_css}</style>"
-        mathjax_script = (
-            '<script src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"></script>'
-        )
-        return f"<!DOCTYPE html><html><head>{style_block}{mathjax_script}</head><body>{html_body}</body></html>" 
\ No newline at end of file
+        style_block = f"<style>{pygments_css()}\n{TABLE_CSS}</style>"
+        return f"<!DOCTYPE html><html><head>{style_block}{MATHJAX_SCRIPT}</head><body>{html_body}</body></html>" 
\ No newline at end of file
@@ -1,13 +1,238 @@
 from .MessageNode import MessageNode
 import os
 from typing import Dict, Any, List, Optional
-from PyPDF2 import PdfReader, PdfWriter, PdfMerger
+from PyPDF2 import PdfReader, PdfWriter
 from PIL import Image
 import fitz  # PyMuPDF
 import io
 import re
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from docx import Document
 from docx.shared import Inches, Pt
+from ..cache import get_page_cache
+from ..artifacts import Artifact
+from ..streams import materialize
+
+# 并行模式下每个工作进程一次处理的页数上限，较小的分块可以让文本尽早按顺序写出
+PARALLEL_CHUNK_PAGES = 16
+# inMemory 模式下 text 输出只保留的预览字符数，完整文本在 textFile 内存产物中
+TEXT_PREVIEW_CHARS = 1000
+# 缩略图预设使用的渲染分辨率
+THUMBNAIL_DPI = 36
+# 并行渲染时每个工作进程允许同时排队的页数，用于限制内存中的像素图数量
+RENDER_INFLIGHT_PER_WORKER = 2
+
+
+def get_unique_filename(filepath: str) -> str:
+    """
+    生成不重复的文件名。如果文件已存在，在文件名后添加序号。
+
+    Args:
+        filepath (str): 原始文件路径
+
+    Returns:
+        str: 不重复的文件路径
+    """
+    if not os.path.exists(filepath):
+        return filepath
+
+    directory = os.path.dirname(filepath)
+    filename = os.path.basename(filepath)
+    name, ext = os.path.splitext(filename)
+
+    counter = 1
+    while True:
+        new_filepath = os.path.join(directory, f"{name}_{counter}{ext}")
+        if not os.path.exists(new_filepath):
+            return new_filepath
+        counter += 1
+
+
+def _split_chunks(pages: List[int], chunk_size: int) -> List[List[int]]:
+    """将页码列表切分为连续的小块"""
+    return [pages[i:i + chunk_size] for i in range(0, len(pages), chunk_size)]
+
+
+def _extract_pages_worker(input_file: str, pages: List[int], output_dir: str, extract_images: bool,
+                          image_owners: Optional[Dict[int, tuple]] = None):
+    """
+    工作进程：独立打开文档，提取一组页面的文本，并只写出首次出现于这些页面的图片
+
+    Args:
+        image_owners: xref -> 负责保存该图片的 (页码, 序号)；为 None 时每页保存自己引用的所有图片
+
+    Returns:
+        list: [(文本, {xref: 图片路径}), ...]，与 pages 顺序一致
+    """
+    results = []
+    doc = fitz.open(input_file)
+    try:
+        for page_num in pages:
+            page = doc[page_num]
+            saved = {}
+            if extract_images:
+                for img_index, img in enumerate(page.get_images()):
+                    xref = img[0]
+                    if image_owners is not None and image_owners.get(xref) != (page_num, img_index):
+                        continue
+                    base_image = doc.extract_image(xref)
+                    image_path = get_unique_filename(
+                        os.path.join(output_dir, f"page_{page_num + 1}_img_{img_index + 1}.png"))
+                    with open(image_path, "wb") as img_file:
+                        img_file.write(base_image["image"])
+                    saved[xref] = image_path
+            results.append((page.get_text(), saved))
+    finally:
+        doc.close()
+    return results
+
+
+def unique_filenames(directory: str, filenames: List[str]) -> List[str]:
+    """
+    批量生成不重复的文件路径：只列一次目录，避免逐个文件探测文件系统
+
+    规则与 get_unique_filename 相同：重名时在文件名后添加序号。
+    """
+    taken = set(os.listdir(directory)) if os.path.isdir(directory) else set()
+    result = []
+    for filename in filenames:
+        candidate = filename
+        name, ext = os.path.splitext(filename)
+        counter = 1
+        while candidate in taken:
+            candidate = f"{name}_{counter}{ext}"
+            counter += 1
+        taken.add(candidate)
+        result.append(os.path.join(directory, candidate))
+    return result
+
+
+# 渲染工作进程内复用的文档句柄，由进程池 initializer 打开
+_worker_doc = None
+
+
+def _open_worker_doc(input_file: str):
+    global _worker_doc
+    _worker_doc = fitz.open(input_file)
+
+
+def _render_page_worker(page_num: int, output_path: str, dpi: float) -> int:
+    """工作进程：渲染单页并直接保存，像素图不跨进程传输"""
+    pix = _worker_doc[page_num].get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72))
+    pix.save(output_path)
+    return page_num
+
+
+def _build_watermark_page(template_doc, rect, watermark_text: str, opacity, position: str) -> int:
+    """
+    在模板文档中为指定页面尺寸新建一页水印，返回该页在模板文档中的页码
+    """
+    temp_page = template_doc.new_page(width=rect.width, height=rect.height)
+    
+    # 计算水印文本大小（根据页面大小自适应）
+    diagonal = (rect.width ** 2 + rect.height ** 2) ** 0.5
+    font_size = diagonal * 0.05  # 水印大小为对角线的05%
+    
+    # 计算不同位置的坐标
+    margin = font_size  # 边距为字体大小
+    positions = {
+        "center": (rect.width / 4, rect.height / 4),
+        "topLeft":(margin, margin),
+        "topRight": (rect.width/2 - margin, margin),
+        "bottomLeft": (margin, rect.height/2 - margin),
+        "bottomRight":  (rect.width/2 - margin, rect.height/2 - margin)
+    }
+    
+    # 获取位置（如果未指定则默认为center）
+    pos = position if position in positions else "center"
+    x, y = positions[pos]
+    
+    # 设置水印颜色和透明度
+    alpha = opacity / 100.0  # 将百分比转换为0-1范围
+    gray_level = 0.8
+    color = (gray_level, gray_level, gray_level, alpha)  # RGBA颜色
+    
+    # 根据位置决定是否旋转
+    if pos == "center":
+        # 中心位置时旋转45度
+        temp_page.insert_text(
+            (x - font_size/2, y),  # 调整位置以确保真正居中
+            watermark_text,
+            fontname="china-s",
+            fontsize=font_size,
+            color=color
+        )
+        temp_page.set_rotation(45)
+    else:
+        # 其他位置不旋转
+        temp_page.insert_text(
+            (x, y),
+            watermark_text,
+            fontname="china-s",
+            fontsize=font_size,
+            color=color
+        )
+    return temp_page.number
+
+
+def stamp_watermark(doc, watermark_text: str, opacity, position: str) -> int:
+    """
+    为文档每一页叠加水印
+
+    水印模板按 (页面宽, 页面高, 旋转角度) 分桶，每种页面规格只生成一次；
+    同一模板页被 show_pdf_page 多次引用时共享同一个 Form XObject，不会为每页复制一份。
+
+    Returns:
+        int: 生成的模板数量
+    """
+    template_doc = fitz.open()
+    templates = {}
+    try:
+        # 先生成全部模板：show_pdf_page 开始引用模板文档后不能再向其中添加页面
+        page_keys = []
+        for page in doc:
+            rect = page.rect
+            key = (round(rect.width, 2), round(rect.height, 2), page.rotation)
+            if key not in templates:
+                templates[key] = _build_watermark_page(template_doc, rect, watermark_text, opacity, position)
+            page_keys.append(key)
+        for page, key in zip(doc, page_keys):
+            # 将模板页作为水印叠加到原页面上
+            page.show_pdf_page(page.rect, template_doc, templates[key])
+    finally:
+        template_doc.close()
+    return len(templates)
+
+
+def _watermark_file_worker(input_file: str, output_file: str, watermark_text: str, opacity, position: str) -> int:
+    """工作进程：为单个文件添加水印并保存，返回页数"""
+    doc = fitz.open(input_file)
+    try:
+        stamp_watermark(doc, watermark_text, opacity, position)
+        doc.save(output_file)
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+@contextmanager
+def _open_text_sink(target):
+    """按页写出文本的目标：内存产物直接追加，路径则打开文件"""
+    if isinstance(target, Artifact):
+        yield _ArtifactTextWriter(target)
+    else:
+        with open(target, "w", encoding="utf-8") as f:
+            yield f
+
+
+class _ArtifactTextWriter:
+    def __init__(self, artifact: Artifact):
+        self.artifact = artifact
+
+    def write(self, text: str):
+        self.artifact.write_text(text)
+
 
 class PdfProcessor(MessageNode):
     def __init__(self, id: str, type: str, nextNodes: List, eventBus, data: Dict):
@@ -57,7 +282,7 @@ class PdfProcessor(MessageNode):
                 if node_id.endswith("_locals"):
                     node_id = node_id[:-7]
                 param_name = content[1]
-                return self._eventBus.emit("askMessage", node_id, param_name)
+                return materialize(self._eventBus.emit("askMessage", node_id, param_name))
         return None
 
     def run(self) -> bool:
@@ -115,26 +340,65 @@ class PdfProcessor(MessageNode):
         try:
             page_range = self._get_input_value(self.data, 'pageRange')
             extract_images = self._get_input_value(self.data, 'extractImages')
+            parallel = self._get_input_value(self.data, 'parallel')
             
-            # 打开PDF文件
-            doc = fitz.open(self.input_file)
-            text_content = []
-            images = []
+            cache, content_hash = self._open_page_cache()
+            
+            # 页数也走缓存，全部命中时无需打开PDF文件
+            doc = None
+            page_count = cache.get(content_hash, -1, "page_count") if cache else None
+            if page_count is None:
+                doc = fitz.open(self.input_file)
+                page_count = doc.page_count
+                if cache:
+                    cache.put(content_hash, -1, "page_count", page_count)
             
             # 处理页面范围
             if page_range:
-                pages = self._parse_page_range(page_range, doc.page_count)
+                pages = self._parse_page_range(page_range, page_count)
             else:
-                pages = range(doc.page_count)
+                pages = list(range(page_count))
+            
+            if parallel and len(pages) > PARALLEL_CHUNK_PAGES:
+                if doc is not None:
+                    doc.close()
+                return self._extract_pdf_parallel(pages, extract_images, cache, content_hash)
+            
+            cached_text = cache.get_many(content_hash, pages, "text") if cache else {}
+            cached_images = cache.get_many(content_hash, pages, "images") if cache and extract_images else {}
+            new_text = {}
+            new_images = {}
+            
+            text_content = []
+            images = []
+            # xref -> 已保存的图片路径，同一图片被多页引用时只解码保存一次
+            saved_images = {}
+            image_references = 0
             
             # 提取文本和图片
             for page_num in pages:
-                page = doc[page_num]
-                text_content.append(page.get_text())
+                page = None
+                text = cached_text.get(page_num)
+                if text is None:
+                    if doc is None:
+                        doc = fitz.open(self.input_file)
+                    page = doc[page_num]
+                    text = new_text[page_num] = page.get_text()
+                text_content.append(text)
                 
                 if extract_images:
-                    for img_index, img in enumerate(page.get_images()):
-                        xref = img[0]
+                    xrefs = cached_images.get(page_num)
+                    if xrefs is None:
+                        if doc is None:
+                            doc = fitz.open(self.input_file)
+                        page = page or doc[page_num]
+                        xrefs = new_images[page_num] = [img[0] for img in page.get_images()]
+                    for img_index, xref in enumerate(xrefs):
+                        image_references += 1
+                        if xref in saved_images:
+                            continue
+                        if doc is None:
+                            doc = fitz.open(self.input_file)
                         base_image = doc.extract_image(xref)
                         image_data = base_image["image"]
                         
@@ -144,25 +408,128 @@ class PdfProcessor(MessageNode):
                         image_path = self._get_unique_filename(image_path)
                         with open(image_path, "wb") as img_file:
                             img_file.write(image_data)
+                        saved_images[xref] = image_path
                         images.append(image_path)
             
-            # 保存提取的文本到指定目录
+            if cache:
+                cache.put_many(content_hash, new_text, "text")
+                cache.put_many(content_hash, new_images, "images")
+                self._emit_cache_usage(len(cached_text), len(pages))
+            
+            # 保存提取的文本到指定目录，inMemory 时作为内存产物交给下游节点
             text_content_str = "\n".join(text_content)
-            text_output_file = os.path.join(self.output_dir, "extracted_text.txt")
-            text_output_file = self._get_unique_filename(text_output_file)
-            with open(text_output_file, "w", encoding="utf-8") as f:
-                f.write(text_content_str)
+            if self._get_input_value(self.data, 'inMemory'):
+                text_output_file = Artifact.from_text("extracted_text.txt", text_content_str)
+            else:
+                text_output_file = os.path.join(self.output_dir, "extracted_text.txt")
+                text_output_file = self._get_unique_filename(text_output_file)
+                with open(text_output_file, "w", encoding="utf-8") as f:
+                    f.write(text_content_str)
 
-            doc.close()
+            if doc is not None:
+                doc.close()
             self._eventBus.emit("message", "info", self._id, "PDF extraction completed successfully!")
             return {
-                "text": text_content_str,
+                "text": self._text_output(text_content_str),
                 "textFile": text_output_file,
-                "images": images if extract_images else []
+                "images": images if extract_images else [],
+                "uniqueImageCount": len(images),
+                "imageReferenceCount": image_references
             }
         except Exception as e:
             raise RuntimeError(f"提取PDF内容时发生错误: {str(e)}",10)
 
+    def _text_output(self, text: str) -> str:
+        """inMemory 时完整文本已在内存产物中，text 输出只保留开头的预览，避免同一文本在输出中保存两份"""
+        if self._get_input_value(self.data, 'inMemory'):
+            return text[:TEXT_PREVIEW_CHARS]
+        return text
+
+    def _extract_pdf_parallel(self, pages: List[int], extract_images: bool,
+                              cache=None, content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        并行提取：先读取页面缓存，未命中的页面按小块分配给多个工作进程，各进程独立打开文档并直接写出图片，
+        主进程按页码顺序把缓存和工作进程返回的文本流式写入输出文件。
+        """
+        workers = self._get_input_value(self.data, 'workers') or os.cpu_count() or 1
+        if self._get_input_value(self.data, 'inMemory'):
+            text_output_file = Artifact("extracted_text.txt")
+        else:
+            text_output_file = self._get_unique_filename(os.path.join(self.output_dir, "extracted_text.txt"))
+        cached_text = cache.get_many(content_hash, pages, "text") if cache else {}
+        cached_images = cache.get_many(content_hash, pages, "images") if cache and extract_images else {}
+        new_images = {}
+        image_owners = {}
+        image_references = 0
+
+        if extract_images:
+            # 先在主进程扫描引用关系（缓存中已有的页面不再打开），记录每个 xref 首次出现的 (页码, 序号)，
+            # 同一张图片（如每页都有的 logo）只由一个工作进程解码保存一次
+            page_xrefs = dict(cached_images)
+            uncached = [page_num for page_num in pages if page_num not in page_xrefs]
+            if uncached:
+                doc = fitz.open(self.input_file)
+                try:
+                    for page_num in uncached:
+                        page_xrefs[page_num] = new_images[page_num] = [img[0] for img in doc[page_num].get_images()]
+                finally:
+                    doc.close()
+            for page_num in pages:
+                for img_index, xref in enumerate(page_xrefs[page_num]):
+                    image_owners.setdefault(xref, (page_num, img_index))
+                image_references += len(page_xrefs[page_num])
+
+        # 文本未命中缓存的页面，以及需要保存图片的页面交给工作进程
+        owner_pages = {page_num for page_num, _ in image_owners.values()}
+        work_pages = [page_num for page_num in pages if page_num not in cached_text or page_num in owner_pages]
+        chunks = _split_chunks(work_pages, PARALLEL_CHUNK_PAGES)
+        text_content = []
+        images = []
+
+        if chunks:
+            self._eventBus.emit("message", "info", self._id,
+                                f"并行提取 {len(work_pages)} 页，{min(int(workers), len(chunks))} 个进程")
+        with ExitStack() as stack:
+            results = iter(())
+            if chunks:
+                executor = stack.enter_context(ProcessPoolExecutor(max_workers=min(int(workers), len(chunks))))
+                # executor.map 按提交顺序返回结果，与 work_pages 的顺序一致
+                results = (page_result for chunk_result in executor.map(
+                    _extract_pages_worker,
+                    [self.input_file] * len(chunks),
+                    chunks,
+                    [self.output_dir] * len(chunks),
+                    [bool(extract_images)] * len(chunks),
+                    [image_owners] * len(chunks)
+                ) for page_result in chunk_result)
+            f = stack.enter_context(_open_text_sink(text_output_file))
+            work = set(work_pages)
+            for page_num in pages:
+                if page_num in work:
+                    page_text, saved = next(results)
+                    images.extend(saved.values())
+                else:
+                    page_text = cached_text[page_num]
+                if text_content:
+                    f.write("\n")
+                f.write(page_text)
+                text_content.append(page_text)
+
+        if cache:
+            cache.put_many(content_hash, {page_num: text for page_num, text in zip(pages, text_content)
+                                          if page_num not in cached_text}, "text")
+            cache.put_many(content_hash, new_images, "images")
+            self._emit_cache_usage(len(cached_text), len(pages))
+
+        self._eventBus.emit("message", "info", self._id, "PDF extraction completed successfully!")
+        return {
+            "text": self._text_output("\n".join(text_content)),
+            "textFile": text_output_file,
+            "images": images if extract_images else [],
+            "uniqueImageCount": len(images),
+            "imageReferenceCount": image_references
+        }
+
     def _merge_pdfs(self) -> Dict[str, Any]:
         """合并多个PDF文件"""
         try:
@@ -174,19 +541,26 @@ class PdfProcessor(MessageNode):
             else:  # sort_by == 'date'
                 input_files.sort(key=lambda x: os.path.getmtime(x))
             
-            merger = PdfMerger()
-            for pdf_file in input_files:
-                merger.append(pdf_file)
+            deduplicate = self._get_input_value(self.data, 'deduplicate')
+            
+            # 逐个打开源文件插入合并文档，插入后立即关闭，同一时刻只持有一个源文件
+            merged = fitz.open()
+            total_pages = 0
+            for index, pdf_file in enumerate(input_files, start=1):
+                with fitz.open(pdf_file) as src:
+                    merged.insert_pdf(src)
+                    total_pages += src.page_count
+                self._emit_progress(index, len(input_files))
             
             # 使用指定的输出路径
             output_file = os.path.join(self.output_dir, f"{self.output_name}.pdf")
             output_file = self._get_unique_filename(output_file)
-            merger.write(output_file)
-            merger.close()
-            
-            # 计算总页数
-            reader = PdfReader(output_file)
-            total_pages = len(reader.pages)
+            if deduplicate:
+                # garbage=4 合并内容相同的对象（包括多个输入之间重复的字体、图片流）
+                merged.save(output_file, garbage=4, deflate=True)
+            else:
+                merged.save(output_file)
+            merged.close()
             
             self._eventBus.emit("message", "info", self._id, "PDF merge completed successfully!")
             return {
@@ -226,8 +600,14 @@ class PdfProcessor(MessageNode):
             
             elif split_method == 'byBookmark':
                 # 使用PyMuPDF处理书签
-                doc = fitz.open(self.input_file)
-                toc = doc.get_toc()
+                cache, content_hash = self._open_page_cache()
+                toc = cache.get(content_hash, -1, "toc") if cache else None
+                if toc is None:
+                    doc = fitz.open(self.input_file)
+                    toc = doc.get_toc()
+                    doc.close()
+                    if cache:
+                        cache.put(content_hash, -1, "toc", toc)
                 if not toc:
                     raise ValueError("PDF文件没有书签")
                 
@@ -259,8 +639,6 @@ class PdfProcessor(MessageNode):
                     with open(output_file, "wb") as output:
                         current_writer.write(output)
                     output_files.append(output_file)
-                
-                doc.close()
             
             elif split_method == 'bySize':
                 target_size_mb = float(value)
@@ -268,15 +646,20 @@ class PdfProcessor(MessageNode):
                 current_size = 0
                 file_counter = 1
                 
-                for page in reader.pages:
-                    # 创建临时文件来估算页面大小
-                    temp_writer = PdfWriter()
-                    temp_writer.add_page(page)
-                    temp_file = os.path.join(self.output_dir, "temp.pdf")
-                    with open(temp_file, "wb") as output:
-                        temp_writer.write(output)
-                    page_size = os.path.getsize(temp_file) / (1024 * 1024)  # 转换为MB
-                    os.remove(temp_file)
+                # 单页大小估算代价很高，按文件内容哈希逐页缓存
+                cache, content_hash = self._open_page_cache()
+                cached_sizes = cache.get_many(content_hash, range(total_pages), "split_size") if cache else {}
+                new_sizes = {}
+                
+                for page_num, page in enumerate(reader.pages):
+                    page_size = cached_sizes.get(page_num)
+                    if page_size is None:
+                        # 在内存中单独写出该页来估算页面大小
+                        temp_writer = PdfWriter()
+                        temp_writer.add_page(page)
+                        buffer = io.BytesIO()
+                        temp_writer.write(buffer)
+                        page_size = new_sizes[page_num] = buffer.tell() / (1024 * 1024)  # 转换为MB
                     
                     if current_size + page_size > target_size_mb:
                         # 保存当前文件
@@ -292,6 +675,10 @@ class PdfProcessor(MessageNode):
                     current_writer.add_page(page)
                     current_size += page_size
                 
+                if cache:
+                    cache.put_many(content_hash, new_sizes, "split_size")
+                    self._emit_cache_usage(len(cached_sizes), total_pages)
+                
                 # 保存最后一个文件
                 if current_writer.pages:
                     output_file = os.path.join(self.output_dir, f"{self.output_name}_{file_counter}.pdf")
@@ -362,20 +749,19 @@ class PdfProcessor(MessageNode):
                 output_files.append(docx_path)
                 conversion_log.append(f"PDF converted to DOCX: {docx_path}")
             
+            elif output_format in ['png', 'jpg']:
+                self._render_pages(doc, output_format, dpi, output_files, conversion_log)
+            
             else:
+                # 文本和HTML按页缓存，未修改的文档再次转换时无需重新解析页面
+                cache, content_hash = self._open_page_cache() if output_format in ['text', 'html'] else (None, None)
+                cached_pages = cache.get_many(content_hash, range(len(doc)), output_format) if cache else {}
+                new_pages = {}
                 for page_num in range(len(doc)):
-                    page = doc[page_num]
-                    if output_format in ['png', 'jpg']:
-                        pix = page.get_pixmap(matrix=fitz.Matrix(dpi/72, dpi/72))
-                        image_filename = f"{self.output_name}_page_{page_num + 1}.{output_format}"
-                        image_path = os.path.join(self.output_dir, image_filename)
-                        image_path = self._get_unique_filename(image_path)
-                        pix.save(image_path)
-                        output_files.append(image_path)
-                        conversion_log.append(f"Page {page_num + 1} converted to {output_format}")
-                    
-                    elif output_format == 'text':
-                        text = page.get_text()
+                    if output_format == 'text':
+                        text = cached_pages.get(page_num)
+                        if text is None:
+                            text = new_pages[page_num] = doc[page_num].get_text()
                         text_filename = f"{self.output_name}_page_{page_num + 1}.txt"
                         text_path = os.path.join(self.output_dir, text_filename)
                         text_path = self._get_unique_filename(text_path)
@@ -385,7 +771,9 @@ class PdfProcessor(MessageNode):
                         conversion_log.append(f"Page {page_num + 1} converted to text")
                     
                     elif output_format == 'html':
-                        html = page.get_text("html")
+                        html = cached_pages.get(page_num)
+                        if html is None:
+                            html = new_pages[page_num] = doc[page_num].get_text("html")
                         html_filename = f"{self.output_name}_page_{page_num + 1}.html"
                         html_path = os.path.join(self.output_dir, html_filename)
                         html_path = self._get_unique_filename(html_path)
@@ -393,6 +781,10 @@ class PdfProcessor(MessageNode):
                             f.write(html)
                         output_files.append(html_path)
                         conversion_log.append(f"Page {page_num + 1} converted to HTML")
+                
+                if cache:
+                    cache.put_many(content_hash, new_pages, output_format)
+                    self._emit_cache_usage(len(cached_pages), len(doc))
             
             doc.close()
             self._eventBus.emit("message", "info", self._id, "PDF conversion completed successfully!")
@@ -403,6 +795,76 @@ class PdfProcessor(MessageNode):
         except Exception as e:
             raise RuntimeError(f"转换PDF文件时发生错误: {str(e)}",10)
 
+    def _render_pages(self, doc, output_format: str, dpi, output_files: List[str], conversion_log: List[str]):
+        """
+        将页面渲染为图片。并行模式下页面分发到进程池，同时在途的页数受限，
+        每完成一页发送一次 node_progress 事件。
+        """
+        preset = self._get_input_value(self.data, 'preset')
+        parallel = self._get_input_value(self.data, 'parallel')
+        prefix = self.output_name
+        if preset == 'thumbnail':
+            dpi = THUMBNAIL_DPI
+            prefix = f"{self.output_name}_thumb"
+        dpi = float(dpi)
+
+        total = doc.page_count
+        paths = unique_filenames(
+            self.output_dir, [f"{prefix}_page_{page_num + 1}.{output_format}" for page_num in range(total)])
+
+        if not parallel or total <= 1:
+            for page_num in range(total):
+                pix = doc[page_num].get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72))
+                pix.save(paths[page_num])
+                pix = None
+                self._emit_progress(page_num + 1, total)
+        else:
+            workers = min(int(self._get_input_value(self.data, 'workers') or os.cpu_count() or 1), total)
+            max_inflight = workers * RENDER_INFLIGHT_PER_WORKER
+            completed = 0
+            with ProcessPoolExecutor(max_workers=workers, initializer=_open_worker_doc,
+                                     initargs=(self.input_file,)) as executor:
+                pending = set()
+                for page_num in range(total):
+                    # 在途页数达到上限时先等待部分页面完成，避免像素图堆积
+                    if len(pending) >= max_inflight:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                            completed += 1
+                            self._emit_progress(completed, total)
+                    pending.add(executor.submit(_render_page_worker, page_num, paths[page_num], dpi))
+                for future in pending:
+                    future.result()
+                    completed += 1
+                    self._emit_progress(completed, total)
+
+        output_files.extend(paths)
+        conversion_log.extend(f"Page {page_num + 1} converted to {output_format}" for page_num in range(total))
+
+    def _emit_progress(self, current: int, total: int):
+        """发送逐页进度事件"""
+        self._eventBus.emit("node_progress", {"nodeId": self._id, "current": current, "total": total})
+
+    def _open_page_cache(self):
+        """
+        获取页面缓存及当前输入文件的内容哈希
+
+        Returns:
+            tuple: (PageCache, 内容哈希)，未开启 useCache 时返回 (None, None)
+
+        缓存默认关闭：开启后提取的文本会持久化保存在服务器的缓存目录中，并被之后的运行共享。
+        """
+        if not self._get_input_value(self.data, 'useCache'):
+            return None, None
+        cache = get_page_cache()
+        return cache, cache.file_hash(self.input_file)
+
+    def _emit_cache_usage(self, hits: int, total: int):
+        """报告本次运行的缓存命中情况"""
+        if hits:
+            self._eventBus.emit("message", "info", self._id, f"页面缓存命中 {hits}/{total} 页")
+
     def _compress_pdf(self) -> Dict[str, Any]:
         """压缩PDF文件"""
         try:
@@ -420,11 +882,20 @@ class PdfProcessor(MessageNode):
             output_file = os.path.join(self.output_dir, f"{self.output_name}.pdf")
             output_file = self._get_unique_filename(output_file)
             
+            # 按 xref 去重：同一图片无论被多少页引用，都只压缩并替换一次
+            processed_xrefs = set()
+            image_references = 0
+            compressed_count = 0
+            
             for page in doc:
                 # 压缩页面上的图片
                 for img_index, img in enumerate(page.get_images()):
+                    xref = img[0]
+                    image_references += 1
+                    if xref in processed_xrefs:
+                        continue
+                    processed_xrefs.add(xref)
                     try:
-                        xref = img[0]
                         base_image = doc.extract_image(xref)
                         if not base_image:
                             continue
@@ -462,9 +933,9 @@ class PdfProcessor(MessageNode):
                                      quality=settings['jpeg_quality'],
                                      optimize=True)
                             
-                            # 替换原图片
-                            page.delete_image(xref)
-                            page.insert_image(page.rect, stream=compressed_image.getvalue())
+                            # 原地替换图片对象，所有引用该 xref 的页面同时生效
+                            page.replace_image(xref, stream=compressed_image.getvalue())
+                            compressed_count += 1
                     except Exception as img_error:
                         # 记录图片处理错误但继续处理其他图片
                         self._eventBus.emit("message", "warning", self._id, f"处理图片时出现警告: {str(img_error)}")
@@ -488,7 +959,10 @@ class PdfProcessor(MessageNode):
                 "outputFile": output_file,
                 "originalSize": original_size,
                 "compressedSize": compressed_size,
-                "compressionRatio": round(compression_ratio, 2)
+                "compressionRatio": round(compression_ratio, 2),
+                "uniqueImageCount": len(processed_xrefs),
+                "imageReferenceCount": image_references,
+                "compressedImageCount": compressed_count
             }
         except Exception as e:
             raise RuntimeError(f"压缩PDF文件时发生错误: {str(e)}",10)
@@ -563,91 +1037,57 @@ class PdfProcessor(MessageNode):
             raise RuntimeError(f"解密PDF文件时发生错误: {str(e)}",10)
 
     def _add_watermark(self) -> Dict[str, Any]:
-        """添加水印到PDF"""
+        """添加水印到PDF，提供 inputFiles 时批量并行处理多个文件"""
         try:
             watermark_text = self._get_input_value(self.data, 'watermarkText')
             opacity = self._get_input_value(self.data, 'opacity') or 30
             position = self._get_input_value(self.data, 'position') or 'center'
+            input_files = self._get_input_value(self.data, 'inputFiles')
             
-            doc = fitz.open(self.input_file)
+            if input_files:
+                return self._add_watermark_batch(input_files, watermark_text, opacity, position)
             
-            for page in doc:
-                # 获取页面尺寸
-                rect = page.rect
-                
-                # 创建临时PDF页面作为水印模板
-                temp_doc = fitz.open()
-                temp_page = temp_doc.new_page(width=rect.width, height=rect.height)
-                
-                # 计算水印文本大小（根据页面大小自适应）
-                diagonal = (rect.width ** 2 + rect.height ** 2) ** 0.5
-                font_size = diagonal * 0.05  # 水印大小为对角线的05%
-                
-                # 计算不同位置的坐标
-                margin = font_size  # 边距为字体大小
-                positions = {
-                    "center": (rect.width / 4, rect.height / 4),
-                    "topLeft":(margin, margin),
-                    "topRight": (rect.width/2 - margin, margin),
-                    "bottomLeft": (margin, rect.height/2 - margin),
-                    "bottomRight":  (rect.width/2 - margin, rect.height/2 - margin)
-                }
-                
-                # 获取位置（如果未指定则默认为center）
-                pos = position if position in positions else "center"
-                x, y = positions[pos]
-                
-                # 设置水印颜色和透明度
-                alpha = opacity / 100.0  # 将百分比转换为0-1范围
-                gray_level = 0.8
-                color = (gray_level, gray_level, gray_level, alpha)  # RGBA颜色
-                
-                # 根据位置决定是否旋转
-                if pos == "center":
-                    # 中心位置时旋转45度
-                    temp_page.insert_text(
-                        (x - font_size/2, y),  # 调整位置以确保真正居中
-                        watermark_text,
-                        fontname="china-s",
-                        fontsize=font_size,
-                        color=color
-                    )
-                    temp_page.set_rotation(45)
-                else:
-                    # 其他位置不旋转
-                    temp_page.insert_text(
-                        (x, y),
-                        watermark_text,
-                        fontname="china-s",
-                        fontsize=font_size,
-                        color=color
-                    )
-                
-                # 将临时页面作为水印叠加到原页面上
-                page.show_pdf_page(
-                    rect,  # 目标矩形（整个页面）
-                    temp_doc,  # 源文档
-                    0,  # 源页面号（第一页）
-                )
-                
-                # 关闭临时文档
-                temp_doc.close()
-                
-                # 应用更改
-                page.clean_contents()
+            doc = fitz.open(self.input_file)
+            template_count = stamp_watermark(doc, watermark_text, opacity, position)
             
             output_file = os.path.join(self.output_dir, f"{self.output_name}.pdf")
             output_file = self._get_unique_filename(output_file)
             doc.save(output_file)
             doc.close()
             
-            self._eventBus.emit("message", "info", self._id, "PDF watermark added successfully!")
+            self._eventBus.emit("message", "info", self._id,
+                                f"PDF watermark added successfully! ({template_count} watermark template(s))")
             return {
                 "outputFile": output_file
             }
         except Exception as e:
             raise RuntimeError(f"添加水印时发生错误: {str(e)}",10)
 
+    def _add_watermark_batch(self, input_files: List[str], watermark_text: str, opacity, position: str) -> Dict[str, Any]:
+        """批量水印：每个文件交给一个工作进程独立处理"""
+        output_files = unique_filenames(
+            self.output_dir,
+            [f"{self.output_name}_{os.path.splitext(os.path.basename(path))[0]}.pdf" for path in input_files])
+        workers = min(int(self._get_input_value(self.data, 'workers') or os.cpu_count() or 1), len(input_files))
+        
+        total_pages = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_watermark_file_worker, input_file, output_file, watermark_text, opacity, position)
+                for input_file, output_file in zip(input_files, output_files)
+            ]
+            for completed, future in enumerate(futures, start=1):
+                total_pages += future.result()
+                self._emit_progress(completed, len(futures))
+        
+        self._eventBus.emit("message", "info", self._id,
+                            f"PDF watermark added to {len(output_files)} files ({total_pages} pages)")
+        return {
+            "outputFiles": output_files,
+            "fileCount": len(output_files),
+            "pageCount": total_pages
+        }
+
     def _edit_metadata(self) -> Dict[str, Any]:
         """编辑PDF元数据"""
         try:
@@ -712,16 +1152,4 @@ class PdfProcessor(MessageNode):
         Returns:
             str: 不重复的文件路径
         """
-        if not os.path.exists(filepath):
-            return filepath
-            
-        directory = os.path.dirname(filepath)
-        filename = os.path.basename(filepath)
-        name, ext = os.path.splitext(filename)
-        
-        counter = 1
-        while True:
-            new_filepath = os.path.join(directory, f"{name}_{counter}{ext}")
-            if not os.path.exists(new_filepath):
-                return new_filepath
-            counter += 1
+        return get_unique_filename(filepath)
@@ -1,8 +1,186 @@
 from .MessageNode import MessageNode
 import re
-from collections import Counter
-from typing import Dict, Any, Optional, List
+import io
+import heapq
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
 import os
+from ..artifacts import Artifact, source_name
+from ..events import EventBus
+from ..encoding import ENCODING_CANDIDATES, detect_encoding, read_text
+from ..streams import materialize
+
+# 超过该大小的文件按块流式处理，内存占用与文件大小无关
+STREAM_THRESHOLD_BYTES = 8 * 1024 * 1024
+STREAM_CHUNK_CHARS = 1024 * 1024
+# 流式替换时为跨块匹配保留的字符数：起点落在块末尾这段范围内的匹配推迟到下一块处理
+REPLACE_OVERLAP_CHARS = 4096
+
+
+def stream_replace(reader, write, pattern, replacement: str, literal: bool = False,
+                   chunk_chars: int = STREAM_CHUNK_CHARS, overlap: int = REPLACE_OVERLAP_CHARS) -> int:
+    """
+    分块流式替换，返回替换次数
+
+    每块与上一块留下的尾部拼接后查找匹配，替换和计数在同一遍扫描中完成；起点位于末尾 overlap
+    个字符内、或一直延伸到块末尾的匹配可能跨越块边界，连同其后的内容留到下一块处理。
+    已写出的末尾 overlap 个字符作为上下文保留，使 ^、\b 和后顾断言在块边界处的判断与整体替换一致。
+    长度超过 overlap 的匹配只有在其起点离块末尾足够远时才能被完整识别。
+
+    Args:
+        reader: 文本模式的文件对象
+        write: 接收替换后文本的回调
+        pattern: 编译好的正则表达式
+        replacement: 替换文本
+        literal: 为 True 时替换文本按字面使用，否则支持 \1 等反向引用
+    """
+    expand = (lambda match: replacement) if literal else (lambda match: match.expand(replacement))
+    count = 0
+    context = ""
+    carry = ""
+    while True:
+        chunk = reader.read(chunk_chars)
+        final = not chunk
+        buffer = context + carry + chunk
+        start = len(context)
+        limit = len(buffer) if final else len(buffer) - overlap
+        pos = start
+        flush_to = None
+        parts = []
+        for match in pattern.finditer(buffer, start):
+            if not final and (match.start() >= limit or match.end() == len(buffer)):
+                flush_to = max(pos, min(limit, match.start()))
+                break
+            parts.append(buffer[pos:match.start()])
+            parts.append(expand(match))
+            pos = match.end()
+            count += 1
+        if flush_to is None:
+            flush_to = max(pos, limit)
+        parts.append(buffer[pos:flush_to])
+        write("".join(parts))
+        if final:
+            return count
+        # 已写出内容的末尾 overlap 个字符；本块没有写出任何内容时沿用上一块的上下文
+        context = buffer[max(0, flush_to - overlap):flush_to]
+        carry = buffer[flush_to:]
+
+# 词频统计结果默认只返回出现次数最多的前 K 项
+DEFAULT_TOP_K = 100
+# 单个文件超过该大小时才在并行模式下按字节区间拆分
+PARALLEL_SPLIT_BYTES = 1024 * 1024
+# 按换行符切分字节区间时可以安全解码的编码：换行字节不会出现在这些编码的多字节字符内部
+_SPLITTABLE_ENCODINGS = set(ENCODING_CANDIDATES) | {'utf-8-sig'}
+_WORD_PATTERN = re.compile(r'\b\w+\b')
+_TRAILING_WORD_PATTERN = re.compile(r'\w*\Z')
+
+
+def count_words(reader, ignore_case: bool = False, min_length: int = 1, stop_words=frozenset(),
+                ngram: int = 1, chunk_chars: int = STREAM_CHUNK_CHARS) -> Tuple[Counter, int]:
+    """
+    分块统计词频（或 n-gram 频次）
+
+    块末尾未结束的单词留到下一块，n-gram 保留上一块最后 n-1 个词，结果与整体统计一致。
+
+    Returns:
+        tuple: (频次计数, 过滤后的词总数)
+    """
+    counts = Counter()
+    total = 0
+    carry = ""
+    history = deque(maxlen=max(ngram - 1, 0))
+    while True:
+        chunk = reader.read(chunk_chars)
+        text = carry + chunk
+        if chunk:
+            # 只在末尾一小段内查找未结束的单词，避免在整块上回溯
+            tail = _TRAILING_WORD_PATTERN.search(text, max(0, len(text) - 1024)).group()
+            cut = len(text) - len(tail)
+            text, carry = text[:cut], text[cut:]
+        if ignore_case:
+            text = text.lower()
+        words = [word for word in _WORD_PATTERN.findall(text)
+                 if len(word) >= min_length and word not in stop_words]
+        total += len(words)
+        if ngram <= 1:
+            counts.update(words)
+        else:
+            window = list(history) + words
+            counts.update(" ".join(window[i:i + ngram]) for i in range(len(window) - ngram + 1))
+            history.extend(words)
+        if not chunk:
+            return counts, total
+
+
+def _count_file_worker(source, options: Dict[str, Any]) -> Tuple[Counter, int, str]:
+    """统计单个文件，编码探测有误时回退到整体解码"""
+    if isinstance(source, Artifact):
+        text, encoding = read_text(source)
+        return count_words(io.StringIO(text), **options) + (encoding,)
+    encoding = detect_encoding(source)
+    try:
+        with open(source, 'r', encoding=encoding, newline='') as f:
+            return count_words(f, **options) + (encoding,)
+    except UnicodeDecodeError:
+        text, encoding = read_text(source)
+        return count_words(io.StringIO(text), **options) + (encoding,)
+
+
+def _count_segment_worker(path: str, encoding: str, start: int, end: int, options: Dict[str, Any]) -> Tuple[Counter, int]:
+    """统计文件中的一个字节区间，区间边界位于换行符之后"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return count_words(io.StringIO(data.decode(encoding)), **options)
+
+
+def _split_at_newlines(path: str, parts: int) -> List[Tuple[int, int]]:
+    """把文件按字节大致均分为若干区间，每个边界向后对齐到换行符"""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts, bounds[-1]))
+            f.readline()
+            position = f.tell()
+            if position >= size:
+                break
+            bounds.append(position)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def top_k(counts: Counter, k: int) -> List[Tuple[str, int]]:
+    """按次数降序、次数相同按字典序取前 k 项；k 不大于 0 时返回全部"""
+    key = lambda item: (-item[1], item[0])
+    if k <= 0:
+        return sorted(counts.items(), key=key)
+    return heapq.nsmallest(k, counts.items(), key=key)
+
+
+def _batch_worker(data: Dict[str, Any]) -> Dict[str, Any]:
+    """工作进程：用展开后的常量输入新建节点并执行单个文件"""
+    node = TextProcessor("batch", "text-processor", [], EventBus(), data)
+    node.input_file = data["inputsValues"]["inputFile"]["content"]
+    return node._execute_mode()
+
+
+def _summarize_result(input_file: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """批量模式中单个文件的简要结果，不包含词频表等大字段"""
+    row = {
+        "inputFile": input_file,
+        "outputFile": result.get("outputFile"),
+        "status": "ok",
+        "encoding": result.get("inputEncoding", result.get("outputEncoding"))
+    }
+    if "replacementCount" in result:
+        row["replacementCount"] = result["replacementCount"]
+    if "statistics" in result:
+        row["totalWords"] = result["statistics"]["totalWords"]
+        row["uniqueWords"] = result["statistics"]["uniqueWords"]
+    return row
+
 
 class TextProcessor(MessageNode):
     def __init__(self, id: str, type: str, nextNodes: List, eventBus, data: Dict):
@@ -26,6 +204,8 @@ class TextProcessor(MessageNode):
         self.use_regex = False
         self.ignore_case = False
         self.min_length = 1
+        # 结果作为内存产物交给下游节点，不写入输出目录
+        self.in_memory = self._get_input_value(data, 'inMemory') or False
         
         # 获取输出路径配置
         self.output_folder = self._get_input_value(data, 'outputFolder') or "output"
@@ -51,7 +231,7 @@ class TextProcessor(MessageNode):
                 if node_id.endswith("_locals"):
                     node_id = node_id[:-7]
                 param_name = content[1]
-                return self._eventBus.emit("askMessage", node_id, param_name)
+                return materialize(self._eventBus.emit("askMessage", node_id, param_name))
         return None
 
     def run(self) -> bool:
@@ -62,31 +242,13 @@ class TextProcessor(MessageNode):
             bool: 执行是否成功
         """
         try:
-            # 从data中获取输入值
-            self.input_file = self._get_input_value(self.data, 'inputFile')
-            
-            # 根据不同模式执行相应操作
-            if self.mode == 'append':
-                self.content = self._get_input_value(self.data, 'content')
-                result = self._append_text()
-            elif self.mode == 'replace':
-                self.search_text = self._get_input_value(self.data, 'searchText')
-                self.replace_text = self._get_input_value(self.data, 'replaceText')
-                self.use_regex = self._get_input_value(self.data, 'useRegex')
-                if self.use_regex == None:
-                    self.use_regex = False
-                result = self._replace_text()
-            elif self.mode == 'write':
-                self.content = self._get_input_value(self.data, 'content')
-                result = self._write_text()
-            elif self.mode == 'wordFreq':
-                self.ignore_case = self._get_input_value(self.data, 'ignoreCase')
-                if self.ignore_case == None:
-                    self.ignore_case = False
-                self.min_length = self._get_input_value(self.data, 'minLength')
-                result = self._word_frequency()
+            # 批量模式：对文件列表逐个执行当前模式
+            if self._get_input_value(self.data, 'batch'):
+                result = self._run_batch()
             else:
-                raise ValueError(f"不支持的操作模式: {self.mode}")
+                # 从data中获取输入值
+                self.input_file = self._get_input_value(self.data, 'inputFile')
+                result = self._execute_mode()
 
             # 更新消息
             self.MessageList=result
@@ -98,31 +260,135 @@ class TextProcessor(MessageNode):
         except Exception as e:
             raise Exception(f"文本处理节点 {self._id} 执行错误: {str(e)}", 9)
 
+    def _execute_mode(self) -> Dict[str, Any]:
+        """根据不同模式执行相应操作"""
+        if self.mode == 'append':
+            self.content = self._get_input_value(self.data, 'content')
+            return self._append_text()
+        elif self.mode == 'replace':
+            self.search_text = self._get_input_value(self.data, 'searchText')
+            self.replace_text = self._get_input_value(self.data, 'replaceText')
+            self.use_regex = self._get_input_value(self.data, 'useRegex')
+            if self.use_regex == None:
+                self.use_regex = False
+            return self._replace_text()
+        elif self.mode == 'write':
+            self.content = self._get_input_value(self.data, 'content')
+            return self._write_text()
+        elif self.mode == 'wordFreq':
+            self.ignore_case = self._get_input_value(self.data, 'ignoreCase')
+            if self.ignore_case == None:
+                self.ignore_case = False
+            self.min_length = self._get_input_value(self.data, 'minLength')
+            return self._word_frequency()
+        else:
+            raise ValueError(f"不支持的操作模式: {self.mode}")
+
+    def _run_batch(self) -> Dict[str, Any]:
+        """
+        批量模式：inputFiles 中的文件分配给有界进程池并发处理，
+        输出文件名由 outputTemplate 生成，返回每个文件的简要结果表。
+        """
+        input_files = list(self._get_input_value(self.data, 'inputFiles') or [])
+        if not input_files:
+            raise ValueError("批量模式需要提供 inputFiles 文件列表")
+        template = self._get_input_value(self.data, 'outputTemplate') or "{stem}_{name}"
+        workers = int(self._get_input_value(self.data, 'workers') or os.cpu_count() or 1)
+
+        # 引用类型的输入只能在主进程中解析，这里全部展开为常量后交给工作进程
+        base_values = {key: {"type": "constant", "content": self._get_input_value(self.data, key)}
+                       for key in self.data.get('inputsValues', {})
+                       if key not in ('inputFile', 'inputFiles', 'batch', 'outputTemplate', 'workers')}
+        # 各文件已在不同进程中并发处理，工作进程内部不再开进程池；结果写入磁盘而不是内存产物
+        base_values["parallel"] = {"type": "constant", "content": False}
+        base_values["inMemory"] = {"type": "constant", "content": False}
+
+        tasks = []
+        used_names = set()
+        for index, input_file in enumerate(input_files, start=1):
+            stem = os.path.splitext(source_name(input_file))[0]
+            output_name = template.format(name=self.output_name, stem=stem, index=index)
+            if output_name in used_names:
+                output_name = f"{output_name}_{index}"
+            used_names.add(output_name)
+            values = dict(base_values)
+            values["inputFile"] = {"type": "constant", "content": input_file}
+            values["outputFileName"] = {"type": "constant", "content": output_name}
+            tasks.append({"mode": self.mode, "inputsValues": values})
+
+        summary = []
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(tasks)))) as executor:
+            # 内存产物不跨进程传递，复制到子进程后被回收时会删除其溢出文件，这类文件在主进程中处理
+            futures = [None if isinstance(input_file, Artifact) else executor.submit(_batch_worker, task)
+                       for input_file, task in zip(input_files, tasks)]
+            for completed, (task, future) in enumerate(zip(tasks, futures), start=1):
+                input_file = task["inputsValues"]["inputFile"]["content"]
+                label = source_name(input_file) if isinstance(input_file, Artifact) else input_file
+                try:
+                    result = future.result() if future is not None else _batch_worker(task)
+                    summary.append(_summarize_result(label, result))
+                except Exception as e:
+                    summary.append({"inputFile": label, "status": "error", "error": str(e)})
+                self._eventBus.emit("node_progress", {"nodeId": self._id, "current": completed, "total": len(tasks)})
+
+        failed = sum(1 for row in summary if row["status"] != "ok")
+        self._eventBus.emit("message", "info" if not failed else "warning", self._id,
+                            f"Batch {self.mode} finished: {len(summary) - failed} succeeded, {failed} failed")
+        return {
+            "outputFiles": [row["outputFile"] for row in summary if row["status"] == "ok"],
+            "summary": summary,
+            "fileCount": len(summary),
+            "failedCount": failed
+        }
+
     def updateNext(self):
         """更新下一个节点"""
         if not self._nextNodes and not self._is_loop_internal:
             raise Exception(f"节点 {self._id}: 缺少后续节点配置",9)
         self._next = self._nextNodes[0][1]
 
-    def _get_output_file(self) -> str:
+    def _get_output_filename(self) -> str:
         """
-        根据输入文件的扩展名生成输出文件路径
+        根据输入文件的扩展名生成输出文件名
         
         Returns:
-            str: 输出文件路径
+            str: 输出文件名
         """
         # 获取输入文件的扩展名
-        _, ext = os.path.splitext(self.input_file)
+        _, ext = os.path.splitext(source_name(self.input_file))
         if not ext:  # 如果没有扩展名，默认使用.txt
             ext = '.txt'
-            
-        # 创建输出文件路径
-        output_file = os.path.join(self.output_folder, f"{self.output_name}{ext}")
+        return f"{self.output_name}{ext}"
+
+    def _get_output_file(self) -> str:
+        """
+        根据输入文件的扩展名生成输出文件路径
+        
+        Returns:
+            str: 输出文件路径
+        """
+        output_file = os.path.join(self.output_folder, self._get_output_filename())
         return self._get_unique_filename(output_file)
 
+    def _write_output(self, filename: str, content: str, encoding: str = 'utf-8'):
+        """
+        写出处理结果。inMemory 模式下返回内存产物，不访问文件系统
+        
+        Returns:
+            输出文件路径或 Artifact
+        """
+        if self.in_memory:
+            try:
+                return Artifact(filename, content.encode(encoding))
+            except UnicodeEncodeError:
+                return Artifact(filename, content.encode('utf-8'))
+        output_file = self._get_unique_filename(os.path.join(self.output_folder, filename))
+        self._write_file_with_encoding(output_file, content, encoding)
+        return output_file
+
     def _read_file_with_encoding(self, file_path: str) -> tuple[str, str]:
         """
-        使用多种编码尝试读取文件
+        自动探测编码并读取文件
         
         Args:
             file_path (str): 文件路径
@@ -133,17 +399,11 @@ class TextProcessor(MessageNode):
         Raises:
             RuntimeError: 当所有编码都无法成功读取文件时抛出
         """
-        encodings = ['utf-8', 'gbk', 'gb2312', 'gb18030', 'latin1']
-        
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                    return content, encoding
-            except UnicodeDecodeError:
-                continue
-                
-        raise RuntimeError("无法使用支持的编码格式读取文件，请检查文件编码")
+        try:
+            # 共享的编码探测：只读一次文件，按前缀判断编码并缓存结果
+            return read_text(file_path)
+        except UnicodeDecodeError:
+            raise RuntimeError("无法使用支持的编码格式读取文件，请检查文件编码")
 
     def _write_file_with_encoding(self, file_path: str, content: str, encoding: str = 'utf-8') -> None:
         """
@@ -162,16 +422,117 @@ class TextProcessor(MessageNode):
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(content)
 
+    def _should_stream(self) -> bool:
+        """大文件或显式要求时使用流式处理；内存产物本身已在内存中，不做流式处理"""
+        if isinstance(self.input_file, Artifact):
+            return False
+        streaming = self._get_input_value(self.data, 'streaming')
+        if streaming is not None:
+            return bool(streaming)
+        return os.path.getsize(self.input_file) > STREAM_THRESHOLD_BYTES
+
+    def _open_stream_output(self, filename: str, encoding: str):
+        """流式输出的目标：返回 (输出路径或 Artifact, 写入回调, 关闭回调)"""
+        if self.in_memory:
+            artifact = Artifact(filename)
+            return artifact, lambda text: artifact.write_text(text, encoding), lambda: None
+        output_file = self._get_unique_filename(os.path.join(self.output_folder, filename))
+        f = open(output_file, 'w', encoding=encoding, newline='')
+        return output_file, f.write, f.close
+
+    def _discard_output(self, output):
+        if isinstance(output, Artifact):
+            output.release()
+        elif os.path.exists(output):
+            os.remove(output)
+
+    def _append_text_streaming(self) -> Optional[Dict[str, Any]]:
+        """
+        流式追加：按块复制原文件并用增量解码器校验编码，最后写入追加内容
+
+        Returns:
+            编码探测有误或追加内容无法用原编码表示时返回 None，由调用方回退到整体读取
+        """
+        input_encoding = detect_encoding(self.input_file)
+        # 带 BOM 的编码在追加时会重复写入 BOM，交给整体读写处理
+        if input_encoding not in ENCODING_CANDIDATES:
+            return None
+        try:
+            self.content.encode(input_encoding)
+        except UnicodeEncodeError:
+            return None
+
+        output, write, close = self._open_stream_output(self._get_output_filename(), input_encoding)
+        try:
+            with open(self.input_file, 'r', encoding=input_encoding, newline='') as f:
+                while True:
+                    chunk = f.read(STREAM_CHUNK_CHARS)
+                    if not chunk:
+                        break
+                    write(chunk)
+            write(self.content)
+        except UnicodeDecodeError:
+            close()
+            self._discard_output(output)
+            return None
+        close()
+        return {
+            "outputFile": output,
+            "inputEncoding": input_encoding,
+            "outputEncoding": input_encoding
+        }
+
+    def _replace_text_streaming(self) -> Optional[Dict[str, Any]]:
+        """
+        流式替换：按块读取、替换并增量写出
+
+        Returns:
+            编码探测有误时返回 None，由调用方回退到整体读取
+        """
+        input_encoding = detect_encoding(self.input_file)
+        output_encoding = input_encoding
+        try:
+            self.replace_text.encode(input_encoding)
+        except UnicodeEncodeError:
+            # 替换文本无法用原编码表示时输出UTF-8
+            output_encoding = 'utf-8'
+
+        literal = not self.use_regex
+        pattern = re.compile(re.escape(self.search_text) if literal else self.search_text)
+        overlap = int(self._get_input_value(self.data, 'chunkOverlap') or REPLACE_OVERLAP_CHARS)
+        if literal:
+            overlap = max(overlap, len(self.search_text))
+
+        output, write, close = self._open_stream_output(self._get_output_filename(), output_encoding)
+        try:
+            with open(self.input_file, 'r', encoding=input_encoding, newline='') as f:
+                replacement_count = stream_replace(f, write, pattern, self.replace_text, literal, overlap=overlap)
+        except UnicodeDecodeError:
+            close()
+            self._discard_output(output)
+            return None
+        close()
+        return {
+            "outputFile": output,
+            "inputEncoding": input_encoding,
+            "outputEncoding": output_encoding,
+            "replacementCount": replacement_count
+        }
+
     def _append_text(self) -> Dict[str, Any]:
         try:
+            if self._should_stream():
+                result = self._append_text_streaming()
+                if result is not None:
+                    self._eventBus.emit("message", "info", self._id,
+                                        f"Append text success! (Encoding: {result['inputEncoding']}, streaming)")
+                    return result
+            
             # 读取原文件内容
             original_content, input_encoding = self._read_file_with_encoding(self.input_file)
             
-            # 创建新的输出文件
-            output_file = self._get_output_file()
-            
             # 写入原内容和新内容
-            self._write_file_with_encoding(output_file, original_content + self.content, input_encoding)
+            output_file = self._write_output(self._get_output_filename(), original_content + self.content, input_encoding)
                 
             self._eventBus.emit("message", "info", self._id, f"Append text success! (Encoding: {input_encoding})")
             return {
@@ -184,23 +545,26 @@ class TextProcessor(MessageNode):
 
     def _replace_text(self) -> Dict[str, Any]:
         try:
+            if self._should_stream():
+                result = self._replace_text_streaming()
+                if result is not None:
+                    self._eventBus.emit("message", "info", self._id,
+                                        f"Replace text success! (Encoding: {result['inputEncoding']}, streaming)")
+                    return result
+
             # 读取文件内容
             content, input_encoding = self._read_file_with_encoding(self.input_file)
 
             if self.use_regex:
-                # 使用正则表达式进行替换
-                replaced_content = re.sub(self.search_text, self.replace_text, content)
-                replacement_count = len(re.findall(self.search_text, content))
+                # 使用正则表达式进行替换，subn 在同一遍扫描中完成替换和计数
+                replaced_content, replacement_count = re.subn(self.search_text, self.replace_text, content)
             else:
                 # 普通文本替换
                 replacement_count = content.count(self.search_text)
                 replaced_content = content.replace(self.search_text, self.replace_text)
 
-            # 创建新的输出文件
-            output_file = self._get_output_file()
-            
             # 写入替换后的内容
-            self._write_file_with_encoding(output_file, replaced_content, input_encoding)
+            output_file = self._write_output(self._get_output_filename(), replaced_content, input_encoding)
                 
             self._eventBus.emit("message", "info", self._id, f"Replace text success! (Encoding: {input_encoding})")
             return {
@@ -214,11 +578,8 @@ class TextProcessor(MessageNode):
 
     def _write_text(self) -> Dict[str, Any]:
         try:
-            # 创建新的输出文件
-            output_file = self._get_output_file()
-            
             # 写入内容（使用UTF-8编码，因为这是新内容）
-            self._write_file_with_encoding(output_file, self.content, 'utf-8')
+            output_file = self._write_output(self._get_output_filename(), self.content, 'utf-8')
                 
             self._eventBus.emit("message", "info", self._id, "Write text success! (Encoding: utf-8)")
             return {
@@ -228,56 +589,85 @@ class TextProcessor(MessageNode):
         except Exception as e:
             raise RuntimeError(f"写入文本时发生错误: {str(e)}",9)
 
-    def _word_frequency(self) -> Dict[str, Any]:
-        try:
-            # 尝试不同的编码格式
-            encodings = ['utf-8', 'gbk', 'gb2312', 'gb18030', 'latin1']
-            content = None
-            used_encoding = None  # 记录成功读取文件的编码格式
-            
-            for encoding in encodings:
+    def _word_frequency_options(self) -> Dict[str, Any]:
+        stop_words = self._get_input_value(self.data, 'stopWords') or []
+        if isinstance(stop_words, str):
+            stop_words = [word.strip() for word in re.split(r'[,，\s]+', stop_words) if word.strip()]
+        if self.ignore_case:
+            stop_words = [word.lower() for word in stop_words]
+        return {
+            "ignore_case": bool(self.ignore_case),
+            "min_length": int(self.min_length or 1),
+            "stop_words": frozenset(stop_words),
+            "ngram": int(self._get_input_value(self.data, 'ngram') or 1)
+        }
+
+    def _count_sources(self, sources: List[Any], options: Dict[str, Any]) -> Tuple[Counter, int, List[str]]:
+        """
+        统计一个或多个文件并合并结果
+
+        parallel 为真时多个文件分配给工作进程；单个大文件（单词统计时）按换行符拆分字节区间并行统计。
+        """
+        parallel = self._get_input_value(self.data, 'parallel')
+        workers = int(self._get_input_value(self.data, 'workers') or os.cpu_count() or 1)
+        counts = Counter()
+        total = 0
+        encodings = []
+
+        if parallel and len(sources) == 1 and options["ngram"] == 1 and not isinstance(sources[0], Artifact) \
+                and os.path.getsize(sources[0]) > PARALLEL_SPLIT_BYTES:
+            path = sources[0]
+            encoding = detect_encoding(path)
+            if encoding in _SPLITTABLE_ENCODINGS:
+                segments = _split_at_newlines(path, workers)
                 try:
-                    with open(self.input_file, 'r', encoding=encoding) as f:
-                        content = f.read()
-                        used_encoding = encoding  # 保存成功的编码格式
-                        break  # 如果成功读取，跳出循环
+                    with ProcessPoolExecutor(max_workers=min(workers, len(segments))) as executor:
+                        futures = [executor.submit(_count_segment_worker, path, encoding, start, end, options)
+                                   for start, end in segments]
+                        for future in futures:
+                            segment_counts, segment_total = future.result()
+                            counts.update(segment_counts)
+                            total += segment_total
+                    return counts, total, [encoding]
                 except UnicodeDecodeError:
-                    continue
-            
-            if content is None:
-                raise RuntimeError("无法使用支持的编码格式读取文件，请检查文件编码")
+                    # 前缀探测的编码不适用于全文，改为整体统计
+                    counts, total = Counter(), 0
 
-            # 如果忽略大小写，将所有文本转换为小写
-            if self.ignore_case:
-                content = content.lower()
+        # 内存产物不跨进程传递，复制到子进程后被回收时会删除其溢出文件
+        if parallel and len(sources) > 1 and not any(isinstance(source, Artifact) for source in sources):
+            with ProcessPoolExecutor(max_workers=min(workers, len(sources))) as executor:
+                results = list(executor.map(_count_file_worker, sources, [options] * len(sources)))
+        else:
+            results = [_count_file_worker(source, options) for source in sources]
+        for file_counts, file_total, encoding in results:
+            counts.update(file_counts)
+            total += file_total
+            encodings.append(encoding)
+        return counts, total, encodings
 
-            # 使用正则表达式分割单词
-            words = re.findall(r'\b\w+\b', content)
-            
-            # 过滤掉小于最小长度的单词
-            words = [word for word in words if len(word) >= self.min_length]
+    def _word_frequency(self) -> Dict[str, Any]:
+        try:
+            options = self._word_frequency_options()
+            top = self._get_input_value(self.data, 'topK')
+            top = DEFAULT_TOP_K if top is None else int(top)
+            sources = self._get_input_value(self.data, 'inputFiles') or [self.input_file]
 
-            # 使用Counter统计词频
-            word_counts = Counter(words)
+            # 流式分块统计，多个文件的结果合并
+            counts, total, encodings = self._count_sources(sources, options)
+            used_encoding = ", ".join(dict.fromkeys(encodings))
+            top_items = top_k(counts, top)
+            label = "Words" if options["ngram"] == 1 else f"{options['ngram']}-grams"
 
-            # 构建返回结果
-            frequencies = {
-                word: count for word, count in word_counts.items()
-            }
-            
-            # 将结果写入输出文件（词频分析结果总是输出为txt格式）
-            output_file = os.path.join(self.output_folder, f"{self.output_name}_frequency.txt")
-            output_file = self._get_unique_filename(output_file)
-            
-            # 始终使用UTF-8编码写入输出文件
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(f"Input file encoding: {used_encoding}\n")
-                f.write("Word Frequency Analysis Results:\n\n")
-                f.write(f"Total Words: {len(words)}\n")
-                f.write(f"Unique Words: {len(word_counts)}\n\n")
-                f.write("Word Frequencies:\n")
-                for word, count in sorted(frequencies.items()):
-                    f.write(f"{word}: {count}\n")
+            # 将结果写入输出文件（词频分析结果总是输出为txt格式，始终使用UTF-8编码）
+            lines = [
+                f"Input file encoding: {used_encoding}\n",
+                "Word Frequency Analysis Results:\n\n",
+                f"Total Words: {total}\n",
+                f"Unique {label}: {len(counts)}\n\n",
+                f"Top {len(top_items)} {label}:\n"
+            ]
+            lines.extend(f"{word}: {count}\n" for word, count in top_items)
+            output_file = self._write_output(f"{self.output_name}_frequency.txt", "".join(lines), 'utf-8')
             
             self._eventBus.emit("message", "info", self._id, f"Word frequency analysis success! (Input encoding: {used_encoding})")
             return {
@@ -285,9 +675,11 @@ class TextProcessor(MessageNode):
                 "inputEncoding": used_encoding,
                 "outputEncoding": "utf-8",
                 "statistics": {
-                    "totalWords": len(words),
-                    "uniqueWords": len(word_counts),
-                    "frequencies": frequencies
+                    "totalWords": total,
+                    "uniqueWords": len(counts),
+                    # 只返回前 K 项，避免把完整词表放进节点输出
+                    "topWords": [{"word": word, "count": count} for word, count in top_items],
+                    "frequencies": dict(top_items)
                 }
             }
         except Exception as e:
@@ -0,0 +1,183 @@
+"""
+节点之间传递的惰性数据流
+
+Stream 包装一个可迭代对象或返回可迭代对象的函数，下游节点逐项消费，上游在消费的同时产生数据，
+数据不必整体保存在 MessageList 中。buffer_size 大于 0 时由后台线程提前生产，
+最多缓冲 buffer_size 项，缓冲区满时生产方阻塞等待（背压），内存占用与数据总量无关；
+buffer_size 为 0 时按需拉取，不预取。
+
+来源是函数或可重复迭代的对象（列表、FileWalk 等）时可以多次迭代，
+来源是生成器等一次性迭代器时只能消费一次。
+"""
+import queue
+import threading
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Union
+
+from ..artifacts import register_describable
+
+DEFAULT_BUFFER_SIZE = 64
+# 消费方提前停止后，生产线程检查停止标志的间隔（秒）
+STOP_POLL_INTERVAL = 0.1
+
+Source = Union[Iterable[Any], Callable[[], Iterable[Any]]]
+
+_END = object()
+
+
+class StreamError(Exception):
+    """数据流错误"""
+    pass
+
+
+class _Failure:
+    """生产线程中的异常，交给消费方重新抛出"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+@register_describable
+class Stream:
+    """带有界缓冲和背压的惰性数据流"""
+
+    def __init__(self, source: Source, buffer_size: int = 0, label: str = ""):
+        """
+        Args:
+            source: 可迭代对象，或每次迭代时调用以得到新迭代器的函数
+            buffer_size: 后台预取的最大缓冲项数，0 表示不预取
+            label: 描述信息中显示的名称
+        """
+        self._source = source
+        self.buffer_size = max(0, int(buffer_size or 0))
+        self.label = label
+        self.produced = 0
+        self.peak_buffered = 0
+        self._consumed = False
+
+    def _open(self) -> Iterator[Any]:
+        if callable(self._source) and not hasattr(self._source, "__iter__"):
+            return iter(self._source())
+        iterator = iter(self._source)
+        if iterator is self._source:
+            # 一次性迭代器
+            if self._consumed:
+                raise StreamError(f"数据流 {self.label or repr(self)} 只能消费一次")
+            self._consumed = True
+        return iterator
+
+    def __iter__(self) -> Iterator[Any]:
+        self.produced = 0
+        self.peak_buffered = 0
+        source = self._open()
+        if self.buffer_size == 0:
+            return self._pull(source)
+        return self._prefetch(source)
+
+    def _pull(self, source: Iterator[Any]) -> Iterator[Any]:
+        try:
+            for item in source:
+                self.produced += 1
+                yield item
+        finally:
+            close = getattr(source, "close", None)
+            if close:
+                close()
+
+    def _prefetch(self, source: Iterator[Any]) -> Iterator[Any]:
+        buffer: "queue.Queue[Any]" = queue.Queue(maxsize=self.buffer_size)
+        stop = threading.Event()
+
+        def put(value: Any) -> bool:
+            # 缓冲区满时阻塞，消费方停止后放弃
+            while not stop.is_set():
+                try:
+                    buffer.put(value, timeout=STOP_POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for item in source:
+                    if not put(item):
+                        return
+                put(_END)
+            except BaseException as e:
+                put(_Failure(e))
+            finally:
+                close = getattr(source, "close", None)
+                if close:
+                    close()
+
+        producer = threading.Thread(target=produce, name=f"stream-{self.label or id(self)}", daemon=True)
+        producer.start()
+        try:
+            while True:
+                self.peak_buffered = max(self.peak_buffered, buffer.qsize())
+                item = buffer.get()
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                self.produced += 1
+                yield item
+        finally:
+            stop.set()
+
+    def to_list(self) -> List[Any]:
+        return list(self)
+
+    def map(self, func: Callable[[Any], Any]) -> "Stream":
+        """逐项转换，返回新的数据流（预取仍由当前数据流完成）"""
+        return Stream(lambda: (func(item) for item in self), 0, self.label)
+
+    def filter(self, predicate: Callable[[Any], bool]) -> "Stream":
+        """逐项过滤，返回新的数据流"""
+        return Stream(lambda: (item for item in self if predicate(item)), 0, self.label)
+
+    def batched(self, size: int) -> "Stream":
+        """按 size 项分批，每批为一个列表"""
+        if size < 1:
+            raise StreamError("批大小必须大于 0")
+
+        def batches() -> Iterator[List[Any]]:
+            iterator = iter(self)
+            while True:
+                batch = list(islice(iterator, size))
+                if not batch:
+                    return
+                yield batch
+
+        return Stream(batches, 0, self.label)
+
+    def __repr__(self) -> str:
+        return f"<Stream {self.label or self._source!r}>"
+
+    def describe(self) -> dict:
+        """可序列化的描述信息，用于发送到前端"""
+        return {"stream": self.label, "bufferSize": self.buffer_size, "produced": self.produced, "lazy": True}
+
+
+def is_stream(value: Any) -> bool:
+    """值是否为惰性序列（Stream 或 FileWalk 等非列表可迭代对象），字符串、字典和字节不算"""
+    if isinstance(value, Stream):
+        return True
+    if isinstance(value, (str, bytes, bytearray, dict, list, tuple, set, frozenset, range)):
+        return False
+    return hasattr(value, "__iter__")
+
+
+def as_stream(value: Any, buffer_size: int = 0, label: str = "") -> Stream:
+    """把列表、FileWalk 等可迭代对象包装为数据流；已经是数据流时按需调整缓冲大小"""
+    if isinstance(value, Stream):
+        if buffer_size and buffer_size != value.buffer_size:
+            return Stream(value, buffer_size, value.label or label)
+        return value
+    return Stream(value, buffer_size, label)
+
+
+def materialize(value: Any) -> Any:
+    """不支持流式输入的节点使用：惰性序列展开为列表，其他值原样返回"""
+    return list(value) if is_stream(value) else value
@@ -0,0 +1,6 @@
+#streams/__init__.py
+from .Stream import DEFAULT_BUFFER_SIZE, Stream, StreamError, as_stream, is_stream, materialize
+
+__version__ = "1.0.0"
+
+__all__ = ["DEFAULT_BUFFER_SIZE", "Stream", "StreamError", "as_stream", "is_stream", "materialize"]
\ No newline at end of file